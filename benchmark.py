@@ -0,0 +1,207 @@
+import argparse
+import json
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import pandas as pd
+
+from ner.base.models import Entity
+from ner.factories import TableFactory
+from ner.linkers import DBPediaLinker
+from ner.retrievers import LLMRetriever, StanzaRetriever
+from ner.testing import DBPediaStubServer, FakeChatModel
+
+
+WORDS = ["Москва", "Санкт-Петербург", "Яндекс", "Газпром", "Пушкин", "Казань", "Россия", "Толстой",
+         "живет", "работает", "в", "и", "город", "компания", "писатель", "на", "берегу", "реки"]
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss в Linux измеряется в килобайтах, в macOS — в байтах
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(percent / 100 * len(values)) - 1))
+    return values[index]
+
+
+def synthetic_texts(rows: int, seed: int = 0, unique_ratio: float = 0.3) -> List[str]:
+    """Детерминированные ячейки с повторами, как в реальных таблицах"""
+    rnd = random.Random(seed)
+    pool = [" ".join(rnd.choice(WORDS) for _ in range(rnd.randint(3, 20)))
+            for _ in range(max(1, int(rows * unique_ratio)))]
+    return [rnd.choice(pool) for _ in range(rows)]
+
+
+def measure(process: Callable[[List], List], items: List, batch_size: int) -> Dict:
+    """Прогоняет элементы батчами и считает пропускную способность и задержки на батч"""
+    latencies = []
+    started_at = time.perf_counter()
+
+    for batch_start in range(0, len(items), batch_size):
+        batch = items[batch_start:batch_start + batch_size]
+        batch_started_at = time.perf_counter()
+        process(batch)
+        latencies.append(time.perf_counter() - batch_started_at)
+
+    elapsed = time.perf_counter() - started_at
+
+    return {
+        "rows": len(items),
+        "batch_size": batch_size,
+        "seconds": round(elapsed, 4),
+        "rows_per_sec": round(len(items) / elapsed, 2) if elapsed > 0 else None,
+        "latency_p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+        "latency_p95_ms": round(_percentile(latencies, 95) * 1000, 3),
+        "latency_p99_ms": round(_percentile(latencies, 99) * 1000, 3),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def bench_stanza(texts: List[str], batch_size: int) -> Dict:
+    try:
+        # Без сети пайплайн загружается только из локально скачанных моделей
+        retriever = StanzaRetriever(download_method=None)
+    except Exception as e:
+        return {"skipped": f"{type(e).__name__}: {e}"}
+
+    return {
+        "sequential": measure(lambda batch: [retriever.retrieve(text) for text in batch], texts, 1),
+        "batched": measure(retriever.retrieve_batch, texts, batch_size),
+    }
+
+
+def bench_llm(texts: List[str], batch_size: int, latency: float, malformed_rate: float,
+              concurrency: int, pack_size: int, seed: int) -> Dict:
+    results = {}
+    modes = {
+        "sequential": dict(),
+        "concurrent": dict(max_concurrency=concurrency),
+        "packed": dict(max_concurrency=concurrency, pack_size=pack_size),
+    }
+
+    for mode, options in modes.items():
+        llm = FakeChatModel(latency=latency, malformed_rate=malformed_rate, seed=seed)
+        retriever = LLMRetriever(llm=llm, **options)
+        results[mode] = measure(retriever.retrieve_batch, texts, batch_size)
+        results[mode]["llm_calls"] = llm.call_count
+        results[mode]["malformed_responses"] = llm.malformed_count
+
+    return results
+
+
+def bench_dbpedia(texts: List[str], latency: float, error_rate: float, workers: int, seed: int) -> Dict:
+    rnd = random.Random(seed)
+    # Номер расширяет словарь поверхностных форм, чтобы запросы не сводились к горстке слов
+    surface_forms = [f"{word} {rnd.randint(0, len(texts))}"
+                     for text in texts for word in text.split() if word[:1].isupper()]
+    entities = [Entity(text=text, type="LOC", start_char=0, end_char=len(text)) for text in surface_forms]
+    results = {}
+
+    for mode, mode_workers in (("sequential", 1), ("concurrent", workers)):
+        with DBPediaStubServer(latency=latency, error_rate=error_rate, seed=seed) as stub:
+            linker = DBPediaLinker(base_url=stub.url, backoff_base=0.01)
+
+            if mode_workers > 1:
+                with ThreadPoolExecutor(max_workers=mode_workers) as executor:
+                    results[mode] = measure(lambda batch: list(executor.map(linker.link, batch)),
+                                            entities, mode_workers)
+            else:
+                results[mode] = measure(lambda batch: [linker.link(entity) for entity in batch], entities, 1)
+
+            results[mode]["http_requests"] = stub.request_count
+
+    return results
+
+
+def bench_tables(rows: int, seed: int, formats: List[str]) -> Dict:
+    texts = synthetic_texts(rows, seed=seed)
+    data_frame = pd.DataFrame({"id": range(rows), "text": texts, "value": [len(text) for text in texts]})
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for suffix in formats:
+            path = Path(tmp_dir) / f"table{suffix}"
+
+            started_at = time.perf_counter()
+            TableFactory.dump_to_file(data_frame=data_frame, file_path=path)
+            dump_seconds = time.perf_counter() - started_at
+
+            started_at = time.perf_counter()
+            TableFactory.create_from_path(path)
+            load_seconds = time.perf_counter() - started_at
+
+            results[suffix] = {
+                "rows": rows,
+                "bytes": path.stat().st_size,
+                "dump_seconds": round(dump_seconds, 4),
+                "load_seconds": round(load_seconds, 4),
+                "dump_rows_per_sec": round(rows / dump_seconds, 2),
+                "load_rows_per_sec": round(rows / load_seconds, 2),
+                "peak_rss_mb": _peak_rss_mb(),
+            }
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark for retrievers, linkers and table I/O")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--table-rows", type=int, default=100_000)
+    parser.add_argument("--table-formats", nargs="+", default=[".csv", ".xlsx", ".parquet", ".feather", ".jsonl"])
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm-latency", type=float, default=0.01)
+    parser.add_argument("--llm-malformed-rate", type=float, default=0.05)
+    parser.add_argument("--llm-concurrency", type=int, default=8)
+    parser.add_argument("--llm-pack-size", type=int, default=8)
+    parser.add_argument("--dbpedia-latency", type=float, default=0.005)
+    parser.add_argument("--dbpedia-error-rate", type=float, default=0.01)
+    parser.add_argument("--link-workers", type=int, default=8)
+    parser.add_argument("--only", nargs="+", choices=["stanza", "llm", "dbpedia", "tables"],
+                        default=["stanza", "llm", "dbpedia", "tables"])
+    parser.add_argument("--output", type=Path, default=None, help="Write JSON report to file instead of stdout")
+    args = parser.parse_args()
+
+    texts = synthetic_texts(args.rows, seed=args.seed)
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {key: str(value) if isinstance(value, Path) else value for key, value in vars(args).items()},
+        "results": {},
+    }
+
+    if "stanza" in args.only:
+        report["results"]["stanza"] = bench_stanza(texts, args.batch_size)
+    if "llm" in args.only:
+        report["results"]["llm"] = bench_llm(texts, args.batch_size, args.llm_latency, args.llm_malformed_rate,
+                                             args.llm_concurrency, args.llm_pack_size, args.seed)
+    if "dbpedia" in args.only:
+        report["results"]["dbpedia"] = bench_dbpedia(texts, args.dbpedia_latency, args.dbpedia_error_rate,
+                                                     args.link_workers, args.seed)
+    if "tables" in args.only:
+        report["results"]["tables"] = bench_tables(args.table_rows, args.seed, args.table_formats)
+
+    report["peak_rss_mb"] = _peak_rss_mb()
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+
+    if args.output is not None:
+        args.output.write_text(output, encoding="utf-8")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,75 @@
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import json
-from collections import defaultdict
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 from pydantic import ValidationError
 
-from ner.base.models import (Entity, NERResult)
+from ner.base.models import (CompactNERResult, Entity, EntitySpan, NERResult)
+from ner.output import EntityTableWriter, read_entity_table
+
+
+def _normalize_text(text: str) -> str:
+    """Нормализация текста для сравнения"""
+    return text.strip().lower()
+
+
+def _group_by_type(entities: List[Entity]) -> Dict[str, List[str]]:
+    """Один проход: нормализованные тексты сущностей по типам в исходном порядке"""
+    grouped = defaultdict(list)
+    for entity in entities:
+        grouped[entity.type].append(_normalize_text(entity.text))
+    return grouped
+
+
+def _count_true_positives(true_texts: List[str], pred_texts: List[str]) -> int:
+    """Жадное сопоставление в порядке сущностей: сначала точные совпадения, затем подстроки"""
+    # Очередь позиций для каждого текста дает первую несопоставленную предсказанную сущность за O(1)
+    pred_positions = defaultdict(deque)
+    for j, pred_text in enumerate(pred_texts):
+        pred_positions[pred_text].append(j)
+
+    matched_pred = [False] * len(pred_texts)
+    unmatched_true = []
+    tp = 0
+
+    for true_text in true_texts:
+        positions = pred_positions.get(true_text)
+        if positions:
+            matched_pred[positions.popleft()] = True
+            tp += 1
+        else:
+            unmatched_true.append(true_text)
+
+    # Частичные совпадения проверяются только среди оставшихся сущностей
+    remaining_pred = [pred_texts[j] for j in range(len(pred_texts)) if not matched_pred[j]]
+
+    for true_text in unmatched_true:
+        for k, pred_text in enumerate(remaining_pred):
+            if pred_text in true_text:
+                del remaining_pred[k]
+                tp += 1
+                break
+
+    return tp
+
+
+def count_matches(true_entities: List[Entity], 
+                  pred_entities: List[Entity], 
+                  classes: List[str]) -> Dict[str, Tuple[int, int, int]]:
+    """Считает (TP, FP, FN) по классам для одной строки/ячейки"""
+    true_by_type = _group_by_type(true_entities)
+    pred_by_type = _group_by_type(pred_entities)
+    counts = {}
+
+    for cls in classes:
+        true_texts = true_by_type.get(cls, [])
+        pred_texts = pred_by_type.get(cls, [])
+        tp = _count_true_positives(true_texts, pred_texts) if true_texts and pred_texts else 0
+        counts[cls] = (tp, len(pred_texts) - tp, len(true_texts) - tp)
+
+    return counts
 
 
 class ClassificationReport:
@@ -29,61 +93,27 @@ class ClassificationReport:
             entities.extend(sentence)
         return entities
     
-    def _normalize_text(self, text: str) -> str:
-        """Нормализация текста для сравнения"""
-        return text.strip().lower()
-    
-    def _is_partial_match(self, true_entity: Entity, pred_entity: Entity) -> bool:
-        """Проверяет частичное совпадение (предсказанная сущность является подстрокой истинной)"""
-        true_text = self._normalize_text(true_entity.text)
-        pred_text = self._normalize_text(pred_entity.text)
-        
-        # Проверяем, что pred является подстрокой true и типы совпадают
-        return (pred_text in true_text) and (true_entity.type == pred_entity.type)
-    
     def update(self, true_result: Optional[NERResult], pred_result: Optional[NERResult]):
         """Обновляет метрики для одной строки/ячейки"""
-        true_entities = self._extract_entities(true_result)
-        pred_entities = self._extract_entities(pred_result)
-        
-        # Для каждого класса считаем метрики
-        for cls in self.classes[:-1]:  # Исключаем OVERALL
-            true_entities_cls = [e for e in true_entities if e.type == cls]
-            pred_entities_cls = [e for e in pred_entities if e.type == cls]
-            
-            # Сопоставление истинных и предсказанных сущностей
-            matched_true = set()
-            matched_pred = set()
-            
-            # Сначала ищем точные совпадения
-            for i, true_ent in enumerate(true_entities_cls):
-                for j, pred_ent in enumerate(pred_entities_cls):
-                    if (self._normalize_text(true_ent.text) == self._normalize_text(pred_ent.text) and 
-                        true_ent.type == pred_ent.type and
-                        j not in matched_pred):
-                        matched_true.add(i)
-                        matched_pred.add(j)
-                        self.tp[cls] += 1
-                        break
-            
-            # Затем ищем частичные совпадения (ошибкой не считаем)
-            for i, true_ent in enumerate(true_entities_cls):
-                if i in matched_true:
-                    continue
-                for j, pred_ent in enumerate(pred_entities_cls):
-                    if j in matched_pred:
-                        continue
-                    if self._is_partial_match(true_ent, pred_ent):
-                        matched_true.add(i)
-                        matched_pred.add(j)
-                        self.tp[cls] += 1
-                        break
-            
-            # False Negatives: истинные сущности, которые не были найдены
-            self.fn[cls] += len(true_entities_cls) - len(matched_true)
-            
-            # False Positives: предсказанные сущности, которые не соответствуют истинным
-            self.fp[cls] += len(pred_entities_cls) - len(matched_pred)
+        self.update_entities(self._extract_entities(true_result), self._extract_entities(pred_result))
+    
+    def update_entities(self, true_entities: List[Entity], pred_entities: List[Entity]):
+        """Обновляет метрики по плоским спискам сущностей одной строки/ячейки"""
+        self.add_counts(count_matches(true_entities, pred_entities, self.classes[:-1]))
+    
+    def add_counts(self, counts: Dict[str, Tuple[int, int, int]]):
+        """Добавляет заранее посчитанные TP/FP/FN по классам"""
+        for cls, (tp, fp, fn) in counts.items():
+            self.tp[cls] += tp
+            self.fp[cls] += fp
+            self.fn[cls] += fn
+    
+    def merge(self, other: "ClassificationReport"):
+        """Прибавляет счетчики другого отчета (например, отчета по колонке к отчету по файлу)"""
+        for cls in other.classes[:-1]:
+            self.tp[cls] += other.tp[cls]
+            self.fp[cls] += other.fp[cls]
+            self.fn[cls] += other.fn[cls]
     
     def calculate_metrics(self) -> Dict:
         """Рассчитывает все метрики"""
@@ -146,64 +176,177 @@ class ClassificationReport:
             m = metrics[cls]
             print(f"{cls}: TP={m['tp']}, FP={m['fp']}, FN={m['fn']}")
 
-def evaluate_ner_dataset(base_path: str | Path):
+def _parse_column(values) -> List[Optional[CompactNERResult]]:
+    """Разбирает JSON колонки один раз; невалидные значения превращаются в None"""
+    results = []
+    for value in values:
+        try:
+            results.append(CompactNERResult.from_json(value))
+        except ValidationError:
+            results.append(None)
+    return results
+
+def _evaluate_column(path: Path, ner_column: str, classes: List[str]) -> Tuple[Optional[ClassificationReport], 
+                                                                                 Optional[str]]:
+    """Считает отчет по одной паре колонок NER_X / NER_X_EST (выполняется в отдельном процессе)
+
+    Ошибка чтения файла не прерывает оценку: она возвращается текстом, и файл пропускается.
+    """
+    report = ClassificationReport(classes)
+    pred_column = f"{ner_column}_EST"
+
+    try:
+        header = pd.read_csv(path, sep="|", nrows=0).columns
+        data_frame = pd.read_csv(path, sep="|", usecols=[column for column in (ner_column, pred_column) 
+                                                         if column in header])
+    except Exception as e:
+        return None, f"Ошибка загрузки файла {path}: {e}"
+
+    # Без колонки предсказаний все строки невалидны, как и при row.get(..., "")
+    if pred_column not in data_frame.columns:
+        return report, None
+
+    true_results = _parse_column(data_frame[ner_column])
+    pred_results = _parse_column(data_frame[pred_column])
+
+    for true_result, pred_result in zip(true_results, pred_results):
+        if true_result is None or pred_result is None:
+            continue
+
+        report.update(true_result, pred_result)
+
+    return report, None
+
+def evaluate_ner_dataset(base_path: str | Path, workers: int = None):
     """Основная функция для оценки датасетов"""
     
     # Определяем классы
     classes = ["LOC", "PER", "MISC", "ORG"]
+    csv_columns = {}
     
     for path in base_path.iterdir():
         if path.is_file() and path.suffix == '.csv':
-            print(f"\n{'='*60}")
-            print(f"Evaluating file: {path.name}")
-            print('='*60)
-            
             try:
-                data_frame = pd.read_csv(path, sep="|")
+                header = pd.read_csv(path, sep="|", nrows=0)
             except Exception as e:
                 print(f"Ошибка загрузки файла {path}: {e}")
                 continue
-            
+
             # Находим колонки с NER разметкой
-            ner_columns = [col for col in data_frame.columns 
-                          if col.startswith("NER_") and not col.endswith("_EST")]
-            
-            # Создаем отчет для всего файла
-            file_report = ClassificationReport(classes)
-            
-            for ner_column in ner_columns:
-                print(f"\n--- Column: {ner_column} ---")
+            csv_columns[path] = [col for col in header.columns 
+                                 if col.startswith("NER_") and not col.endswith("_EST")]
+
+    # Колонки всех файлов считаются параллельно, а печатаются в исходном порядке
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        column_futures = {(path, ner_column): executor.submit(_evaluate_column, path, ner_column, classes)
+                          for path, ner_columns in csv_columns.items()
+                          for ner_column in ner_columns}
+
+        for path in base_path.iterdir():
+            if path.is_file() and path.suffix in ('.parquet', '.arrow', '.feather', '.ipc'):
+                print(f"\n{'='*60}")
+                print(f"Evaluating entity table: {path.name}")
+                print('='*60)
+
+                file_metrics, file_report = evaluate_entity_table(path, classes)
+
+                print(f"\n{'='*60}")
+                print(f"FINAL REPORT FOR FILE: {path.name}")
+                print('='*60)
+                file_report.print_report(file_metrics)
+
+                save_report_to_file(path, file_metrics)
+            elif path in csv_columns:
+                print(f"\n{'='*60}")
+                print(f"Evaluating file: {path.name}")
+                print('='*60)
                 
-                # Создаем отчет для колонки
-                column_report = ClassificationReport(classes)
+                column_results = [column_futures[(path, ner_column)].result() for ner_column in csv_columns[path]]
+                errors = [error for _, error in column_results if error is not None]
+
+                if errors:
+                    print(errors[0])
+                    continue
                 
-                for idx, row in data_frame.iterrows():
-                    true_json = row[ner_column]
-                    pred_json = row.get(f"{ner_column}_EST", "")
+                # Создаем отчет для всего файла
+                file_report = ClassificationReport(classes)
+                
+                for ner_column, (column_report, _) in zip(csv_columns[path], column_results):
+                    print(f"\n--- Column: {ner_column} ---")
                     
-                    try:
-                        true_result = NERResult.model_validate_json(true_json)
-                        pred_result = NERResult.model_validate_json(pred_json)
-                    except ValidationError as e:
-                        continue
+                    file_report.merge(column_report)
                     
-                    # Обновляем метрики
-                    column_report.update(true_result, pred_result)
-                    file_report.update(true_result, pred_result)
+                    # Печатаем отчет для колонки
+                    column_metrics = column_report.calculate_metrics()
+                    column_report.print_report(column_metrics)
                 
-                # Печатаем отчет для колонки
-                column_metrics = column_report.calculate_metrics()
-                column_report.print_report(column_metrics)
-            
-            # Печатаем итоговый отчет для файла
-            print(f"\n{'='*60}")
-            print(f"FINAL REPORT FOR FILE: {path.name}")
-            print('='*60)
-            file_metrics = file_report.calculate_metrics()
-            file_report.print_report(file_metrics)
-            
-            # Сохраняем отчет в файл
-            save_report_to_file(path, file_metrics)
+                # Печатаем итоговый отчет для файла
+                print(f"\n{'='*60}")
+                print(f"FINAL REPORT FOR FILE: {path.name}")
+                print('='*60)
+                file_metrics = file_report.calculate_metrics()
+                file_report.print_report(file_metrics)
+                
+                # Сохраняем отчет в файл
+                save_report_to_file(path, file_metrics)
+
+def _group_entity_table(table) -> Dict[str, Dict[int, List[EntitySpan]]]:
+    """Группирует строки таблицы сущностей по колонке и номеру строки без разбора JSON"""
+    grouped = defaultdict(lambda: defaultdict(list))
+    columns = table.select(["column", "row_id", "text", "type", "start_char", "end_char"]).to_pydict()
+
+    for column, row_id, text, entity_type, start_char, end_char in zip(*columns.values()):
+        grouped[column][row_id].append(EntitySpan.create(text, entity_type, start_char, end_char))
+
+    return grouped
+
+def evaluate_entity_table(path: Path, classes: List[str]) -> Tuple[Dict, ClassificationReport]:
+    """Оценивает колонки NER_* против NER_*_EST, записанные в Parquet/Arrow таблицу сущностей"""
+    grouped = _group_entity_table(read_entity_table(path))
+    ner_columns = [column for column in grouped 
+                   if column.startswith("NER_") and not column.endswith("_EST")]
+
+    file_report = ClassificationReport(classes)
+
+    for ner_column in ner_columns:
+        print(f"\n--- Column: {ner_column} ---")
+
+        column_report = ClassificationReport(classes)
+        true_rows = grouped[ner_column]
+        pred_rows = grouped.get(f"{ner_column}_EST")
+
+        # Без колонки предсказаний строки не оцениваются, как и в CSV
+        if pred_rows is None:
+            column_report.print_report(column_report.calculate_metrics())
+            continue
+
+        for row_id in sorted(set(true_rows) | set(pred_rows)):
+            true_entities = true_rows.get(row_id, [])
+            pred_entities = pred_rows.get(row_id, [])
+
+            column_report.update_entities(true_entities, pred_entities)
+            file_report.update_entities(true_entities, pred_entities)
+
+        column_report.print_report(column_report.calculate_metrics())
+
+    return file_report.calculate_metrics(), file_report
+
+def csv_to_entity_table(csv_path: str | Path, 
+                        table_path: str | Path, 
+                        columns: List[str] = None, 
+                        sep: str = "|",
+                        merge: bool = True):
+    """Переносит JSON колонки NER_* размеченного CSV в таблицу сущностей (например, эталон перед запуском main)"""
+    header = pd.read_csv(csv_path, sep=sep, nrows=0).columns
+    columns = columns or [column for column in header if column.startswith("NER_")]
+    data_frame = pd.read_csv(csv_path, sep=sep, usecols=columns)
+
+    with EntityTableWriter(table_path, merge=merge) as writer:
+        for column in columns:
+            # Невалидная разметка записывается как строка без сущностей
+            writer.write(column=column, 
+                         ner_results=[result or CompactNERResult(sentences=[]) 
+                                      for result in _parse_column(data_frame[column])])
 
 def save_report_to_file(file_path: Path, metrics: Dict):
     """Сохраняет отчет в текстовый файл"""
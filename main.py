@@ -1,6 +1,10 @@
+import argparse
 import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
 from pathlib import Path
-from typing import List
+from typing import List, Tuple
 
 import questionary
 import pandas as pd
@@ -10,82 +14,548 @@ from ner.factories import (TableFactory,
                            RetrieverFactory)
 from ner.base.entity_retriever import EntityRetriever
 from ner.base.linker import Linker
+from ner.pipeline import (CellFilter, 
+                          DeduplicationStage, 
+                          NormalizationStage, 
+                          PipelinedExecutor, 
+                          RunJournal, 
+                          SurfaceNormalizer, 
+                          RuleBasedNormalizer, 
+                          StanzaLemmaNormalizer)
+from ner.retrievers import CascadeRetriever, LLMRetriever, ProcessPoolRetriever
+from ner.service import ServiceRetriever, ServiceLinker
+from ner.output import EntityTableWriter
+from ner.metrics import metrics, InstrumentedRetriever, InstrumentedLinker
 from ner.base.models import (Entity, 
                              LinkedEntity, 
                              NERType, 
                              LinkingType,
-                             NERResult,
+                             CompactNERResult,
                              LinkingResult)
 from tqdm import tqdm
 
 
-def retrive_entities(retriever: EntityRetriever, source_series: pd.Series):
+logger = logging.getLogger(__name__)
+
+
+def retrive_entities(retriever: EntityRetriever, source_series: pd.Series, batch_size: int = 64):
     ner_results = []
+    texts = [str(row) for row in source_series]
+
+    with tqdm(total=len(texts)) as progress:
+        for batch_start in range(0, len(texts), batch_size):
+            batch = texts[batch_start:batch_start + batch_size]
 
-    for row in tqdm(source_series):
-        ner_results.append(NERResult(sentences=retriever.retrieve(str(row))))
+            for sentences in retriever.retrieve_batch(batch):
+                ner_results.append(CompactNERResult(sentences))
+
+            progress.update(len(batch))
 
     return ner_results
 
-def link_entities(linker: Linker, entities: List[NERResult]) -> List[List[LinkedEntity]]:
+def retrive_unique_entities(retriever: EntityRetriever, 
+                            source_series: pd.Series, 
+                            batch_size: int = 64,
+                            cell_filter: CellFilter = None):
+    deduplication = DeduplicationStage(cell_filter=cell_filter)
+    unique_texts = deduplication.fit(source_series)
+
+    unique_results = retrive_entities(retriever=retriever, 
+                                      source_series=pd.Series(unique_texts, dtype=object),
+                                      batch_size=batch_size)
+    logger.info(f"Deduplication: {deduplication.stats}")
+
+    return deduplication.expand(unique_results)
+
+def link_entities(linker: Linker, 
+                  entities: List[CompactNERResult], 
+                  workers: int = 1, 
+                  normalizer: SurfaceNormalizer = None) -> List[List[LinkedEntity]]:
+    # Каждая уникальная строка сущности связывается один раз за весь запуск
+    unique_entities = {}
+
+    for ner_result in entities:
+        for sentence in ner_result.sentences:
+            for entity in sentence:
+                unique_entities.setdefault(entity.text, entity)
+
+    normalization = None
+
+    if normalizer is not None:
+        # Словоформы одной сущности (Москва, Москве, МОСКВА) сводятся к одному запросу
+        normalization = NormalizationStage(normalizer)
+        queries = normalization.fit(entity for ner_result in entities 
+                                    for sentence in ner_result.sentences for entity in sentence)
+        unique_entities = {query.text: query for query in queries}
+        logger.info(f"Normalization: {normalization.stats}")
+
+    links = {}
+
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            linked = executor.map(linker.link, unique_entities.values())
+
+            for linked_entity in tqdm(linked, total=len(unique_entities)):
+                links[linked_entity.entity.text] = linked_entity.link
+    else:
+        unique_list = list(unique_entities.values())
+
+        with tqdm(total=len(unique_list)) as progress:
+            for batch_start in range(0, len(unique_list), 256):
+                batch = unique_list[batch_start:batch_start + 256]
+
+                for linked_entity in linker.link_batch(batch):
+                    links[linked_entity.entity.text] = linked_entity.link
+
+                progress.update(len(batch))
+
+    logger.info(f"Linking: {sum(len(sentence) for ner_result in entities for sentence in ner_result.sentences)} "
+                f"entities, {len(links)} unique queries")
+
     linked_entities = []
 
-    for ner_result in tqdm(entities):
+    for ner_result in entities:
         linked_sentences = []
 
         for sentence in ner_result.sentences:
-            linked_sentences.append([linker.link(entity).link for entity in sentence])
+            linked_sentences.append([links[normalization.query_for(entity.text) if normalization else entity.text] 
+                                     for entity in sentence])
 
         linked_entities.append(LinkingResult(sentences=linked_sentences))
 
     return linked_entities
         
+def run_pipelined(pipeline: PipelinedExecutor, 
+                  source_series: pd.Series, 
+                  deduplicate: bool = True, 
+                  cell_filter: CellFilter = None) -> Tuple[List[CompactNERResult], List[LinkingResult]]:
+    """Конвейерный NER и линковка; с нормализатором ссылки могут отличаться от последовательного режима"""
+    if not deduplicate:
+        ner_results, linking_results = pipeline.run([str(row) for row in source_series])
+        logger.info(f"Pipeline: {pipeline.stats}")
+        return ner_results, linking_results
+
+    deduplication = DeduplicationStage(cell_filter=cell_filter)
+    ner_results, linking_results = pipeline.run(deduplication.fit(source_series))
+    logger.info(f"Deduplication: {deduplication.stats}")
+    logger.info(f"Pipeline: {pipeline.stats}")
+
+    if pipeline.normalizer is not None:
+        logger.info(f"Normalization: {pipeline.normalization_stats}")
+
+    return (deduplication.expand(ner_results), 
+            deduplication.expand(linking_results, empty_result=LinkingResult(sentences=[])))
+
+def find_retriever(retriever: EntityRetriever, retriever_class: type) -> EntityRetriever | None:
+    """Находит retriever нужного класса под обертками кэша, чанкинга и метрик"""
+    while retriever is not None and not isinstance(retriever, retriever_class):
+        retriever = getattr(retriever, "retriever", None)
+
+    return retriever
+
+def find_process_pool(retriever: EntityRetriever) -> ProcessPoolRetriever | None:
+    """Находит пул процессов Stanza, в том числе под первичной моделью каскада"""
+    cascade = find_retriever(retriever, CascadeRetriever)
+    return find_retriever(cascade.primary if cascade is not None else retriever, ProcessPoolRetriever)
+
+def close_retriever(retriever: EntityRetriever):
+    pool = find_process_pool(retriever)
+
+    if pool is not None:
+        pool.close()
+
+def pool_batch_size(retriever: EntityRetriever, batch_size: int) -> int:
+    """Увеличивает батч до размера, при котором пул процессов Stanza загружен целиком"""
+    pool = find_process_pool(retriever)
+
+    if pool is not None and batch_size < pool.preferred_batch_size:
+        logger.info(f"Batch size raised from {batch_size} to {pool.preferred_batch_size} "
+                    f"to keep {pool.workers} workers busy")
+        return pool.preferred_batch_size
+
+    return batch_size
+
+def output_column_names(src_columns: List[str], 
+                        ner_column_name: str = "NER", 
+                        nel_column_name: str = "NEL") -> List[Tuple[str, str, str]]:
+    """Возвращает (исходная колонка, колонка NER, колонка NEL) для каждой обрабатываемой колонки"""
+    if len(src_columns) == 1:
+        return [(src_columns[0], ner_column_name, nel_column_name)]
+
+    return [(column, f"{ner_column_name}_{column}", f"{nel_column_name}_{column}") for column in src_columns]
+
+def process_data_frame(data_frame: pd.DataFrame,
+                       retriever: EntityRetriever,
+                       src_column: str | List[str],
+                       ner_column_name: str = "NER",
+                       nel_column_name: str = "NEL",
+                       linker: Linker = None,
+                       batch_size: int = 64,
+                       deduplicate: bool = True,
+                       cell_filter: CellFilter = None,
+                       link_workers: int = 1,
+                       normalizer: SurfaceNormalizer = None,
+                       pipeline: PipelinedExecutor = None,
+                       entity_writer: EntityTableWriter = None,
+                       row_offset: int = 0) -> pd.DataFrame:
+    src_columns = [src_column] if isinstance(src_column, str) else list(src_column)
+    columns = output_column_names(src_columns, ner_column_name, nel_column_name)
+    rows = len(data_frame)
+
+    # Все колонки идут через NER и линковку одним потоком, поэтому дубликаты схлопываются между колонками
+    source_series = pd.concat([data_frame[column] for column in src_columns], ignore_index=True)
+
+    linked_entities = None
+
+    if pipeline is not None and linker is not None:
+        # NER и линковка идут одновременно, поэтому общее время близко к максимуму стадий, а не к сумме
+        with metrics.timer("stage_seconds", stage="pipelined"):
+            entities, linked_entities = run_pipelined(pipeline=pipeline, 
+                                                      source_series=source_series,
+                                                      deduplicate=deduplicate,
+                                                      cell_filter=cell_filter)
+    else:
+        with metrics.timer("stage_seconds", stage="ner"):
+            if deduplicate:
+                entities = retrive_unique_entities(retriever=retriever, 
+                                                   source_series=source_series,
+                                                   batch_size=batch_size,
+                                                   cell_filter=cell_filter)
+            else:
+                entities = retrive_entities(retriever=retriever, 
+                                            source_series=source_series,
+                                            batch_size=batch_size)
+
+        if linker is not None:
+            with metrics.timer("stage_seconds", stage="linking"):
+                linked_entities = link_entities(linker=linker, 
+                                                entities=entities, 
+                                                workers=link_workers, 
+                                                normalizer=normalizer)
+
+    cascade = find_retriever(retriever, CascadeRetriever)
+
+    if cascade is not None:
+        logger.info(f"Cascade: {cascade.stats}")
+
+    llm_retriever = find_retriever(cascade.fallback if cascade is not None else retriever, LLMRetriever)
+
+    if llm_retriever is not None:
+        logger.info(f"{llm_retriever.parse_stats}")
+
+    for idx, (_, ner_column, _) in enumerate(columns):
+        data_frame[ner_column] = [ner_result.to_json() 
+                                  for ner_result in entities[idx * rows:(idx + 1) * rows]]
+
+    if linked_entities is not None:
+        for idx, (_, _, nel_column) in enumerate(columns):
+            data_frame[nel_column] = [link_result.model_dump_json() 
+                                      for link_result in linked_entities[idx * rows:(idx + 1) * rows]]
+
+    if entity_writer is not None:
+        for idx, (_, ner_column, _) in enumerate(columns):
+            entity_writer.write(column=ner_column, 
+                                ner_results=entities[idx * rows:(idx + 1) * rows], 
+                                linking_results=linked_entities[idx * rows:(idx + 1) * rows]
+                                                if linked_entities is not None else None, 
+                                row_offset=row_offset)
+
+    return data_frame
+
+def process_checkpointed(data_frame: pd.DataFrame, 
+                         start: int, 
+                         journal: RunJournal = None, 
+                         **process_options) -> pd.DataFrame:
+    src_column = process_options["src_column"]
+    columns = output_column_names([src_column] if isinstance(src_column, str) else list(src_column),
+                                  process_options.get("ner_column_name", "NER"),
+                                  process_options.get("nel_column_name", "NEL"))
+    linked = process_options.get("linker") is not None
+    end = start + len(data_frame)
+
+    record = journal.get(start, end) if journal is not None else None
+
+    if record is not None:
+        for column, values in record["columns"].items():
+            data_frame[column] = values
+
+        entity_writer = process_options.get("entity_writer")
+
+        if entity_writer is not None:
+            for _, ner_column, nel_column in columns:
+                nel_values = record["columns"].get(nel_column) if linked else None
+                entity_writer.write(column=ner_column,
+                                    ner_results=[CompactNERResult.from_json(ner) 
+                                                 for ner in record["columns"][ner_column]],
+                                    linking_results=[LinkingResult.model_validate_json(nel) for nel in nel_values]
+                                                    if nel_values is not None else None,
+                                    row_offset=start)
+
+        return data_frame
+
+    data_frame = process_data_frame(data_frame=data_frame, row_offset=start, **process_options)
+
+    if journal is not None:
+        output_columns = [ner_column for _, ner_column, _ in columns]
+
+        if linked:
+            output_columns += [nel_column for _, _, nel_column in columns]
+
+        journal.record(start, end, columns={column: data_frame[column].tolist() for column in output_columns})
+
+    return data_frame
+
+def _fingerprint_value(value):
+    """Приводит опцию запуска к JSON: у объектов (фильтр, нормализатор) берутся класс и простые настройки"""
+    if isinstance(value, Enum):
+        return value.value
+
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+
+    if isinstance(value, Path):
+        return str(value)
+
+    if isinstance(value, dict):
+        return {str(key): _fingerprint_value(item) for key, item in value.items()}
+
+    if isinstance(value, (list, tuple)):
+        return [_fingerprint_value(item) for item in value]
+
+    # Загруженные модели и другие сложные атрибуты в отпечаток не входят
+    settings = {key: _fingerprint_value(item) for key, item in vars(value).items()
+                if not key.startswith("_") and (item is None or isinstance(item, (str, int, float, bool, Enum)))}
+    return {"class": type(value).__name__, **settings}
+
+def build_run_fingerprint(src_file_path: Path, **options) -> dict:
+    """Отпечаток источника и всех опций, от которых зависит вывод; при --resume он должен совпасть"""
+    stat = src_file_path.stat()
+    fingerprint = {"src_file_path": str(src_file_path.resolve()), 
+                   "size": stat.st_size, 
+                   "mtime_ns": stat.st_mtime_ns}
+    fingerprint.update({key: _fingerprint_value(value) for key, value in options.items()})
+    return fingerprint
+        
 def main(src_file_path: str | Path,
-         src_column: str, 
+         src_column: str | List[str], 
          ner_column_name: str = "NER",
          nel_column_name: str = "NEL",
          link: bool = True,
          ner_type: NERType = NERType.STANZA_NLP,
          linking_type: LinkingType = LinkingType.DBPEDIA,
-         output_file_path: str | Path = None):
+         output_file_path: str | Path = None,
+         batch_size: int = 64,
+         deduplicate: bool = True,
+         cell_filter: CellFilter = None,
+         cache_path: str | Path = None,
+         link_workers: int = 1,
+         retriever_options: dict = None,
+         linker_options: dict = None,
+         chunk_size: int = None,
+         checkpoint_interval: int = None,
+         resume: bool = False,
+         service_url: str = None,
+         entity_table_path: str | Path = None,
+         entity_table_merge: bool = False,
+         metrics_path: str | Path = None,
+         metrics_port: int = None,
+         csv_engine: str = None,
+         normalizer: SurfaceNormalizer = None,
+         pipelined: bool = False):
     
     src_file_path = Path(src_file_path)
+    src_column = [src_column] if isinstance(src_column, str) else list(src_column)
 
     if output_file_path is None:
         output_file_path = src_file_path
 
-    data_frame = TableFactory.create_from_path(src_file_path)
-    retriever = RetrieverFactory.create_from_ner_type(ner_type=ner_type)
-     
-    entities = retrive_entities(retriever=retriever, source_series=data_frame[src_column])
-    data_frame[ner_column_name] = [ner_result.model_dump_json() for ner_result in entities]
+    linker = None
 
-    if link:
-        linker = LinkerFactory.create_from_linking_type(linking_type=linking_type)
-        linked_entities = link_entities(linker=linker, entities=entities)
-        data_frame[nel_column_name] = [link_result.model_dump_json() for link_result in linked_entities]
-    
-    TableFactory.dump_to_file(data_frame=data_frame, file_path=output_file_path)
+    if service_url:
+        # Модели, кэш и ограничения запросов настраиваются при запуске сервиса (python -m ner.service)
+        ignored = [name for name, value in (("cache_path", cache_path), 
+                                            ("retriever_options", retriever_options), 
+                                            ("linker_options", linker_options)) if value]
+
+        if ignored:
+            raise ValueError(f"{', '.join(ignored)} cannot be used with service_url: "
+                             f"configure them when starting the service")
+
+        if normalizer is not None:
+            logger.info("Normalization is applied locally: entity forms are grouped before requests to the service")
+
+        retriever = ServiceRetriever(ner_type=ner_type, base_url=service_url)
+
+        if link:
+            linker = ServiceLinker(linking_type=linking_type, base_url=service_url)
+    else:
+        retriever = RetrieverFactory.create_from_ner_type(ner_type=ner_type, 
+                                                          cache_path=cache_path, 
+                                                          **(retriever_options or {}))
+
+        if link:
+            linker = LinkerFactory.create_from_linking_type(linking_type=linking_type, 
+                                                            cache_path=cache_path,
+                                                            **(linker_options or {}))
+
+    try:
+        batch_size = pool_batch_size(retriever, batch_size)
+
+        if metrics_path or metrics_port:
+            metrics.enable()
+            retriever = InstrumentedRetriever(retriever)
+
+            if linker is not None:
+                linker = InstrumentedLinker(linker)
+
+            if metrics_port:
+                metrics.start_http_server(metrics_port)
+
+        process_options = dict(retriever=retriever,
+                               src_column=src_column,
+                               ner_column_name=ner_column_name,
+                               nel_column_name=nel_column_name,
+                               linker=linker,
+                               batch_size=batch_size,
+                               deduplicate=deduplicate,
+                               cell_filter=cell_filter,
+                               link_workers=link_workers,
+                               normalizer=normalizer,
+                               pipeline=PipelinedExecutor(retriever=retriever, 
+                                                          linker=linker, 
+                                                          batch_size=batch_size,
+                                                          link_workers=max(link_workers, 1),
+                                                          normalizer=normalizer) if pipelined and linker else None,
+                               entity_writer=EntityTableWriter(entity_table_path, merge=entity_table_merge) 
+                                             if entity_table_path else None)
+
+        journal = None
+
+        # В потоковом режиме контрольная точка не больше прочитанной части таблицы
+        if checkpoint_interval or resume:
+            fingerprint = build_run_fingerprint(src_file_path,
+                                                src_column=src_column,
+                                                ner_column_name=ner_column_name,
+                                                nel_column_name=nel_column_name,
+                                                ner_type=ner_type,
+                                                linking_type=linking_type if link else None,
+                                                batch_size=batch_size,
+                                                deduplicate=deduplicate,
+                                                cell_filter=cell_filter if deduplicate else None,
+                                                retriever_options=retriever_options,
+                                                linker_options=linker_options if link else None,
+                                                service_url=service_url,
+                                                csv_engine=csv_engine,
+                                                normalizer=normalizer if link else None,
+                                                pipelined=pipelined and link,
+                                                chunk_size=chunk_size,
+                                                checkpoint_interval=checkpoint_interval)
+            journal = RunJournal(RunJournal.default_path(output_file_path), fingerprint=fingerprint, resume=resume)
+
+        if chunk_size:
+            # Потоковый режим: в памяти одновременно находится только одна часть таблицы
+            with TableFactory.create_writer(output_file_path) as writer:
+                start = 0
+
+                for data_frame in TableFactory.iter_chunks_from_path(src_file_path, chunk_size=chunk_size, engine=csv_engine):
+                    interval = checkpoint_interval or len(data_frame) or 1
+
+                    for offset in range(0, len(data_frame), interval):
+                        writer.write(process_checkpointed(data_frame=data_frame.iloc[offset:offset + interval].copy(), 
+                                                          start=start + offset, 
+                                                          journal=journal, 
+                                                          **process_options))
+
+                    start += len(data_frame)
+        else:
+            data_frame = TableFactory.create_from_path(src_file_path, engine=csv_engine)
+
+            if journal is not None:
+                interval = checkpoint_interval or len(data_frame) or 1
+                parts = [process_checkpointed(data_frame=data_frame.iloc[start:start + interval].copy(), 
+                                              start=start, 
+                                              journal=journal, 
+                                              **process_options)
+                         for start in range(0, len(data_frame), interval)]
+                processed = pd.concat(parts) if parts else process_data_frame(data_frame=data_frame, **process_options)
+
+                if hasattr(data_frame, "_source_separator"):
+                    processed._source_separator = data_frame._source_separator
+
+                data_frame = processed
+            else:
+                data_frame = process_data_frame(data_frame=data_frame, **process_options)
+        
+            TableFactory.dump_to_file(data_frame=data_frame, file_path=output_file_path)
+
+        if process_options["entity_writer"] is not None:
+            process_options["entity_writer"].close()
+
+        if journal is not None:
+            journal.remove()
+
+        if metrics_path:
+            metrics.dump_json(metrics_path)
+
+        metrics.stop_http_server()
+    finally:
+        # Процессы пула Stanza не должны жить до выхода интерпретатора
+        close_retriever(retriever)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=64, help="Cells per NER batch")
+    parser.add_argument("--chunk-size", type=int, default=None, 
+                        help="Stream the source table in chunks of this many rows instead of loading it whole")
+    parser.add_argument("--service-url", default=None, 
+                        help="Send NER and linking requests to a running service (python -m ner.service)")
+    parser.add_argument("--cache-path", default=None, help="SQLite cache for NER results and DBpedia lookups")
+    parser.add_argument("--metrics-path", default=None, help="Write run metrics to this JSON file")
+    parser.add_argument("--metrics-port", type=int, default=None, 
+                        help="Serve Prometheus metrics on this port during the run")
+    parser.add_argument("--resume", action="store_true", help="Skip rows already completed in the run journal")
+    parser.add_argument("--checkpoint-interval", type=int, default=None, 
+                        help="Rows per checkpoint (at most --chunk-size in streaming mode)")
+    parser.add_argument("--csv-engine", choices=["c", "pyarrow"], default=None, help="CSV parser for source table")
+    parser.add_argument("--normalize", choices=["rules", "stanza"], default=None, 
+                        help="Collapse inflected entity forms into one linking query")
+    parser.add_argument("--pipelined", action="store_true", help="Overlap NER and linking stages")
+    parser.add_argument("--link-workers", type=int, default=1, help="Concurrent linking requests")
+    parser.add_argument("--entity-table", default=None, help="Also write entities to a Parquet/Arrow entity table")
+    parser.add_argument("--entity-table-merge", action="store_true", 
+                        help="Keep other columns already stored in the entity table (e.g. gold NER_X for eval)")
+    args = parser.parse_args()
+
+    # Сводки этапов пишутся в лог, в консоль их выводит только CLI
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
     src_file_path = questionary.path("Enter source table file path").ask()
     src_file_path = Path(src_file_path)
 
     if not src_file_path.exists():
         raise FileNotFoundError()
 
-    src_column = questionary.text("Enter source column: ").ask()
+    src_column = [column.strip() for column in 
+                  questionary.text("Enter source column (comma-separated for several): ").ask().split(",")]
     ner_column_name = questionary.text('Enter NER column name (SKIP FOR "NER"): ', default="NER").ask()
     ner_type = NERType(questionary.select("Выберите тип NER: ", choices=[nt.value for nt in NERType]).ask())
     link = questionary.confirm("Use linking?").ask()
     
     nel_column_name = None
     linking_type = None
+    linker_options = None
 
     if link:
         nel_column_name = questionary.text("Enter NEL column name (SKIP FOR 'NEL'): ", default="NEL").ask()
         linking_type = LinkingType(questionary.select("Выберите тип NEL: ", choices=[lt.value for lt in LinkingType]).ask())
+
+        # В режиме сервиса индекс настраивается при его запуске
+        if linking_type == LinkingType.DBPEDIA_LOCAL and not args.service_url:
+            index_path = questionary.path("Enter local DBpedia index directory: ").ask()
+            dump_paths = questionary.text("Enter DBpedia dump files to (re)build index from (comma-separated, skip to use index as is): ").ask()
+            linker_options = {"index_path": index_path, 
+                              "dump_paths": [path.strip() for path in dump_paths.split(",") if path.strip()]}
     
     output_file_path = questionary.path('Enter output file path (skip to rewrite source): ').ask() 
 
@@ -95,4 +565,21 @@ if __name__ == "__main__":
          ner_type=ner_type,
          link=link,
          nel_column_name=nel_column_name,
-         linking_type=linking_type)
\ No newline at end of file
+         linking_type=linking_type,
+         linker_options=linker_options,
+         output_file_path=output_file_path or None,
+         batch_size=args.batch_size,
+         chunk_size=args.chunk_size,
+         service_url=args.service_url,
+         cache_path=args.cache_path,
+         metrics_path=args.metrics_path,
+         metrics_port=args.metrics_port,
+         checkpoint_interval=args.checkpoint_interval,
+         resume=args.resume,
+         csv_engine=args.csv_engine,
+         normalizer={"rules": RuleBasedNormalizer, 
+                     "stanza": StanzaLemmaNormalizer}[args.normalize]() if args.normalize else None,
+         link_workers=args.link_workers,
+         pipelined=args.pipelined,
+         entity_table_path=args.entity_table,
+         entity_table_merge=args.entity_table_merge)
\ No newline at end of file
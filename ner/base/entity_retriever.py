@@ -7,4 +7,13 @@ from .models import Entity
 class EntityRetriever(ABC):
     @abstractmethod
     def retrieve(self, text: str) -> List[List[Entity]]:
-        pass
\ No newline at end of file
+        pass
+
+    def retrieve_batch(self, texts: List[str]) -> List[List[List[Entity]]]:
+        """Извлекает сущности для нескольких текстов, сохраняя порядок входа"""
+        return [self.retrieve(text) for text in texts]
+
+    @property
+    def cache_version(self) -> str:
+        """Версия модели/промпта: при ее изменении закэшированные результаты становятся недействительными"""
+        return type(self).__name__
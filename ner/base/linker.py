@@ -1,8 +1,14 @@
 from abc import ABC, abstractmethod
+from typing import List
+
 from .models import Entity, LinkedEntity
 
 
 class Linker:
     @abstractmethod
     def link(self, entity: Entity) -> LinkedEntity:
-        pass
\ No newline at end of file
+        pass
+
+    def link_batch(self, entities: List[Entity]) -> List[LinkedEntity]:
+        """Связывает несколько сущностей, сохраняя порядок входа"""
+        return [self.link(entity) for entity in entities]
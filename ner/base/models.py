@@ -1,16 +1,25 @@
+from dataclasses import dataclass
 from enum import Enum
 from typing import List
-from pydantic import BaseModel
+import sys
+
+from pydantic import BaseModel, ConfigDict
+import pydantic_core
 
 
 class NERType(Enum):
     STANZA_NLP = "STANZA NLP"
     LLM_GIGACHAT = "LLM GIGACHAT"
+    STANZA_LLM_CASCADE = "STANZA + LLM GIGACHAT"
 
 class LinkingType(Enum):
     DBPEDIA = "DBPEDIA" 
+    DBPEDIA_LOCAL = "DBPEDIA LOCAL"
 
 class Entity(BaseModel):
+    # Позволяет передавать EntitySpan туда, где ожидается Entity (LinkedEntity, NERResult)
+    model_config = ConfigDict(from_attributes=True)
+
     text: str
     type: str
     start_char: int
@@ -24,4 +33,110 @@ class NERResult(BaseModel):
     sentences: List[List[Entity]]
 
 class LinkingResult(BaseModel):
-    sentences: List[List[str]]
\ No newline at end of file
+    sentences: List[List[str]]
+
+
+class FailedRetrieval(list):
+    """Результат retriever, который не смог обработать текст (исчерпаны попытки разбора ответа)
+
+    Ведет себя как обычный список предложений (пустой или частичный результат), 
+    но не должен сохраняться в кэш: при следующем запуске текст обрабатывается заново.
+    """
+
+
+@dataclass(slots=True)
+class EntitySpan:
+    """Компактная внутренняя сущность без валидации pydantic; атрибуты совпадают с Entity"""
+    text: str
+    type: str
+    start_char: int
+    end_char: int
+
+    @classmethod
+    def create(cls, text: str, type: str, start_char: int, end_char: int) -> "EntitySpan":
+        # Типы и повторяющиеся тексты хранятся в одном экземпляре строки
+        return cls(sys.intern(text), sys.intern(type), start_char, end_char)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "EntitySpan":
+        """Быстрый путь для корректных словарей, все остальное проходит валидацию Entity"""
+        text, entity_type = data.get("text"), data.get("type")
+        start_char, end_char = data.get("start_char"), data.get("end_char")
+
+        if (type(text) is str and type(entity_type) is str 
+                and type(start_char) is int and type(end_char) is int):
+            return cls.create(text, entity_type, start_char, end_char)
+
+        return cls.from_entity(Entity.model_validate(data))
+
+    @classmethod
+    def from_entity(cls, entity) -> "EntitySpan":
+        return cls.create(entity.text, entity.type, entity.start_char, entity.end_char)
+
+    def to_entity(self) -> Entity:
+        return Entity.model_construct(text=self.text, 
+                                      type=self.type, 
+                                      start_char=self.start_char, 
+                                      end_char=self.end_char)
+
+
+class CompactNERResult:
+    """Легковесная замена NERResult внутри пайплайна с тем же JSON форматом"""
+    __slots__ = ("sentences",)
+
+    def __init__(self, sentences: List[List[EntitySpan]]):
+        self.sentences = sentences
+
+    @classmethod
+    def from_json(cls, value: str | bytes) -> "CompactNERResult":
+        """Разбирает JSON NERResult; при любом отклонении от формата ошибки такие же, как у pydantic"""
+        try:
+            doc = pydantic_core.from_json(value)
+        except (ValueError, TypeError):
+            doc = None
+
+        if type(doc) is dict and type(doc.get("sentences")) is list:
+            sentences = []
+
+            for sentence in doc["sentences"]:
+                if type(sentence) is not list or not all(cls._is_regular(entity) for entity in sentence):
+                    break
+
+                sentences.append([EntitySpan.create(entity["text"], entity["type"], 
+                                                    entity["start_char"], entity["end_char"])
+                                  for entity in sentence])
+            else:
+                return cls(sentences)
+
+        return cls.from_ner_result(NERResult.model_validate_json(value))
+
+    @staticmethod
+    def _is_regular(entity) -> bool:
+        return (type(entity) is dict
+                and type(entity.get("text")) is str and type(entity.get("type")) is str
+                and type(entity.get("start_char")) is int and type(entity.get("end_char")) is int)
+
+    @classmethod
+    def from_ner_result(cls, result: NERResult) -> "CompactNERResult":
+        return cls([[EntitySpan.from_entity(entity) for entity in sentence] for sentence in result.sentences])
+
+    def to_ner_result(self) -> NERResult:
+        return NERResult.model_construct(sentences=[[entity.to_entity() if isinstance(entity, EntitySpan) else entity
+                                                     for entity in sentence]
+                                                    for sentence in self.sentences])
+
+    def to_json(self) -> str:
+        """Сериализует байт-в-байт как NERResult.model_dump_json()"""
+        # Тот же сериализатор pydantic-core, но без построения моделей
+        return pydantic_core.to_json({"sentences": [[{"text": entity.text, 
+                                                      "type": entity.type, 
+                                                      "start_char": entity.start_char, 
+                                                      "end_char": entity.end_char}
+                                                     for entity in sentence]
+                                                    for sentence in self.sentences]}).decode("utf-8")
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, CompactNERResult) and self.sentences == other.sentences
+
+    def __repr__(self) -> str:
+        return f"CompactNERResult(sentences={self.sentences!r})"
@@ -0,0 +1 @@
+from .sqlite_cache import SQLiteCache
@@ -0,0 +1,137 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+
+class SQLiteCache:
+    """Однофайловый персистентный key-value кэш с LRU-вытеснением"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS cache (
+        namespace TEXT NOT NULL,
+        version TEXT NOT NULL,
+        key TEXT NOT NULL,
+        value TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        last_access REAL NOT NULL,
+        PRIMARY KEY (namespace, version, key)
+    );
+    CREATE INDEX IF NOT EXISTS cache_last_access ON cache (last_access);
+    """
+
+    def __init__(self,
+                 path: str | Path,
+                 max_entries: Optional[int] = 1_000_000,
+                 max_size_bytes: Optional[int] = 1024 ** 3,
+                 eviction_check_interval: int = 1000):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.max_size_bytes = max_size_bytes
+        self._eviction_check_interval = eviction_check_interval
+        self._writes_since_check = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(self.SCHEMA)
+        self._connection.commit()
+
+    def get(self, namespace: str, version: str, key: str) -> Optional[str]:
+        return self.get_many(namespace, version, [key]).get(key)
+
+    def get_many(self, namespace: str, version: str, keys: Iterable[str]) -> Dict[str, str]:
+        keys = list(dict.fromkeys(keys))
+        found = {}
+
+        with self._lock:
+            # SQLite ограничивает число параметров в запросе, поэтому читаем порциями
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._connection.execute(
+                    f"SELECT key, value FROM cache WHERE namespace = ? AND version = ? AND key IN ({placeholders})",
+                    (namespace, version, *chunk),
+                ).fetchall()
+                found.update(rows)
+
+            if found:
+                now = time.time()
+                self._connection.executemany(
+                    "UPDATE cache SET last_access = ? WHERE namespace = ? AND version = ? AND key = ?",
+                    [(now, namespace, version, key) for key in found],
+                )
+                self._connection.commit()
+
+        return found
+
+    def set(self, namespace: str, version: str, key: str, value: str):
+        self.set_many(namespace, version, {key: value})
+
+    def set_many(self, namespace: str, version: str, items: Dict[str, str]):
+        if not items:
+            return
+
+        now = time.time()
+
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO cache (namespace, version, key, value, size, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(namespace, version, key, value, len(value.encode("utf-8")), now)
+                 for key, value in items.items()],
+            )
+            self._writes_since_check += len(items)
+
+            if self._writes_since_check >= self._eviction_check_interval:
+                self._evict()
+                self._writes_since_check = 0
+
+            self._connection.commit()
+
+    def invalidate_stale(self, namespace: str, version: str) -> int:
+        """Удаляет записи пространства имен, созданные другой версией модели или промпта (ручная очистка)"""
+        with self._lock:
+            cursor = self._connection.execute(
+                "DELETE FROM cache WHERE namespace = ? AND version != ?", (namespace, version)
+            )
+            self._connection.commit()
+            return cursor.rowcount
+
+    def _evict(self):
+        count, size = self._connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache"
+        ).fetchone()
+
+        excess_entries = count - self.max_entries if self.max_entries is not None else 0
+
+        if excess_entries > 0:
+            self._connection.execute(
+                "DELETE FROM cache WHERE rowid IN (SELECT rowid FROM cache ORDER BY last_access LIMIT ?)",
+                (excess_entries,),
+            )
+            size = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+
+        if self.max_size_bytes is None or size <= self.max_size_bytes:
+            return
+
+        excess_size = size - self.max_size_bytes
+        rows = self._connection.execute("SELECT rowid, size FROM cache ORDER BY last_access")
+        evicted_rowids = []
+
+        for rowid, entry_size in rows:
+            if excess_size <= 0:
+                break
+            evicted_rowids.append((rowid,))
+            excess_size -= entry_size
+
+        self._connection.executemany("DELETE FROM cache WHERE rowid = ?", evicted_rowids)
+
+    def close(self):
+        with self._lock:
+            self._evict()
+            self._connection.commit()
+            self._connection.close()
@@ -1,12 +1,19 @@
+from pathlib import Path
+
 from ner.base.models import LinkingType
 from ner.base.linker import Linker
-from ner.linkers import DBPediaLinker
+from ner.cache import SQLiteCache
+from ner.linkers import DBPediaLinker, LocalDBPediaLinker
 
 class LinkerFactory:
     @classmethod
-    def create_from_linking_type(cls, linking_type: LinkingType, **kwargs) -> Linker:
+    def create_from_linking_type(cls, linking_type: LinkingType, cache_path: str | Path = None, **kwargs) -> Linker:
         match linking_type:
             case LinkingType.DBPEDIA:
-                return DBPediaLinker()
+                cache = SQLiteCache(cache_path) if cache_path is not None else None
+                return DBPediaLinker(cache=cache, **kwargs)
+            case LinkingType.DBPEDIA_LOCAL:
+                # Локальный индекс сам служит кэшем, сеть не используется
+                return LocalDBPediaLinker(**kwargs)
             case _:
-                raise AttributeError(f"{linking_type} linking type is not supported!")
\ No newline at end of file
+                raise AttributeError(f"{linking_type} linking type is not supported!")
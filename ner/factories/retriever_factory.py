@@ -1,29 +1,77 @@
 import os
+from pathlib import Path
 from dotenv import load_dotenv
-from langchain_gigachat import GigaChat
 
 from ner.base.models import NERType
 from ner.base.entity_retriever import EntityRetriever
-from ner.retrievers import StanzaRetriever, LLMRetriever
+from ner.cache import SQLiteCache
+from ner.retrievers import (StanzaRetriever, 
+                            LLMRetriever, 
+                            CachedRetriever, 
+                            CascadeRetriever,
+                            ChunkingRetriever, 
+                            EscalationPolicy,
+                            ProcessPoolRetriever)
 
 
 class RetrieverFactory:
     @classmethod
-    def create_from_ner_type(cls, ner_type: NERType, **kwargs) -> EntityRetriever:
+    def create_from_ner_type(cls, 
+                             ner_type: NERType, 
+                             cache_path: str | Path = None, 
+                             max_chunk_chars: int = None,
+                             max_chunk_tokens: int = None,
+                             **kwargs) -> EntityRetriever:
+        retriever = cls._create_retriever(ner_type, **kwargs)
+
+        if max_chunk_chars is not None or max_chunk_tokens is not None:
+            retriever = ChunkingRetriever(retriever=retriever, 
+                                          max_chars=max_chunk_chars or ChunkingRetriever.DEFAULT_MAX_CHARS,
+                                          max_tokens=max_chunk_tokens)
+
+        if cache_path is not None:
+            retriever = CachedRetriever(retriever=retriever, 
+                                        cache=SQLiteCache(cache_path), 
+                                        namespace=ner_type.value)
+
+        return retriever
+
+    @staticmethod
+    def _create_gigachat():
+        from langchain_gigachat import GigaChat
+
+        load_dotenv()
+        GIGACHAT_API_KEY = os.getenv("GIGACHAT_API_KEY")
+
+        return GigaChat(credentials=GIGACHAT_API_KEY,
+                        model='GigaChat',
+                        verify_ssl_certs=False,
+                        scope='GIGACHAT_API_PERS',
+                        timeout=120
+                    )
+
+    @classmethod
+    def _create_retriever(cls, ner_type: NERType, **kwargs) -> EntityRetriever:
         match ner_type:
             case NERType.STANZA_NLP:
-                return StanzaRetriever()
+                workers = kwargs.pop("workers", 1)
+                torch_threads = kwargs.pop("torch_threads", 1)
+
+                if workers > 1:
+                    return ProcessPoolRetriever(StanzaRetriever, 
+                                                workers=workers, 
+                                                torch_threads=torch_threads, 
+                                                **kwargs)
+
+                return StanzaRetriever(**kwargs)
             case NERType.LLM_GIGACHAT:
-                load_dotenv()
-                GIGACHAT_API_KEY = os.getenv("GIGACHAT_API_KEY")
-
-                gigachat = GigaChat(credentials=GIGACHAT_API_KEY,
-                                    model='GigaChat',
-                                    verify_ssl_certs=False,
-                                    scope='GIGACHAT_API_PERS',
-                                    timeout=120
-                                )
-                
-                return LLMRetriever(llm=gigachat, **kwargs)
+                return LLMRetriever(llm=cls._create_gigachat(), **kwargs)
+            case NERType.STANZA_LLM_CASCADE:
+                # В LLM уходят только ячейки, где результат Stanza выглядит ненадежным
+                return CascadeRetriever(primary=cls._create_retriever(NERType.STANZA_NLP, 
+                                                                      **kwargs.pop("stanza_options", {})),
+                                        fallback=cls._create_retriever(NERType.LLM_GIGACHAT, 
+                                                                       **kwargs.pop("llm_options", {})),
+                                        policy=EscalationPolicy(**kwargs))
             case _:
                 raise AttributeError(f"{ner_type} is not supported!")
\ No newline at end of file
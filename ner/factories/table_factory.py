@@ -1,25 +1,39 @@
 import csv
+import logging
 from pathlib import Path
+from typing import Iterator, List, Tuple
 
 import chardet
+import openpyxl
 import pandas as pd
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+from ner.metrics import metrics
+
+from .table_writer import (TableWriter, 
+                           CSVTableWriter, 
+                           ExcelTableWriter, 
+                           FeatherTableWriter, 
+                           JSONLTableWriter, 
+                           ParquetTableWriter)
+
+
+logger = logging.getLogger(__name__)
 
 
 class TableFactory:
+    CSV_SUFFIXES = (".csv",)
+    EXCEL_SUFFIXES = (".xlsx", ".xls")
+    PARQUET_SUFFIXES = (".parquet",)
+    FEATHER_SUFFIXES = (".feather", ".arrow")
+    JSONL_SUFFIXES = (".jsonl", ".ndjson")
+
+    SNIFF_BYTES = 64 * 1024
+
     @staticmethod
-    def autodetect_separator(csv_file_path: str | Path):
+    def _detect_separator(lines: List[str]) -> str:
         candidates = [',', ';', '\t', '|', ':', ' ']
-
-        # Определяем кодировку файла
-        with open(csv_file_path, 'rb') as f:
-            raw_data = f.read(4096) 
-            # Use chardet to detect the encoding
-            result = chardet.detect(raw_data)        
-            # The result is a dictionary containing the encoding, confidence, and language
-            encoding = result['encoding']
-
-        with open(csv_file_path, 'r', encoding=encoding) as f:
-            lines = [line for line in (f.readline() for _ in range(20)) if line.strip()]
         
         best_delim = ','
         best_score = -1
@@ -44,37 +58,243 @@ class TableFactory:
         
         return best_delim
 
+    @classmethod
+    def sniff_csv(cls, csv_file_path: str | Path) -> Tuple[str, str]:
+        """Определяет кодировку и разделитель CSV за одно чтение начала файла"""
+        with open(csv_file_path, 'rb') as f:
+            raw_data = f.read(cls.SNIFF_BYTES)
+
+        # Кодировка определяется по первым 4 КБ, как и раньше
+        encoding = chardet.detect(raw_data[:4096])['encoding']
+        lines = raw_data.decode(encoding or "utf-8", errors="replace").splitlines()
+
+        # Последняя строка могла оборваться на границе прочитанного блока
+        if len(raw_data) == cls.SNIFF_BYTES and len(lines) > 1:
+            lines = lines[:-1]
+
+        lines = [line for line in lines[:20] if line.strip()]
+
+        return encoding, cls._detect_separator(lines)
+
+    @classmethod
+    def autodetect_separator(cls, csv_file_path: str | Path):
+        return cls.sniff_csv(csv_file_path)[1]
+
+    @classmethod
+    def _csv_options(cls, file_path: Path, sep: str = None) -> Tuple[str, str]:
+        """Разделитель (явный или определенный) и кодировка для read_csv"""
+        encoding, detected_sep = cls.sniff_csv(file_path)
+
+        # По началу файла ASCII не отличить от UTF-8, а кириллица может встретиться дальше
+        if encoding is None or encoding.lower() == "ascii":
+            encoding = "utf-8"
+
+        return sep if sep else detected_sep, encoding
+
     @classmethod
     def create_from_path(cls, file_path: str | Path, **kwargs):
         file_path = Path(file_path)
 
+        with metrics.timer("table_load_seconds", format=file_path.suffix):
+            data_frame = cls._read(file_path, **kwargs)
+
+        if metrics.enabled:
+            metrics.increment("table_bytes_read_total", file_path.stat().st_size, format=file_path.suffix)
+            metrics.increment("table_rows_read_total", len(data_frame), format=file_path.suffix)
+
+        return data_frame
+
+    @classmethod
+    def _read(cls, file_path: Path, **kwargs):
         suffix = file_path.suffix
 
-        if suffix == ".csv":
-            sep = kwargs.get("sep")
-            sep = sep if sep else cls.autodetect_separator(file_path)
-            data_frame = pd.read_csv(file_path, sep=sep)
+        if suffix in cls.CSV_SUFFIXES:
+            sep, encoding = cls._csv_options(file_path, kwargs.get("sep"))
+
+            if kwargs.get("engine") == "pyarrow":
+                # Многопоточный парсер Arrow, строки хранятся в Arrow-колонках, а не в Python-объектах
+                data_frame = pd.read_csv(file_path, sep=sep, encoding=encoding, engine="pyarrow", 
+                                         dtype_backend="pyarrow")
+            else:
+                data_frame = pd.read_csv(file_path, sep=sep, encoding=encoding, memory_map=True)
+
             data_frame._source_separator = sep
             return data_frame
-        elif suffix == ".xlsx" or suffix == ".xls":
+        elif suffix in cls.EXCEL_SUFFIXES:
             return pd.read_excel(file_path)
+        elif suffix in cls.PARQUET_SUFFIXES:
+            return pq.read_table(file_path, memory_map=True).to_pandas()
+        elif suffix in cls.FEATHER_SUFFIXES:
+            # Несжатый Arrow IPC отображается в память без копирования буферов
+            return feather.read_table(file_path, memory_map=True).to_pandas()
+        elif suffix in cls.JSONL_SUFFIXES:
+            return pd.read_json(file_path, lines=True, convert_dates=False)
         else:
             raise RuntimeError("The file format is not supported")
         
+    @classmethod
+    def iter_chunks_from_path(cls, file_path: str | Path, chunk_size: int, **kwargs) -> Iterator[pd.DataFrame]:
+        file_path = Path(file_path)
+
+        suffix = file_path.suffix
+
+        if suffix in cls.CSV_SUFFIXES:
+            sep, encoding = cls._csv_options(file_path, kwargs.get("sep"))
+
+            if kwargs.get("engine") == "pyarrow":
+                logger.warning("pyarrow CSV engine does not support chunked reading, using the C engine")
+
+            with pd.read_csv(file_path, sep=sep, encoding=encoding, chunksize=chunk_size) as reader:
+                for data_frame in reader:
+                    data_frame._source_separator = sep
+                    metrics.increment("table_rows_read_total", len(data_frame), format=suffix)
+                    yield data_frame
+        elif suffix == ".xlsx":
+            for data_frame in cls._iter_excel_chunks(file_path, chunk_size, usecols=kwargs.get("usecols")):
+                metrics.increment("table_rows_read_total", len(data_frame), format=suffix)
+                yield data_frame
+        elif suffix in cls.EXCEL_SUFFIXES:
+            # Старый формат .xls читается только целиком через xlrd
+            data_frame = pd.read_excel(file_path, usecols=kwargs.get("usecols"))
+
+            for start in range(0, len(data_frame), chunk_size):
+                metrics.increment("table_rows_read_total", len(data_frame.iloc[start:start + chunk_size]), format=suffix)
+                yield data_frame.iloc[start:start + chunk_size].copy()
+        elif suffix in cls.PARQUET_SUFFIXES:
+            parquet_file = pq.ParquetFile(file_path, memory_map=True)
+
+            for batch in parquet_file.iter_batches(batch_size=chunk_size):
+                metrics.increment("table_rows_read_total", batch.num_rows, format=suffix)
+                yield batch.to_pandas()
+        elif suffix in cls.FEATHER_SUFFIXES:
+            table = feather.read_table(file_path, memory_map=True)
+
+            for start in range(0, table.num_rows, chunk_size):
+                chunk = table.slice(start, chunk_size)
+                metrics.increment("table_rows_read_total", chunk.num_rows, format=suffix)
+                yield chunk.to_pandas()
+        elif suffix in cls.JSONL_SUFFIXES:
+            with pd.read_json(file_path, lines=True, convert_dates=False, chunksize=chunk_size) as reader:
+                for data_frame in reader:
+                    metrics.increment("table_rows_read_total", len(data_frame), format=suffix)
+                    yield data_frame
+        else:
+            raise RuntimeError("The file format is not supported")
+
+    @staticmethod
+    def _excel_header(row: tuple) -> List:
+        """Имена колонок как у pd.read_excel: пустые заголовки и повторы переименовываются"""
+        columns = []
+        seen = set()
+
+        for idx, name in enumerate(row):
+            name = f"Unnamed: {idx}" if name is None else name
+            candidate, counter = name, 0
+
+            while candidate in seen:
+                counter += 1
+                candidate = f"{name}.{counter}"
+
+            seen.add(candidate)
+            columns.append(candidate)
+
+        return columns
+
+    @classmethod
+    def _iter_excel_chunks(cls, file_path: Path, chunk_size: int, usecols: List = None) -> Iterator[pd.DataFrame]:
+        """Построчно читает первый лист в режиме read-only, не строя объектную модель книги"""
+        workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = next(rows, None)
+
+            if header is None:
+                return
+
+            columns = cls._excel_header(header)
+            indices = [columns.index(column) for column in usecols] if usecols else list(range(len(columns)))
+            columns = [columns[idx] for idx in indices]
+
+            chunk, blank_rows = [], []
+
+            for row in rows:
+                values = tuple(row[idx] if idx < len(row) else None for idx in indices)
+
+                # Пустые строки в конце листа pandas отбрасывает, поэтому они откладываются до следующей непустой
+                if all(value is None for value in row):
+                    blank_rows.append(values)
+                    continue
+
+                chunk.extend(blank_rows)
+                blank_rows = []
+                chunk.append(values)
+
+                if len(chunk) >= chunk_size:
+                    yield pd.DataFrame(chunk[:chunk_size], columns=columns)
+                    chunk = chunk[chunk_size:]
+
+            if chunk:
+                yield pd.DataFrame(chunk, columns=columns)
+        finally:
+            workbook.close()
+
+    @classmethod
+    def create_writer(cls, file_path: str | Path, **kwargs) -> TableWriter:
+        file_path = Path(file_path)
+
+        suffix = file_path.suffix
+
+        if suffix in cls.CSV_SUFFIXES:
+            return CSVTableWriter(file_path, **kwargs)
+        elif suffix == ".xlsx":
+            return ExcelTableWriter(file_path, **kwargs)
+        elif suffix in cls.PARQUET_SUFFIXES:
+            return ParquetTableWriter(file_path, **kwargs)
+        elif suffix in cls.FEATHER_SUFFIXES:
+            return FeatherTableWriter(file_path, **kwargs)
+        elif suffix in cls.JSONL_SUFFIXES:
+            return JSONLTableWriter(file_path, **kwargs)
+        else:
+            raise RuntimeError("The file format is not supported")
+
     @classmethod
     def dump_to_file(cls, data_frame: pd.DataFrame, file_path: str | Path, **kwargs):
         file_path = Path(file_path)
 
+        with metrics.timer("table_dump_seconds", format=file_path.suffix):
+            result = cls._write(data_frame, file_path, **kwargs)
+
+        if metrics.enabled:
+            metrics.increment("table_bytes_written_total", file_path.stat().st_size, format=file_path.suffix)
+            metrics.increment("table_rows_written_total", len(data_frame), format=file_path.suffix)
+
+        return result
+
+    @classmethod
+    def _write(cls, data_frame: pd.DataFrame, file_path: Path, **kwargs):
         suffix = file_path.suffix
 
-        if suffix == ".csv":
+        if suffix in cls.CSV_SUFFIXES:
             kwargs.setdefault("sep", ",")
 
             if hasattr(data_frame, "_source_separator"):
                 kwargs["sep"] = data_frame._source_separator
 
             return data_frame.to_csv(file_path, index=False, **kwargs)
-        elif suffix == ".xlsx" or suffix == ".xls":
+        elif suffix == ".xlsx":
+            # Write-only книга пишет строки потоком, не держа все ячейки в памяти
+            with ExcelTableWriter(file_path, **kwargs) as writer:
+                writer.write(data_frame)
+        elif suffix in cls.EXCEL_SUFFIXES:
             return data_frame.to_excel(file_path, **kwargs)
+        elif suffix in cls.PARQUET_SUFFIXES:
+            return data_frame.to_parquet(file_path, index=False, **kwargs)
+        elif suffix in cls.FEATHER_SUFFIXES:
+            # Без сжатия файл читается через memory mapping без распаковки
+            kwargs.setdefault("compression", "uncompressed")
+            return data_frame.reset_index(drop=True).to_feather(file_path, **kwargs)
+        elif suffix in cls.JSONL_SUFFIXES:
+            return data_frame.to_json(file_path, orient="records", lines=True, force_ascii=False, **kwargs)
         else:
             raise RuntimeError("The file format is not supported")
\ No newline at end of file
@@ -0,0 +1,186 @@
+import os
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+import openpyxl
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from ner.metrics import metrics
+
+
+class TableWriter(ABC):
+    """Инкрементальная запись таблицы по частям; файл появляется на месте только после close"""
+
+    def __init__(self, file_path: str | Path, **kwargs):
+        self.file_path = Path(file_path)
+        # Пишем во временный файл: выходной файл может совпадать с читаемым источником
+        self.tmp_path = self.file_path.with_name(f".{self.file_path.name}.part")
+        self.kwargs = kwargs
+        self.rows_written = 0
+
+    @abstractmethod
+    def write(self, data_frame: pd.DataFrame):
+        pass
+
+    def _finalize(self):
+        pass
+
+    def close(self):
+        with metrics.timer("table_dump_seconds", format=self.file_path.suffix):
+            self._finalize()
+
+        if self.tmp_path.exists():
+            if metrics.enabled:
+                metrics.increment("table_bytes_written_total", self.tmp_path.stat().st_size, 
+                                  format=self.file_path.suffix)
+            os.replace(self.tmp_path, self.file_path)
+
+    def abort(self):
+        if self.tmp_path.exists():
+            self.tmp_path.unlink()
+
+    def __enter__(self) -> "TableWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class CSVTableWriter(TableWriter):
+    def write(self, data_frame: pd.DataFrame):
+        kwargs = dict(self.kwargs)
+        kwargs.setdefault("sep", ",")
+
+        if hasattr(data_frame, "_source_separator"):
+            kwargs["sep"] = data_frame._source_separator
+
+        data_frame.to_csv(self.tmp_path, 
+                          index=False, 
+                          mode="w" if self.rows_written == 0 else "a",
+                          header=self.rows_written == 0,
+                          **kwargs)
+        self.rows_written += len(data_frame)
+        metrics.increment("table_rows_written_total", len(data_frame), format=self.file_path.suffix)
+
+
+class ExcelTableWriter(TableWriter):
+    """Пишет .xlsx через write-only книгу openpyxl: строки уходят в файл по мере записи частей"""
+
+    def __init__(self, file_path: str | Path, sheet_name: str = "Sheet1", index: bool = True, **kwargs):
+        super().__init__(file_path, **kwargs)
+        self.tmp_path = self.file_path.with_name(f".{self.file_path.stem}.part{self.file_path.suffix}")
+        self.sheet_name = sheet_name
+        # Как и to_excel, по умолчанию первой колонкой пишется сквозной номер строки
+        self.index = index
+        self._workbook = None
+        self._sheet = None
+
+    def write(self, data_frame: pd.DataFrame):
+        if self._workbook is None:
+            self._workbook = openpyxl.Workbook(write_only=True)
+            self._sheet = self._workbook.create_sheet(self.sheet_name)
+            self._sheet.append(([None] if self.index else []) + list(data_frame.columns))
+
+        values = data_frame.astype(object).where(data_frame.notna(), None)
+
+        for row_idx, row in enumerate(values.itertuples(index=False, name=None), start=self.rows_written):
+            self._sheet.append(((row_idx,) if self.index else ()) + row)
+
+        self.rows_written += len(data_frame)
+        metrics.increment("table_rows_written_total", len(data_frame), format=self.file_path.suffix)
+
+    def _finalize(self):
+        if self._workbook is not None:
+            self._workbook.save(self.tmp_path)
+            self._workbook = None
+
+
+class ArrowTableWriter(TableWriter):
+    """Общая часть для колоночных форматов: схема фиксируется по первой части, следующие приводятся к ней"""
+
+    def __init__(self, file_path: str | Path, **kwargs):
+        super().__init__(file_path, **kwargs)
+        self.schema = None
+        self._writer = None
+
+    @abstractmethod
+    def _open(self, schema: pa.Schema):
+        pass
+
+    @staticmethod
+    def _first_schema(table: pa.Table) -> pa.Schema:
+        schema = table.schema
+
+        # Колонка, пустая во всей первой части (из CSV она читается как float64 из NaN),
+        # не должна запрещать строки в следующих частях
+        for idx, field in enumerate(schema):
+            column = table.column(idx)
+
+            if pa.types.is_null(field.type) or (len(column) and column.null_count == len(column)):
+                schema = schema.set(idx, field.with_type(pa.string()))
+
+        return schema
+
+    def _conform(self, table: pa.Table) -> pa.Table:
+        columns = []
+
+        for field in self.schema:
+            column = table.column(field.name)
+
+            if column.type != field.type:
+                # Пустая колонка части приводится к любому типу, остальные — обычным приведением Arrow
+                column = (pa.nulls(len(column), field.type) if column.null_count == len(column) 
+                          else column.cast(field.type))
+
+            columns.append(column)
+
+        return pa.Table.from_arrays(columns, schema=self.schema)
+
+    def write(self, data_frame: pd.DataFrame):
+        table = pa.Table.from_pandas(data_frame, preserve_index=False)
+
+        if self.schema is None:
+            self.schema = self._first_schema(table)
+            self._writer = self._open(self.schema)
+
+        self._writer.write_table(self._conform(table))
+        self.rows_written += len(data_frame)
+        metrics.increment("table_rows_written_total", len(data_frame), format=self.file_path.suffix)
+
+    def _finalize(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def abort(self):
+        self._finalize()
+        super().abort()
+
+
+class ParquetTableWriter(ArrowTableWriter):
+    def _open(self, schema: pa.Schema):
+        return pq.ParquetWriter(self.tmp_path, schema, **self.kwargs)
+
+
+class FeatherTableWriter(ArrowTableWriter):
+    """Пишет несжатый Arrow IPC (Feather v2), который читается через memory mapping"""
+
+    def _open(self, schema: pa.Schema):
+        return pa.ipc.new_file(self.tmp_path, schema)
+
+
+class JSONLTableWriter(TableWriter):
+    def write(self, data_frame: pd.DataFrame):
+        data_frame.to_json(self.tmp_path, 
+                           orient="records", 
+                           lines=True, 
+                           force_ascii=False,
+                           mode="w" if self.rows_written == 0 else "a",
+                           **self.kwargs)
+        self.rows_written += len(data_frame)
+        metrics.increment("table_rows_written_total", len(data_frame), format=self.file_path.suffix)
@@ -1 +1,3 @@
-from .dbpedia_linker import DBPediaLinker
\ No newline at end of file
+from .dbpedia_index import DBPediaIndex
+from .dbpedia_linker import DBPediaLinker, LinkingUnavailableError
+from .local_dbpedia_linker import LocalDBPediaLinker
\ No newline at end of file
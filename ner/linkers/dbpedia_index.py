@@ -0,0 +1,312 @@
+import bz2
+import gzip
+import hashlib
+import json
+import logging
+import mmap
+import os
+import re
+import sys
+from array import array
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+RDFS_LABEL = "http://www.w3.org/2000/01/rdf-schema#label"
+WIKI_PAGE_REDIRECTS = "http://dbpedia.org/ontology/wikiPageRedirects"
+
+NTRIPLE = re.compile(r'^<([^>]*)>\s+<([^>]*)>\s+(?:<([^>]*)>|"((?:[^"\\]|\\.)*)"(?:@([\w-]+)|\^\^<[^>]*>)?)\s*\.\s*$')
+LITERAL_ESCAPE = re.compile(r'\\(u[0-9A-Fa-f]{4}|U[0-9A-Fa-f]{8}|.)')
+LITERAL_ESCAPES = {"t": "\t", "b": "\b", "n": "\n", "r": "\r", "f": "\f", '"': '"', "'": "'", "\\": "\\"}
+
+
+def normalize_label(text: str) -> str:
+    """Ключ индекса: регистр, ё/е, подчеркивания и пробелы не различаются"""
+    return " ".join(text.replace("_", " ").casefold().replace("ё", "е").split())
+
+
+def _unescape_literal(value: str) -> str:
+    def replace(match: re.Match) -> str:
+        escape = match.group(1)
+        if escape[0] in "uU" and len(escape) > 1:
+            return chr(int(escape[1:], 16))
+        return LITERAL_ESCAPES.get(escape, escape)
+
+    return LITERAL_ESCAPE.sub(replace, value) if "\\" in value else value
+
+
+def _open_dump(path: Path):
+    if path.suffix == ".bz2":
+        return bz2.open(path, "rt", encoding="utf-8", errors="replace")
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, "r", encoding="utf-8", errors="replace")
+
+
+def parse_dump(path: str | Path, lang: str = "ru") -> Iterator[Tuple[str, str, str]]:
+    """Читает N-Triples/Turtle дамп DBpedia и возвращает ("L", ресурс, метка) и ("R", ресурс, цель редиректа)"""
+    with _open_dump(Path(path)) as f:
+        for line in f:
+            match = NTRIPLE.match(line)
+
+            if match is None:
+                continue
+
+            subject, predicate, target, literal, literal_lang = match.groups()
+
+            if predicate == RDFS_LABEL and literal is not None:
+                if literal_lang is None or literal_lang.split("-")[0] == lang:
+                    yield "L", subject, _unescape_literal(literal)
+            elif predicate == WIKI_PAGE_REDIRECTS and target is not None:
+                yield "R", subject, target
+
+
+class DBPediaIndex:
+    """Отсортированная таблица нормализованных меток и ранжированных ресурсов, читаемая через mmap
+
+    Файлы индекса: keys.bin и values.bin (UTF-8 строки подряд) и offsets.bin — массив uint64
+    из n + 1 смещений ключей и n + 1 смещений значений. Поиск — бинарный по ключам.
+    """
+
+    FORMAT_VERSION = 1
+    KEYS_FILE = "keys.bin"
+    VALUES_FILE = "values.bin"
+    OFFSETS_FILE = "offsets.bin"
+    META_FILE = "meta.json"
+    SEGMENTS_DIR = "segments"
+
+    def __init__(self, index_dir: str | Path):
+        self.index_dir = Path(index_dir)
+
+        with open(self.index_dir / self.META_FILE, "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+
+        if self.meta["format"] != self.FORMAT_VERSION or self.meta["byteorder"] != sys.byteorder:
+            raise RuntimeError(f"Index {self.index_dir} has incompatible format, rebuild it")
+
+        self._files = []
+        self._maps = []
+        self.entries = self.meta["entries"]
+        self._keys = self._map(self.KEYS_FILE)
+        self._values = self._map(self.VALUES_FILE)
+        # Смещения читаются прямо из отображенного файла, без копирования в память процесса
+        self._offsets = memoryview(self._map(self.OFFSETS_FILE)).cast("Q")
+        self._key_offsets = self._offsets[:self.entries + 1]
+        self._value_offsets = self._offsets[self.entries + 1:]
+
+    def _map(self, name: str):
+        path = self.index_dir / name
+
+        if path.stat().st_size == 0:
+            return b""
+
+        f = open(path, "rb")
+        self._files.append(f)
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        return mapped
+
+    @property
+    def build_id(self) -> str:
+        return self.meta["build_id"]
+
+    def __len__(self) -> int:
+        return self.entries
+
+    def _key(self, idx: int) -> bytes:
+        return self._keys[self._key_offsets[idx]:self._key_offsets[idx + 1]]
+
+    def lookup(self, label: str) -> List[str]:
+        """Возвращает ресурсы для метки в порядке ранга; пустой список, если метки нет"""
+        key = normalize_label(label).encode("utf-8")
+        low, high = 0, self.entries
+
+        while low < high:
+            middle = (low + high) // 2
+
+            if self._key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        if low == self.entries or self._key(low) != key:
+            return []
+
+        value = self._values[self._value_offsets[low]:self._value_offsets[low + 1]]
+        return value.decode("utf-8").split("\n")
+
+    def close(self):
+        # Отображение нельзя закрыть, пока на него ссылаются memoryview
+        for view in (self._key_offsets, self._value_offsets, self._offsets):
+            view.release()
+
+        for mapped in self._maps:
+            mapped.close()
+
+        for f in self._files:
+            f.close()
+
+        self._maps, self._files = [], []
+
+    @classmethod
+    def _source_fingerprint(cls, path: Path) -> Dict:
+        stat = path.stat()
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    @classmethod
+    def _segment_path(cls, index_dir: Path, source: str) -> Path:
+        return index_dir / cls.SEGMENTS_DIR / f"{hashlib.sha1(source.encode('utf-8')).hexdigest()}.tsv"
+
+    @classmethod
+    def _write_segment(cls, source: Path, segment_path: Path, lang: str):
+        """Разобранные тройки одного дампа; при пересборке неизмененные дампы не читаются повторно"""
+        tmp_path = segment_path.with_suffix(".part")
+
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for kind, subject, value in parse_dump(source, lang=lang):
+                value = value.replace("\t", " ").replace("\n", " ")
+                f.write(f"{kind}\t{subject}\t{value}\n")
+
+        os.replace(tmp_path, segment_path)
+
+    @classmethod
+    def _read_segments(cls, segment_paths: List[Path]) -> Tuple[List[Tuple[str, str]], Dict[str, str]]:
+        labels, redirects = [], {}
+
+        for segment_path in segment_paths:
+            with open(segment_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    kind, subject, value = line.rstrip("\n").split("\t", 2)
+
+                    if kind == "L":
+                        labels.append((subject, value))
+                    else:
+                        redirects[subject] = value
+
+        return labels, redirects
+
+    @staticmethod
+    def _resolve(resource: str, redirects: Dict[str, str], max_hops: int = 5) -> str:
+        for _ in range(max_hops):
+            target = redirects.get(resource)
+
+            if target is None or target == resource:
+                break
+
+            resource = target
+
+        return resource
+
+    @classmethod
+    def _rank(cls, labels: List[Tuple[str, str]], redirects: Dict[str, str],
+              max_candidates: int) -> Dict[bytes, List[str]]:
+        # Популярность ресурса оценивается числом редиректов на него
+        popularity = defaultdict(int)
+        for source in redirects:
+            popularity[cls._resolve(source, redirects)] += 1
+
+        scores = defaultdict(dict)
+        for resource, label in labels:
+            key = normalize_label(label)
+
+            if not key:
+                continue
+
+            # Собственная метка страницы важнее метки редиректа на нее
+            score = 1 if resource in redirects else 2
+            target = cls._resolve(resource, redirects)
+            candidates = scores[key]
+            candidates[target] = max(candidates.get(target, 0), score)
+
+        return {key.encode("utf-8"): [target for target, _ in sorted(candidates.items(),
+                                                                     key=lambda item: (-item[1],
+                                                                                       -popularity[item[0]],
+                                                                                       item[0]))][:max_candidates]
+                for key, candidates in scores.items()}
+
+    @classmethod
+    def _write_tables(cls, index_dir: Path, ranked: Dict[bytes, List[str]]):
+        keys = sorted(ranked)
+        key_offsets, value_offsets = array("Q", [0]), array("Q", [0])
+
+        with open(index_dir / f"{cls.KEYS_FILE}.part", "wb") as keys_file, \
+             open(index_dir / f"{cls.VALUES_FILE}.part", "wb") as values_file:
+            for key in keys:
+                keys_file.write(key)
+                key_offsets.append(key_offsets[-1] + len(key))
+
+                value = "\n".join(ranked[key]).encode("utf-8")
+                values_file.write(value)
+                value_offsets.append(value_offsets[-1] + len(value))
+
+        with open(index_dir / f"{cls.OFFSETS_FILE}.part", "wb") as offsets_file:
+            key_offsets.tofile(offsets_file)
+            value_offsets.tofile(offsets_file)
+
+        for name in (cls.KEYS_FILE, cls.VALUES_FILE, cls.OFFSETS_FILE):
+            os.replace(index_dir / f"{name}.part", index_dir / name)
+
+        return len(keys)
+
+    @classmethod
+    def build(cls,
+              sources: List[str | Path],
+              index_dir: str | Path,
+              lang: str = "ru",
+              max_candidates: int = 5) -> "DBPediaIndex":
+        """Строит индекс или пересобирает его, перечитывая только изменившиеся дампы"""
+        index_dir = Path(index_dir)
+        (index_dir / cls.SEGMENTS_DIR).mkdir(parents=True, exist_ok=True)
+
+        meta_path = index_dir / cls.META_FILE
+        previous = {}
+
+        if meta_path.exists():
+            with open(meta_path, "r", encoding="utf-8") as f:
+                previous = json.load(f)
+
+        settings = {"format": cls.FORMAT_VERSION, "lang": lang, "max_candidates": max_candidates}
+        reuse_segments = previous.get("lang") == lang
+        fingerprints = {}
+        parsed = 0
+
+        for source in sources:
+            source = Path(source).resolve()
+            fingerprint = cls._source_fingerprint(source)
+            segment_path = cls._segment_path(index_dir, str(source))
+
+            if not (reuse_segments and previous.get("sources", {}).get(str(source)) == fingerprint
+                    and segment_path.exists()):
+                logger.info(f"Parsing DBpedia dump {source}")
+                cls._write_segment(source, segment_path, lang)
+                parsed += 1
+
+            fingerprints[str(source)] = fingerprint
+
+        for removed in set(previous.get("sources", {})) - set(fingerprints):
+            cls._segment_path(index_dir, removed).unlink(missing_ok=True)
+
+        build_id = hashlib.sha256(json.dumps([settings, fingerprints], sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+        if previous.get("build_id") == build_id and all((index_dir / name).exists()
+                                                        for name in (cls.KEYS_FILE, cls.VALUES_FILE, cls.OFFSETS_FILE)):
+            logger.info(f"DBpedia index {index_dir} is up to date")
+            return cls(index_dir)
+
+        labels, redirects = cls._read_segments([cls._segment_path(index_dir, source) for source in fingerprints])
+        entries = cls._write_tables(index_dir, cls._rank(labels, redirects, max_candidates))
+
+        meta = dict(settings, byteorder=sys.byteorder, entries=entries, build_id=build_id, sources=fingerprints)
+        tmp_meta_path = meta_path.with_suffix(".part")
+
+        with open(tmp_meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+        os.replace(tmp_meta_path, meta_path)
+        logger.info(f"Built DBpedia index {index_dir}: {entries} labels, {parsed}/{len(fingerprints)} dumps parsed")
+
+        return cls(index_dir)
@@ -1,9 +1,25 @@
 import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from ner.base.models import LinkedEntity, Entity
 from ner.base.linker import Linker
+from ner.cache import SQLiteCache
+from ner.metrics import metrics
+from ner.utils import TokenBucket, CircuitBreaker, CircuitOpenError, exponential_backoff
+
+
+logger = logging.getLogger(__name__)
+
+
+class LinkingUnavailableError(RuntimeError):
+    """DBpedia не ответила: сущность не связана, и строка не должна считаться обработанной"""
 
 
 class DBPediaLinker(Linker):
@@ -13,16 +29,184 @@ class DBPediaLinker(Linker):
         "format": "json",
         "lang": "ru"
     }
+    NOT_FOUND = "NOT FOUND"
+    CACHE_NAMESPACE = "DBPEDIA"
+    RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+    CIRCUIT_POLL_INTERVAL = 0.5
 
-    def link(self, entity: Entity) -> LinkedEntity:
+    def __init__(self,
+                 base_url: str = DB_PEDIA_BASE_URL,
+                 timeout: float = 10.0,
+                 pool_size: int = 16,
+                 memory_cache_size: int = 100_000,
+                 cache: Optional[SQLiteCache] = None,
+                 rate_limit: Optional[float] = None,
+                 max_retries: int = 3,
+                 backoff_base: float = 0.5,
+                 backoff_max: float = 30.0,
+                 circuit_breaker: Optional[CircuitBreaker] = None,
+                 max_circuit_wait: float = 300.0):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.cache = cache
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_limiter = TokenBucket(rate_limit) if rate_limit else None
+        self.circuit_breaker = circuit_breaker if circuit_breaker is not None else CircuitBreaker()
+        self.max_circuit_wait = max_circuit_wait
+        self._memory_cache_size = memory_cache_size
+        self._memory_cache = OrderedDict()
+        self._memory_cache_lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @property
+    def cache_version(self) -> str:
+        return f"{self.base_url}:{self.QUERY_PARAMS['lang']}"
+
+    def _get_cached(self, query: str) -> Optional[str]:
+        with self._memory_cache_lock:
+            if query in self._memory_cache:
+                self._memory_cache.move_to_end(query)
+                metrics.increment("nel_cache_hits_total", level="memory")
+                return self._memory_cache[query]
+
+        if self.cache is not None:
+            resource = self.cache.get(self.CACHE_NAMESPACE, self.cache_version, query)
+
+            if resource is not None:
+                self._remember(query, resource)
+                metrics.increment("nel_cache_hits_total", level="persistent")
+                return resource
+
+        metrics.increment("nel_cache_misses_total")
+        return None
+
+    def _remember(self, query: str, resource: str):
+        with self._memory_cache_lock:
+            self._memory_cache[query] = resource
+            self._memory_cache.move_to_end(query)
+
+            while len(self._memory_cache) > self._memory_cache_size:
+                self._memory_cache.popitem(last=False)
+
+    def _wait_before_retry(self, response: Optional[requests.Response], attempt: int):
+        if attempt >= self.max_retries:
+            return
+
+        metrics.increment("dbpedia_http_retries_total")
+
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+
+        try:
+            delay = min(self.backoff_max, float(retry_after))
+        except (TypeError, ValueError):
+            delay = exponential_backoff(attempt, base=self.backoff_base, maximum=self.backoff_max)
+
+        time.sleep(delay)
+
+    def _wait_for_circuit(self, query: str):
+        """Пока цепь разомкнута, запрос откладывается, а не превращается в NOT FOUND"""
+        waited = 0.0
+
+        while True:
+            try:
+                self.circuit_breaker.before_call()
+                return
+            except CircuitOpenError as e:
+                delay = max(self.circuit_breaker.retry_in(), self.CIRCUIT_POLL_INTERVAL)
+
+                if waited + delay > self.max_circuit_wait:
+                    metrics.increment("dbpedia_circuit_open_total")
+                    raise LinkingUnavailableError(f"DBpedia is unavailable, {query!r} is not linked: {e}") from e
+
+                metrics.increment("dbpedia_circuit_waits_total")
+                logger.warning(f"{e}. Waiting {delay:.1f}s before linking {query!r}.")
+                time.sleep(delay)
+                waited += delay
+
+    def _fetch(self, query: str) -> Optional[str]:
+        """Запрашивает DBpedia Lookup; None — если ответ получен, но не разобран
+
+        Если DBpedia недоступна (исчерпаны повторы или цепь разомкнута слишком долго),
+        поднимается LinkingUnavailableError: результат «не спрашивали» не выдается за NOT FOUND.
+        """
         query_params = self.QUERY_PARAMS.copy()
-        query_params['query'] = entity.text
-        result_raw = requests.get(self.DB_PEDIA_BASE_URL, params=query_params) 
-        query_result = json.loads(result_raw.text)
+        query_params['query'] = query
+
+        for attempt in range(self.max_retries + 1):
+            self._wait_for_circuit(query)
+
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+
+            try:
+                metrics.increment("dbpedia_http_requests_total")
+
+                with metrics.timer("dbpedia_http_seconds"):
+                    result_raw = self.session.get(self.base_url, params=query_params, timeout=self.timeout)
+
+                metrics.increment("dbpedia_http_bytes_read_total", len(result_raw.content))
+            except requests.RequestException as e:
+                metrics.increment("dbpedia_http_errors_total", reason=type(e).__name__)
+                self.circuit_breaker.record_failure()
+                logger.warning(f"Error while linking {query!r}: {e}. Error type: {type(e).__name__}. Try {attempt}.")
+                self._wait_before_retry(None, attempt)
+                continue
+
+            if result_raw.status_code in self.RETRY_STATUS_CODES:
+                self.circuit_breaker.record_failure()
+                metrics.increment("dbpedia_http_errors_total", reason=str(result_raw.status_code))
+
+                if result_raw.status_code == 429 and self.rate_limiter is not None:
+                    self.rate_limiter.penalize()
+
+                logger.warning(f"DBpedia responded {result_raw.status_code} for {query!r}. Try {attempt}.")
+                self._wait_before_retry(result_raw, attempt)
+                continue
+
+            self.circuit_breaker.record_success()
+
+            if self.rate_limiter is not None:
+                self.rate_limiter.reward()
 
-        if len(query_result["docs"]) >= 1:
-            best_score_resource = str(query_result["docs"][0]["resource"])
-        else:
-            best_score_resource = "NOT FOUND"
+            try:
+                result_raw.raise_for_status()
+                query_result = json.loads(result_raw.text)
 
-        return LinkedEntity(entity=entity, link=best_score_resource)
\ No newline at end of file
+                if len(query_result["docs"]) >= 1:
+                    return str(query_result["docs"][0]["resource"])
+            except (requests.RequestException, json.JSONDecodeError, KeyError, IndexError, TypeError) as e:
+                logger.error(f"Error while linking {query!r}: {e}. Error type: {type(e).__name__}.")
+                return None
+
+            return self.NOT_FOUND
+
+        metrics.increment("dbpedia_link_failures_total")
+        raise LinkingUnavailableError(f"Failed to link {query!r} after {self.max_retries} retries")
+
+    def lookup(self, query: str) -> str:
+        resource = self._get_cached(query)
+
+        if resource is not None:
+            return resource
+
+        resource = self._fetch(query)
+
+        # Неразобранный ответ не кэшируем, чтобы при следующем запуске запрос был повторен
+        if resource is None:
+            return self.NOT_FOUND
+
+        self._remember(query, resource)
+
+        if self.cache is not None:
+            self.cache.set(self.CACHE_NAMESPACE, self.cache_version, query, resource)
+
+        return resource
+
+    def link(self, entity: Entity) -> LinkedEntity:
+        return LinkedEntity(entity=entity, link=self.lookup(entity.text))
@@ -0,0 +1,47 @@
+from pathlib import Path
+from typing import List, Optional
+
+from ner.base.models import LinkedEntity, Entity
+from ner.base.linker import Linker
+from ner.metrics import metrics
+
+from .dbpedia_index import DBPediaIndex
+
+
+class LocalDBPediaLinker(Linker):
+    """Связывание по локальному индексу меток DBpedia без обращения к сети"""
+    NOT_FOUND = "NOT FOUND"
+
+    def __init__(self,
+                 index_path: str | Path,
+                 dump_paths: Optional[List[str | Path]] = None,
+                 lang: str = "ru",
+                 max_candidates: int = 5):
+        # Если переданы дампы, индекс дособирается по изменившимся файлам
+        if dump_paths:
+            self.index = DBPediaIndex.build(dump_paths, index_path, lang=lang, max_candidates=max_candidates)
+        else:
+            self.index = DBPediaIndex(index_path)
+
+    @property
+    def cache_version(self) -> str:
+        return f"local:{self.index.build_id}"
+
+    def candidates(self, query: str) -> List[str]:
+        return self.index.lookup(query)
+
+    def lookup(self, query: str) -> str:
+        candidates = self.index.lookup(query)
+        metrics.increment("nel_local_lookups_total", found=str(bool(candidates)).lower())
+
+        if not candidates:
+            return self.NOT_FOUND
+
+        # Тот же формат ссылки, что и у DBPediaLinker: Lookup API отдает resource списком
+        return str([candidates[0]])
+
+    def link(self, entity: Entity) -> LinkedEntity:
+        return LinkedEntity(entity=entity, link=self.lookup(entity.text))
+
+    def close(self):
+        self.index.close()
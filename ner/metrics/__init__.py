@@ -0,0 +1,2 @@
+from .registry import MetricsRegistry, metrics
+from .instrumented import InstrumentedRetriever, InstrumentedLinker
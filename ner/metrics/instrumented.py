@@ -0,0 +1,48 @@
+from typing import List
+
+from ner.base.entity_retriever import EntityRetriever
+from ner.base.linker import Linker
+from ner.base.models import Entity, LinkedEntity
+
+from .registry import metrics
+
+
+class InstrumentedRetriever(EntityRetriever):
+    def __init__(self, retriever: EntityRetriever, name: str = None):
+        self.retriever = retriever
+        self.name = name or type(retriever).__name__
+
+    @property
+    def cache_version(self) -> str:
+        return self.retriever.cache_version
+
+    def retrieve(self, text: str) -> List[List[Entity]]:
+        metrics.increment("ner_texts_total", retriever=self.name)
+
+        with metrics.timer("ner_retrieve_seconds", retriever=self.name):
+            return self.retriever.retrieve(text)
+
+    def retrieve_batch(self, texts: List[str]) -> List[List[List[Entity]]]:
+        metrics.increment("ner_texts_total", len(texts), retriever=self.name)
+        metrics.increment("ner_batches_total", retriever=self.name)
+
+        with metrics.timer("ner_retrieve_batch_seconds", retriever=self.name):
+            return self.retriever.retrieve_batch(texts)
+
+
+class InstrumentedLinker(Linker):
+    def __init__(self, linker: Linker, name: str = None):
+        self.linker = linker
+        self.name = name or type(linker).__name__
+
+    def link(self, entity: Entity) -> LinkedEntity:
+        metrics.increment("nel_entities_total", linker=self.name)
+
+        with metrics.timer("nel_link_seconds", linker=self.name):
+            return self.linker.link(entity)
+
+    def link_batch(self, entities: List[Entity]) -> List[LinkedEntity]:
+        metrics.increment("nel_entities_total", len(entities), linker=self.name)
+
+        with metrics.timer("nel_link_batch_seconds", linker=self.name):
+            return self.linker.link_batch(entities)
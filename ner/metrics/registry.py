@@ -0,0 +1,183 @@
+import bisect
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Tuple
+
+
+LabelsKey = Tuple[Tuple[str, str], ...]
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля по верхней границе бакета"""
+        if self.count == 0:
+            return 0.0
+
+        rank = q * self.count
+        cumulative = 0
+
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+
+        return float("inf")
+
+
+class MetricsRegistry:
+    """Счетчики и гистограммы задержек; при выключенном реестре вызовы сводятся к одной проверке флага"""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._counters: Dict[str, Dict[LabelsKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelsKey, Histogram]] = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    def enable(self):
+        self.enabled = True
+
+    def reset(self):
+        with self._lock:
+            self._counters = {}
+            self._histograms = {}
+
+    @staticmethod
+    def _labels_key(labels: Dict[str, str]) -> LabelsKey:
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def increment(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+
+        key = self._labels_key(labels)
+
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+
+        key = self._labels_key(labels)
+
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+
+            if key not in series:
+                series[key] = Histogram()
+
+            series[key].observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        if not self.enabled:
+            yield
+            return
+
+        started_at = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started_at, **labels)
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            counters = {name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                        for name, series in self._counters.items()}
+            histograms = {name: [{"labels": dict(key),
+                                  "count": histogram.count,
+                                  "sum": round(histogram.sum, 6),
+                                  "p50": histogram.quantile(0.5),
+                                  "p95": histogram.quantile(0.95),
+                                  "p99": histogram.quantile(0.99),
+                                  "buckets": dict(zip([str(bound) for bound in histogram.buckets] + ["+Inf"], 
+                                                      histogram.counts))}
+                                 for key, histogram in series.items()]
+                          for name, series in self._histograms.items()}
+
+        return {"counters": counters, "histograms": histograms}
+
+    def dump_json(self, file_path: str | Path):
+        Path(file_path).write_text(json.dumps(self.to_dict(), ensure_ascii=False, indent=2), encoding="utf-8")
+
+    @staticmethod
+    def _format_labels(key: LabelsKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        labels = key + extra
+
+        if not labels:
+            return ""
+
+        escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+        return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + "}"
+
+    def to_prometheus(self) -> str:
+        """Текстовый формат экспозиции Prometheus"""
+        lines = []
+
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                for key, value in series.items():
+                    lines.append(f"{name}{self._format_labels(key)} {value}")
+
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in series.items():
+                    cumulative = 0
+                    for bound, count in zip(list(histogram.buckets) + [float("inf")], histogram.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else str(bound)
+                        lines.append(f"{name}_bucket{self._format_labels(key, (('le', le),))} {cumulative}")
+                    lines.append(f"{name}_sum{self._format_labels(key)} {histogram.sum}")
+                    lines.append(f"{name}_count{self._format_labels(key)} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+    def start_http_server(self, port: int, host: str = "127.0.0.1"):
+        """Отдает метрики в формате Prometheus по GET /metrics во время запуска"""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.to_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop_http_server(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1 @@
+from .entity_table import ENTITY_TABLE_SCHEMA, EntityTableWriter, read_entity_table
@@ -0,0 +1,114 @@
+import os
+from pathlib import Path
+from typing import List, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+from ner.base.models import CompactNERResult, LinkingResult
+
+
+ENTITY_TABLE_SCHEMA = pa.schema([
+    ("row_id", pa.int64()),
+    ("column", pa.dictionary(pa.int32(), pa.string())),
+    ("sentence_idx", pa.int32()),
+    ("entity_idx", pa.int32()),
+    ("text", pa.string()),
+    ("type", pa.dictionary(pa.int32(), pa.string())),
+    ("start_char", pa.int32()),
+    ("end_char", pa.int32()),
+    ("link", pa.string()),
+])
+
+ARROW_SUFFIXES = (".arrow", ".feather", ".ipc")
+
+
+class EntityTableWriter:
+    """Пишет плоскую типизированную таблицу сущностей (одна строка на сущность) в Parquet или Arrow IPC
+
+    С merge=True строки колонок, которые не записывались в этом запуске, сохраняются из существующего
+    файла: так эталонные NER_X и предсказанные NER_X_EST колонки оказываются в одной таблице.
+    """
+
+    def __init__(self, file_path: str | Path, merge: bool = False):
+        self.file_path = Path(file_path)
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        self.merge = merge
+        self._columns = set()
+        # Пишем во временный файл: при merge существующая таблица читается только в close
+        self.tmp_path = self.file_path.with_name(f".{self.file_path.stem}.part{self.file_path.suffix}")
+
+        if self.file_path.suffix == ".parquet":
+            self._writer = pq.ParquetWriter(self.tmp_path, ENTITY_TABLE_SCHEMA)
+        elif self.file_path.suffix in ARROW_SUFFIXES:
+            self._sink = pa.OSFile(str(self.tmp_path), "wb")
+            self._writer = ipc.new_file(self._sink, ENTITY_TABLE_SCHEMA)
+        else:
+            raise RuntimeError("The entity table format is not supported")
+
+    def write(self, 
+              column: str, 
+              ner_results: List[CompactNERResult], 
+              linking_results: Optional[List[LinkingResult]] = None,
+              row_offset: int = 0):
+        self._columns.add(column)
+        columns = {name: [] for name in ENTITY_TABLE_SCHEMA.names}
+
+        for row_idx, ner_result in enumerate(ner_results):
+            links = linking_results[row_idx].sentences if linking_results is not None else None
+
+            for sentence_idx, sentence in enumerate(ner_result.sentences):
+                for entity_idx, entity in enumerate(sentence):
+                    columns["row_id"].append(row_offset + row_idx)
+                    columns["sentence_idx"].append(sentence_idx)
+                    columns["entity_idx"].append(entity_idx)
+                    columns["text"].append(entity.text)
+                    columns["type"].append(entity.type)
+                    columns["start_char"].append(entity.start_char)
+                    columns["end_char"].append(entity.end_char)
+                    columns["link"].append(links[sentence_idx][entity_idx] if links is not None else None)
+
+        columns["column"] = [column] * len(columns["row_id"])
+
+        if columns["row_id"]:
+            self._writer.write_table(pa.Table.from_pydict(columns, schema=ENTITY_TABLE_SCHEMA))
+
+    def _write_previous_columns(self):
+        previous = read_entity_table(self.file_path)
+        keep = pc.invert(pc.is_in(previous["column"].cast(pa.string()), 
+                                  value_set=pa.array(sorted(self._columns), pa.string())))
+        previous = previous.filter(keep)
+
+        if previous.num_rows:
+            self._writer.write_table(previous.select(ENTITY_TABLE_SCHEMA.names).cast(ENTITY_TABLE_SCHEMA))
+
+    def close(self):
+        if self.merge and self.file_path.exists():
+            self._write_previous_columns()
+
+        self._writer.close()
+
+        if hasattr(self, "_sink"):
+            self._sink.close()
+
+        os.replace(self.tmp_path, self.file_path)
+
+    def __enter__(self) -> "EntityTableWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def read_entity_table(file_path: str | Path) -> pa.Table:
+    """Читает таблицу сущностей через memory map, не копируя данные в память процесса"""
+    file_path = Path(file_path)
+
+    if file_path.suffix == ".parquet":
+        return pq.read_table(file_path, memory_map=True)
+    elif file_path.suffix in ARROW_SUFFIXES:
+        return ipc.open_file(pa.memory_map(str(file_path), "r")).read_all()
+    else:
+        raise RuntimeError("The entity table format is not supported")
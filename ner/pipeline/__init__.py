@@ -0,0 +1,8 @@
+from .deduplication import CellFilter, DeduplicationStage, DeduplicationStats
+from .checkpoint import RunJournal
+from .pipelined import PipelinedExecutor, PipelineStats
+from .normalization import (NormalizationStage, 
+                            NormalizationStats, 
+                            RuleBasedNormalizer, 
+                            StanzaLemmaNormalizer, 
+                            SurfaceNormalizer)
@@ -0,0 +1,107 @@
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+class RunJournal:
+    """Журнал завершенных диапазонов строк с результатами NER/NEL для возобновления запуска"""
+
+    def __init__(self, path: str | Path, fingerprint: Dict, resume: bool = False):
+        self.path = Path(path)
+        self.fingerprint = fingerprint
+        # Храним только смещения записей в файле, чтобы журнал не занимал память при возобновлении
+        self._index: Dict[Tuple[int, int], int] = {}
+
+        if resume and self.path.exists():
+            self._load()
+        else:
+            self._start()
+
+        self._file = open(self.path, "ab")
+
+    @staticmethod
+    def default_path(output_file_path: str | Path) -> Path:
+        output_file_path = Path(output_file_path)
+        return output_file_path.with_name(f"{output_file_path.name}.journal.jsonl")
+
+    def _start(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"fingerprint": self.fingerprint}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _load(self):
+        with open(self.path, "rb") as f:
+            header = f.readline()
+
+            try:
+                fingerprint = json.loads(header)["fingerprint"]
+            except (json.JSONDecodeError, KeyError, TypeError):
+                fingerprint = None
+
+            if fingerprint != self.fingerprint:
+                raise RuntimeError(f"Journal {self.path} was created for a different run, remove it to start over")
+
+            valid_end = f.tell()
+
+            while True:
+                offset = f.tell()
+                line = f.readline()
+
+                if not line:
+                    break
+
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("Record is not terminated")
+                    record = json.loads(line)
+                except ValueError:
+                    # Последняя строка могла не дописаться при аварийном завершении
+                    logger.warning(f"Dropping incomplete journal record at offset {offset}")
+                    break
+
+                self._index[(record["start"], record["end"])] = offset
+                valid_end = f.tell()
+
+        if valid_end < self.path.stat().st_size:
+            with open(self.path, "r+b") as f:
+                f.truncate(valid_end)
+
+        logger.info(f"Resuming from journal {self.path}: {len(self._index)} completed ranges")
+
+    @property
+    def completed_ranges(self) -> List[Tuple[int, int]]:
+        return sorted(self._index)
+
+    def get(self, start: int, end: int) -> Optional[Dict]:
+        offset = self._index.get((start, end))
+
+        if offset is None:
+            return None
+
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def record(self, start: int, end: int, columns: Dict[str, List[str]]):
+        """Записывает готовые значения выходных колонок для диапазона строк [start, end)"""
+        offset = self._file.tell()
+
+        record = {"start": start, "end": end, "columns": columns}
+        self._file.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+        self._index[(start, end)] = offset
+
+    def close(self):
+        self._file.close()
+
+    def remove(self):
+        self.close()
+        self.path.unlink(missing_ok=True)
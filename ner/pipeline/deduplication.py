@@ -0,0 +1,102 @@
+import re
+from typing import Dict, Hashable, Iterable, List, Optional, TypeVar
+
+import pandas as pd
+
+from ner.base.models import CompactNERResult
+
+
+T = TypeVar("T")
+
+
+class CellFilter:
+    """Правила, по которым ячейка считается заведомо не содержащей сущностей"""
+
+    NUMERIC_PATTERN = re.compile(r"^[\s+\-−]*[\d\s.,%:/]+$")
+
+    def __init__(self,
+                 skip_nan: bool = True,
+                 skip_empty: bool = True,
+                 skip_numeric: bool = True,
+                 min_letters: int = 1):
+        self.skip_nan = skip_nan
+        self.skip_empty = skip_empty
+        self.skip_numeric = skip_numeric
+        self.min_letters = min_letters
+
+    def is_trivial(self, value) -> bool:
+        if self.skip_nan and not isinstance(value, str) and pd.isna(value):
+            return True
+
+        if self.skip_numeric and isinstance(value, (int, float)) and not isinstance(value, bool):
+            return True
+
+        text = str(value)
+
+        if self.skip_empty and not text.strip():
+            return True
+
+        if self.skip_numeric and self.NUMERIC_PATTERN.match(text):
+            return True
+
+        if self.min_letters > 0 and sum(1 for char in text if char.isalpha()) < self.min_letters:
+            return True
+
+        return False
+
+
+class DeduplicationStats:
+    def __init__(self, total: int = 0, trivial: int = 0, unique: int = 0):
+        self.total = total
+        self.trivial = trivial
+        self.unique = unique
+
+    @property
+    def saved_calls(self) -> int:
+        return self.total - self.unique
+
+    def __str__(self):
+        return (f"Rows: {self.total}, trivial: {self.trivial}, unique: {self.unique}, "
+                f"saved calls: {self.saved_calls}")
+
+
+class DeduplicationStage:
+    """Схлопывает повторяющиеся значения ячеек перед NER и раскладывает результаты обратно по строкам"""
+
+    def __init__(self, cell_filter: Optional[CellFilter] = None):
+        self.cell_filter = cell_filter if cell_filter is not None else CellFilter()
+        self.stats = DeduplicationStats()
+        self._row_keys: List[Optional[Hashable]] = []
+        self._unique_texts: Dict[str, int] = {}
+
+    def fit(self, values: Iterable) -> List[str]:
+        """Запоминает раскладку строк и возвращает уникальные нетривиальные тексты"""
+        self._row_keys = []
+        self._unique_texts = {}
+        trivial = 0
+
+        for value in values:
+            if self.cell_filter.is_trivial(value):
+                self._row_keys.append(None)
+                trivial += 1
+                continue
+
+            text = str(value)
+            self._unique_texts.setdefault(text, len(self._unique_texts))
+            self._row_keys.append(text)
+
+        self.stats = DeduplicationStats(total=len(self._row_keys),
+                                        trivial=trivial,
+                                        unique=len(self._unique_texts))
+        return list(self._unique_texts)
+
+    def expand(self, unique_results: List[T], empty_result: Optional[T] = None) -> List[T]:
+        """Раскладывает результаты по уникальным текстам обратно на все строки; отфильтрованным — empty_result"""
+        if len(unique_results) != len(self._unique_texts):
+            raise ValueError(f"Expected {len(self._unique_texts)} results, got {len(unique_results)}")
+
+        if empty_result is None:
+            empty_result = CompactNERResult(sentences=[])
+
+        return [unique_results[self._unique_texts[key]] if key is not None else empty_result
+                for key in self._row_keys]
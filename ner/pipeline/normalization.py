@@ -0,0 +1,279 @@
+import re
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import Dict, Iterable, List, Set, Tuple
+
+from ner.base.models import Entity, EntitySpan
+from ner.utils import create_stanza_pipeline
+
+
+class SurfaceNormalizer(ABC):
+    """Приводит поверхностную форму сущности к ключу, общему для ее словоформ"""
+
+    QUOTES_AND_PUNCTUATION = re.compile(r"[\"'«»„“”‘’`.,;:!?()\[\]{}<>*/\\|]+")
+
+    @abstractmethod
+    def normalize(self, text: str) -> str:
+        pass
+
+    def normalize_batch(self, texts: List[str]) -> List[str]:
+        return [self.normalize(text) for text in texts]
+
+    def compatible(self, texts: List[str]) -> bool:
+        """Можно ли считать формы с общим ключом одной сущностью"""
+        return True
+
+    def query(self, key: str, texts: List[str], counts: Counter) -> str:
+        """Запрос линковки для группы: самая короткая форма (обычно именительный падеж), затем самая частая"""
+        return min(texts, key=lambda text: (len(text), -counts[text]))
+
+    @classmethod
+    def _clean(cls, text: str) -> str:
+        return " ".join(cls.QUOTES_AND_PUNCTUATION.sub(" ", text).casefold().replace("ё", "е").split())
+
+
+class RuleBasedNormalizer(SurfaceNormalizer):
+    """Регистр, кавычки, пунктуация и отсечение падежных окончаний у кириллических слов
+
+    Отсечение окончаний не различает похожие слова (Бразилия и Бразилиа дают один ключ),
+    поэтому формы с общим ключом объединяются, только если их окончания укладываются
+    в одну парадигму склонения, а длины отличаются не больше чем на max_length_diff.
+    """
+
+    # Окончания прилагательных в косвенных падежах, иначе отрезается только конечная гласная группа.
+    # Согласные окончания (-ом, -ам, -ов, -ых) не трогаем: они бывают частью основы (Газпром, Черных)
+    ADJECTIVE_ENDINGS = ("ого", "его", "ому", "ему")
+    VOWELS = "аеиоуыэюяйь"
+    CYRILLIC_WORD = re.compile(r"^[а-я]+$")
+
+    # Отсекаемые окончания парадигм склонения: (именительный падеж, остальные формы)
+    PARADIGMS = (
+        (("а",), ("ы", "и", "е", "у", "ой", "ою")),                                  # Москва
+        (("я",), ("и", "е", "ю", "ей", "ею")),                                       # Земля
+        (("ия",), ("ии", "ию", "ией")),                                              # Бразилия
+        (("ь",), ("и", "ью")),                                                       # Казань
+        (("",), ("а", "у", "е", "ы", "и")),                                          # Газпром
+        (("й", "ь"), ("я", "ю", "е", "и")),                                          # Юрий, Игорь
+        (("ий",), ("ия", "ию", "ии")),                                               # Дмитрий
+        (("о",), ("а", "у", "е")),                                                   # Осло
+        (("ие",), ("ия", "ию", "ии")),                                               # Управление
+        (("ый", "ий", "ой", "ая", "яя", "ое", "ее", "ые", "ие"),                     # Российский
+         ("ую", "юю", "ей", "ого", "его", "ому", "ему")),
+    )
+
+    def __init__(self, strip_endings: bool = True, min_stem: int = 3, max_length_diff: int = 2):
+        self.strip_endings = strip_endings
+        self.min_stem = min_stem
+        self.max_length_diff = max_length_diff
+
+    def _stem(self, word: str) -> str:
+        if not self.CYRILLIC_WORD.match(word):
+            return word
+
+        for ending in self.ADJECTIVE_ENDINGS:
+            if word.endswith(ending) and len(word) - len(ending) >= self.min_stem:
+                return word[:-len(ending)]
+
+        # Короткие основы (Юрий -> юри) не укорачиваются меньше min_stem
+        stem = word.rstrip(self.VOWELS)
+        return word[:max(len(stem), min(self.min_stem, len(word)))]
+
+    def _parts(self, text: str) -> List[str]:
+        return [part for word in self._clean(text).split() for part in word.split("-")]
+
+    def normalize(self, text: str) -> str:
+        words = self._clean(text).split()
+
+        if self.strip_endings:
+            words = ["-".join(self._stem(part) for part in word.split("-")) for word in words]
+
+        return " ".join(words)
+
+    def _suffixes(self, texts: List[str]) -> List[Set[str]]:
+        """Отсеченные окончания каждой части слова по всем формам группы"""
+        parts = [self._parts(text) for text in texts]
+        return [{part[len(self._stem(part)):] for part in position} for position in zip(*parts)]
+
+    def _fitting(self, suffixes: Set[str]) -> List[Tuple[Tuple[str, ...], Tuple[str, ...]]]:
+        return [paradigm for paradigm in self.PARADIGMS if suffixes <= set(paradigm[0] + paradigm[1])]
+
+    def compatible(self, texts: List[str]) -> bool:
+        if not self.strip_endings or len(texts) < 2:
+            return True
+
+        lengths = [len(text) for text in texts]
+
+        if max(lengths) - min(lengths) > self.max_length_diff:
+            return False
+
+        return all(len(suffixes) == 1 or self._fitting(suffixes) for suffixes in self._suffixes(texts))
+
+    def query(self, key: str, texts: List[str], counts: Counter) -> str:
+        # Запросом становится форма, больше всего частей которой стоят в именительном падеже
+        nominatives = [{ending for paradigm in self._fitting(suffixes) for ending in paradigm[0]} 
+                       for suffixes in self._suffixes(texts)]
+
+        def nominative_parts(text: str) -> int:
+            return sum(part[len(self._stem(part)):] in endings 
+                       for part, endings in zip(self._parts(text), nominatives))
+
+        return min(texts, key=lambda text: (-nominative_parts(text), len(text), -counts[text]))
+
+
+class StanzaLemmaNormalizer(SurfaceNormalizer):
+    """Нормализация через лемматизатор Stanza: точнее правил, но требует модели tokenize,pos,lemma"""
+
+    def __init__(self, lang: str = "ru", batch_size: int = 256, **pipeline_kwargs):
+        self.nlp = create_stanza_pipeline(lang, processors="tokenize,pos,lemma", **pipeline_kwargs)
+        self.batch_size = batch_size
+
+    def _doc_to_key(self, doc) -> str:
+        return self._clean(" ".join(word.lemma or word.text for sentence in doc.sentences for word in sentence.words))
+
+    def normalize(self, text: str) -> str:
+        return self._doc_to_key(self.nlp(str(text)))
+
+    def normalize_batch(self, texts: List[str]) -> List[str]:
+        keys = []
+
+        for batch_start in range(0, len(texts), self.batch_size):
+            docs = self.nlp.bulk_process([str(text) for text in texts[batch_start:batch_start + self.batch_size]])
+            keys.extend(self._doc_to_key(doc) for doc in docs)
+
+        return keys
+
+    def query(self, key: str, texts: List[str], counts: Counter) -> str:
+        # Ключ — лемма: запросом становится совпадающая с ней форма, а если такой не встретилось, сама лемма
+        lemma_forms = [text for text in texts if self._clean(text) == key]
+
+        if lemma_forms:
+            return max(lemma_forms, key=lambda text: counts[text])
+
+        most_frequent = max(texts, key=lambda text: counts[text])
+        return key.title() if most_frequent.istitle() else key
+
+
+class NormalizationStats:
+    def __init__(self, surface_forms: int = 0, queries: int = 0):
+        self.surface_forms = surface_forms
+        self.queries = queries
+
+    @property
+    def saved_queries(self) -> int:
+        return self.surface_forms - self.queries
+
+    @property
+    def reduction(self) -> float:
+        return self.saved_queries / self.surface_forms if self.surface_forms else 0.0
+
+    def __str__(self):
+        return (f"Surface forms: {self.surface_forms}, queries: {self.queries}, "
+                f"saved queries: {self.saved_queries} ({self.reduction:.1%})")
+
+
+class NormalizationStage:
+    """Группирует поверхностные формы по типу и ключу нормализации; каждая группа запрашивается один раз
+
+    Формы с общим ключом объединяются, только если normalizer.compatible их допускает
+    и сущности одного типа: разные сущности с похожим написанием не получают одну ссылку.
+    """
+
+    def __init__(self, normalizer: SurfaceNormalizer):
+        self.normalizer = normalizer
+        self.reset()
+
+    def reset(self):
+        """Забывает группы: в потоковом режиме состояние не должно расти от части к части таблицы"""
+        self.stats = NormalizationStats()
+        self._queries: Dict[str, str] = {}
+        self._buckets: Dict[Tuple[str, str], List[List[str]]] = {}
+
+    def _split(self, texts: List[str]) -> List[List[str]]:
+        """Делит формы с общим ключом на группы, совместимые по мнению нормализатора"""
+        groups = []
+
+        for text in texts:
+            for group in groups:
+                if self.normalizer.compatible(group + [text]):
+                    group.append(text)
+                    break
+            else:
+                groups.append([text])
+
+        return groups
+
+    def _update_stats(self):
+        self.stats = NormalizationStats(surface_forms=len(self._queries),
+                                        queries=sum(len(groups) for groups in self._buckets.values()))
+
+    def fit(self, entities: Iterable[Entity]) -> List[Entity]:
+        """Принимает все сущности (с повторами) и возвращает по одной сущности-запросу на группу"""
+        counts, types, representatives = Counter(), {}, {}
+
+        for entity in entities:
+            counts[entity.text] += 1
+            types.setdefault(entity.text, Counter())[entity.type] += 1
+            representatives.setdefault(entity.text, entity)
+
+        surface_forms = list(counts)
+        keys = self.normalizer.normalize_batch(surface_forms)
+
+        # Частые формы идут первыми: они задают группу, редкие присоединяются к совместимой
+        buckets: Dict[Tuple[str, str], List[str]] = {}
+        for text, key in sorted(zip(surface_forms, keys), key=lambda item: -counts[item[0]]):
+            # Пустой ключ (например, одни кавычки) не должен склеивать разные сущности
+            buckets.setdefault((types[text].most_common(1)[0][0], key or text), []).append(text)
+
+        self._queries, self._buckets = {}, {}
+        queries = {}
+
+        for (entity_type, key), texts in buckets.items():
+            self._buckets[(entity_type, key)] = groups = self._split(texts)
+
+            for group in groups:
+                query = self.normalizer.query(key, group, counts)
+
+                if query not in queries:
+                    # Лемма могла не встретиться в тексте: тогда запрос строится по самой частой форме группы
+                    representative = representatives.get(query) or representatives[group[0]]
+                    queries[query] = EntitySpan.create(query, entity_type, 
+                                                       representative.start_char, representative.end_char)
+
+                for text in group:
+                    self._queries[text] = query
+
+        self._update_stats()
+        return list(queries.values())
+
+    def add(self, entities: Iterable[Entity]) -> List[Entity]:
+        """Инкрементальный fit: возвращает только сущности, открывшие новую группу
+
+        Запрос нужно отправить сразу, поэтому запросом группы становится первая встреченная форма,
+        а не выбранная normalizer.query по всем формам, как в fit.
+        """
+        new_entities = {}
+
+        for entity in entities:
+            if entity.text not in self._queries:
+                new_entities.setdefault(entity.text, entity)
+
+        queries = []
+
+        for text, key in zip(new_entities, self.normalizer.normalize_batch(list(new_entities))):
+            groups = self._buckets.setdefault((new_entities[text].type, key or text), [])
+
+            for group in groups:
+                if self.normalizer.compatible(group + [text]):
+                    group.append(text)
+                    self._queries[text] = self._queries[group[0]]
+                    break
+            else:
+                groups.append([text])
+                self._queries[text] = text
+                queries.append(new_entities[text])
+
+        self._update_stats()
+        return queries
+
+    def query_for(self, text: str) -> str:
+        return self._queries.get(text, text)
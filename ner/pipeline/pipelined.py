@@ -0,0 +1,169 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from tqdm import tqdm
+
+from ner.base.entity_retriever import EntityRetriever
+from ner.base.linker import Linker
+from ner.base.models import CompactNERResult, Entity, LinkingResult
+from ner.metrics import metrics
+
+from .normalization import NormalizationStage, NormalizationStats, SurfaceNormalizer
+
+
+class PipelineStats:
+    def __init__(self):
+        self.ner_seconds = 0.0
+        self.link_wait_seconds = 0.0
+        self.backpressure_seconds = 0.0
+        self.entities = 0
+        self.queries = 0
+
+    def __str__(self):
+        return (f"NER: {self.ner_seconds:.1f}s, waiting for linking after NER: {self.link_wait_seconds:.1f}s, "
+                f"backpressure: {self.backpressure_seconds:.1f}s, entities: {self.entities}, "
+                f"unique queries: {self.queries}")
+
+
+class PipelinedExecutor:
+    """Выполняет NER и линковку одновременно: новые сущности батча сразу уходят в пул линковки
+
+    Число незавершенных пакетов линковки ограничено max_pending: если линковка отстает,
+    NER ждет, и память под очередь не растет.
+
+    Без нормализатора результат совпадает с последовательным режимом. С нормализатором запросом группы
+    становится первая встреченная форма, а не выбранная по всем формам (NormalizationStage.fit),
+    поэтому ссылки для групп словоформ могут отличаться.
+    """
+
+    def __init__(self,
+                 retriever: EntityRetriever,
+                 linker: Linker,
+                 batch_size: int = 64,
+                 link_workers: int = 4,
+                 link_batch_size: int = 16,
+                 max_pending: int = 64,
+                 normalizer: Optional[SurfaceNormalizer] = None):
+        self.retriever = retriever
+        self.linker = linker
+        self.batch_size = batch_size
+        self.link_workers = link_workers
+        self.link_batch_size = link_batch_size
+        self.max_pending = max_pending
+        self.normalizer = normalizer
+        self.stats = PipelineStats()
+        self._normalization = NormalizationStage(normalizer) if normalizer is not None else None
+
+        self._links: Dict[str, str] = {}
+        self._queries: Dict[str, str] = {}
+
+    @property
+    def normalization_stats(self) -> NormalizationStats:
+        return self._normalization.stats if self._normalization is not None else NormalizationStats()
+
+    def _link(self, entities: List[Entity]):
+        for linked_entity in self.linker.link_batch(entities):
+            self._links[linked_entity.entity.text] = linked_entity.link
+
+    def _new_queries(self, ner_results: List[CompactNERResult]) -> List[Entity]:
+        """Запоминает тексты сущностей батча и возвращает те, что еще не отправлялись в линковку"""
+        new_entities = {}
+
+        for ner_result in ner_results:
+            for sentence in ner_result.sentences:
+                for entity in sentence:
+                    self.stats.entities += 1
+
+                    if entity.text not in self._queries:
+                        new_entities.setdefault(entity.text, entity)
+
+        if self._normalization is None:
+            for text in new_entities:
+                self._queries[text] = text
+
+            return list(new_entities.values())
+
+        # Без полного списка сущностей запросом группы становится первая встреченная форма
+        queries = self._normalization.add(new_entities.values())
+
+        for text in new_entities:
+            self._queries[text] = self._normalization.query_for(text)
+
+        return queries
+
+    def run(self, texts: List[str]) -> Tuple[List[CompactNERResult], List[LinkingResult]]:
+        texts = [str(text) for text in texts]
+        # Ссылки и группы живут только в пределах одного вызова (одной части таблицы при потоковой обработке),
+        # повторы между частями закрывает кэш самого linker'а
+        self._links, self._queries = {}, {}
+
+        if self._normalization is not None:
+            self._normalization.reset()
+
+        ner_results: List[CompactNERResult] = []
+        futures: List[Future] = []
+        errors: List[BaseException] = []
+        pending = threading.BoundedSemaphore(self.max_pending)
+        backpressure_seconds = 0.0
+
+        def on_done(future: Future):
+            pending.release()
+
+            if not future.cancelled() and future.exception() is not None:
+                errors.append(future.exception())
+
+        executor = ThreadPoolExecutor(max_workers=self.link_workers)
+
+        try:
+            with tqdm(total=len(texts)) as progress:
+                started_at = time.perf_counter()
+
+                for batch_start in range(0, len(texts), self.batch_size):
+                    batch = texts[batch_start:batch_start + self.batch_size]
+                    batch_results = [CompactNERResult(sentences) for sentences in self.retriever.retrieve_batch(batch)]
+                    ner_results.extend(batch_results)
+
+                    new_entities = self._new_queries(batch_results)
+
+                    for link_start in range(0, len(new_entities), self.link_batch_size):
+                        waiting_since = time.perf_counter()
+                        pending.acquire()
+                        backpressure_seconds += time.perf_counter() - waiting_since
+
+                        future = executor.submit(self._link, new_entities[link_start:link_start + self.link_batch_size])
+                        future.add_done_callback(on_done)
+                        futures.append(future)
+
+                    # Ошибка линковки останавливает NER, а не обнаруживается только в конце
+                    if errors:
+                        raise errors[0]
+
+                    progress.update(len(batch))
+
+                self.stats.ner_seconds += time.perf_counter() - started_at
+
+            waiting_since = time.perf_counter()
+
+            for future in futures:
+                future.result()
+
+            link_wait_seconds = time.perf_counter() - waiting_since
+        except BaseException:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+        executor.shutdown()
+
+        self.stats.link_wait_seconds += link_wait_seconds
+        self.stats.backpressure_seconds += backpressure_seconds
+        self.stats.queries += len(self._links)
+        metrics.observe("pipeline_link_wait_seconds", link_wait_seconds)
+        metrics.observe("pipeline_backpressure_seconds", backpressure_seconds)
+
+        linking_results = [LinkingResult(sentences=[[self._links[self._queries[entity.text]] for entity in sentence]
+                                                    for sentence in ner_result.sentences])
+                           for ner_result in ner_results]
+
+        return ner_results, linking_results
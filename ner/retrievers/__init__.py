@@ -1,2 +1,6 @@
-from .llm_retriever import LLMRetriever
-from .stanza_retriever import StanzaRetriever
\ No newline at end of file
+from .cached_retriever import CachedRetriever
+from .cascade_retriever import CascadeRetriever, CascadeStats, EscalationPolicy
+from .chunking_retriever import ChunkingRetriever
+from .llm_retriever import LLMRetriever, ParseStats
+from .process_pool_retriever import ProcessPoolRetriever
+from .stanza_retriever import StanzaRetriever
@@ -0,0 +1,72 @@
+import hashlib
+from typing import List
+
+from ner.base.entity_retriever import EntityRetriever
+from ner.base.models import CompactNERResult, Entity, FailedRetrieval
+from ner.cache import SQLiteCache
+from ner.metrics import metrics
+
+
+class CachedRetriever(EntityRetriever):
+    """Read-through кэш результатов NER, адресуемый хэшем текста ячейки
+
+    Версия модели и промпта входит в ключ, поэтому записи разных конфигураций живут рядом,
+    а устаревшие вытесняются по LRU.
+    """
+
+    def __init__(self, retriever: EntityRetriever, cache: SQLiteCache, namespace: str):
+        self.retriever = retriever
+        self.cache = cache
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache_version(self) -> str:
+        return self.retriever.cache_version
+
+    @staticmethod
+    def _text_key(text: str) -> str:
+        return hashlib.sha256(str(text).encode("utf-8")).hexdigest()
+
+    def retrieve(self, text: str) -> List[List[Entity]]:
+        return self.retrieve_batch([text])[0]
+
+    def retrieve_batch(self, texts: List[str]) -> List[List[List[Entity]]]:
+        keys = [self._text_key(text) for text in texts]
+        cached = self.cache.get_many(self.namespace, self.cache_version, keys)
+
+        results = [None] * len(texts)
+        missing = {}
+
+        for idx, key in enumerate(keys):
+            if key in cached:
+                results[idx] = CompactNERResult.from_json(cached[key]).sentences
+            else:
+                missing.setdefault(key, []).append(idx)
+
+        hits = len(texts) - sum(len(indices) for indices in missing.values())
+        self.hits += hits
+        self.misses += len(missing)
+        metrics.increment("ner_cache_hits_total", hits, namespace=self.namespace)
+        metrics.increment("ner_cache_misses_total", len(missing), namespace=self.namespace)
+
+        if missing:
+            missing_texts = [texts[indices[0]] for indices in missing.values()]
+            retrieved = self.retriever.retrieve_batch(missing_texts)
+
+            for indices, sentences in zip(missing.values(), retrieved):
+                for idx in indices:
+                    results[idx] = sentences
+
+            # Сбои (например, исчерпанные попытки LLM) не кэшируются и повторяются при следующем запуске
+            failed = sum(isinstance(sentences, FailedRetrieval) for sentences in retrieved)
+            metrics.increment("ner_cache_skipped_failures_total", failed, namespace=self.namespace)
+
+            self.cache.set_many(self.namespace, self.cache_version, {
+                key: CompactNERResult(sentences).to_json()
+                for key, sentences in zip(missing, retrieved)
+                if not isinstance(sentences, FailedRetrieval)
+            })
+
+        return results
@@ -0,0 +1,142 @@
+import hashlib
+import logging
+import re
+from collections import Counter
+from typing import Iterable, List, Optional
+
+from ner.base.entity_retriever import EntityRetriever
+from ner.base.models import Entity, FailedRetrieval
+from ner.metrics import metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+class EscalationPolicy:
+    """Эвристики, по которым результат дешевого retriever считается ненадежным"""
+
+    WORD = re.compile(r"\w+")
+    CYRILLIC = re.compile(r"[а-яё]", re.IGNORECASE)
+    LATIN = re.compile(r"[a-z]", re.IGNORECASE)
+    SENTENCE_END = re.compile(r"[.!?…]\s*$")
+
+    def __init__(self,
+                 max_chars: Optional[int] = 300,
+                 uncertain_types: Iterable[str] = ("MISC",),
+                 mixed_scripts: bool = True,
+                 capitalized_without_entities: bool = True,
+                 min_capitalized: int = 1):
+        self.max_chars = max_chars
+        self.uncertain_types = frozenset(uncertain_types)
+        self.mixed_scripts = mixed_scripts
+        self.capitalized_without_entities = capitalized_without_entities
+        self.min_capitalized = min_capitalized
+
+    @property
+    def signature(self) -> str:
+        return (f"{self.max_chars}:{','.join(sorted(self.uncertain_types))}:{self.mixed_scripts}:"
+                f"{self.capitalized_without_entities}:{self.min_capitalized}")
+
+    def _count_capitalized(self, text: str) -> int:
+        """Слова с заглавной буквы не в начале предложения: вероятные имена собственные"""
+        count = 0
+
+        for idx, match in enumerate(self.WORD.finditer(text)):
+            word = match.group()
+
+            if idx == 0 or not word[0].isupper() or not any(char.islower() for char in word[1:]):
+                continue
+
+            if self.SENTENCE_END.search(text, 0, match.start()):
+                continue
+
+            count += 1
+
+        return count
+
+    def reason(self, text: str, sentences: List[List[Entity]]) -> Optional[str]:
+        """Причина эскалации или None, если результат можно оставить"""
+        if self.max_chars is not None and len(text) > self.max_chars:
+            return "length"
+
+        entities = [entity for sentence in sentences for entity in sentence]
+
+        if any(entity.type in self.uncertain_types for entity in entities):
+            return "uncertain_type"
+
+        if self.mixed_scripts:
+            # Кириллица и латиница внутри одного слова — частый признак опечаток и транслитерации
+            for word in self.WORD.findall(text):
+                if self.CYRILLIC.search(word) and self.LATIN.search(word):
+                    return "mixed_scripts"
+
+        if (self.capitalized_without_entities and not entities
+                and self._count_capitalized(text) >= self.min_capitalized):
+            return "capitalized_without_entities"
+
+        return None
+
+
+class CascadeStats:
+    def __init__(self):
+        self.total = 0
+        self.escalated = 0
+        self.reasons = Counter()
+
+    @property
+    def escalation_rate(self) -> float:
+        return self.escalated / self.total if self.total else 0.0
+
+    def __str__(self):
+        reasons = ", ".join(f"{reason}: {count}" for reason, count in self.reasons.most_common())
+        return (f"Rows: {self.total}, escalated: {self.escalated} ({self.escalation_rate:.1%})"
+                + (f" [{reasons}]" if reasons else ""))
+
+
+class CascadeRetriever(EntityRetriever):
+    """Сначала дешевый retriever, и только сомнительные ячейки — дорогому (Stanza -> LLM)"""
+
+    def __init__(self,
+                 primary: EntityRetriever,
+                 fallback: EntityRetriever,
+                 policy: Optional[EscalationPolicy] = None):
+        self.primary = primary
+        self.fallback = fallback
+        self.policy = policy if policy is not None else EscalationPolicy()
+        self.stats = CascadeStats()
+
+    @property
+    def cache_version(self) -> str:
+        policy = hashlib.sha256(self.policy.signature.encode("utf-8")).hexdigest()[:12]
+        return f"cascade:{self.primary.cache_version}+{self.fallback.cache_version}:{policy}"
+
+    def retrieve(self, text: str) -> List[List[Entity]]:
+        return self.retrieve_batch([text])[0]
+
+    def retrieve_batch(self, texts: List[str]) -> List[List[List[Entity]]]:
+        texts = [str(text) for text in texts]
+        results = self.primary.retrieve_batch(texts)
+        escalated = []
+
+        for idx, (text, sentences) in enumerate(zip(texts, results)):
+            reason = self.policy.reason(text, sentences)
+
+            if reason is not None:
+                escalated.append(idx)
+                self.stats.reasons[reason] += 1
+                metrics.increment("cascade_escalated_total", reason=reason)
+
+        self.stats.total += len(texts)
+        self.stats.escalated += len(escalated)
+        metrics.increment("cascade_rows_total", len(texts))
+
+        if escalated:
+            for idx, sentences in zip(escalated, self.fallback.retrieve_batch([texts[idx] for idx in escalated])):
+                # После сбоя fallback остается результат primary, но помеченный как сбой, чтобы не попасть в кэш
+                if isinstance(sentences, FailedRetrieval):
+                    results[idx] = FailedRetrieval(results[idx])
+                elif sentences:
+                    results[idx] = sentences
+
+        logger.debug(f"Cascade: {self.stats}")
+        return results
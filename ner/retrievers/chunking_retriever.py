@@ -0,0 +1,162 @@
+import re
+from typing import Callable, List, Optional, Tuple
+
+from ner.base.entity_retriever import EntityRetriever
+from ner.base.models import Entity, EntitySpan, FailedRetrieval
+
+
+class ChunkingRetriever(EntityRetriever):
+    """Режет длинные ячейки на ограниченные куски и возвращает смещения сущностей относительно исходной ячейки
+
+    Кусок не длиннее max_chars символов, а если задан max_tokens, то и не длиннее max_tokens токенов
+    по count_tokens (по умолчанию — оценка вложенного retriever'а, например LLMRetriever.count_tokens).
+    """
+
+    SENTENCE_END = re.compile(r"[.!?…]+[\"'»)\]]*\s+")
+    DEFAULT_MAX_CHARS = 2000
+
+    def __init__(self, 
+                 retriever: EntityRetriever, 
+                 max_chars: int = DEFAULT_MAX_CHARS,
+                 max_tokens: Optional[int] = None,
+                 count_tokens: Optional[Callable[[str], int]] = None):
+        self.retriever = retriever
+        self.max_chars = max_chars
+        self.max_tokens = max_tokens
+        self.count_tokens = count_tokens or getattr(retriever, "count_tokens", None)
+
+        if max_tokens is not None and self.count_tokens is None:
+            raise ValueError(f"max_tokens requires count_tokens: {type(retriever).__name__} cannot count tokens")
+
+    @property
+    def cache_version(self) -> str:
+        tokens = f"-{self.max_tokens}t" if self.max_tokens is not None else ""
+        return f"{self.retriever.cache_version}:chunks-{self.max_chars}{tokens}"
+
+    def _fits(self, text: str) -> bool:
+        return self.max_tokens is None or self.count_tokens(text) <= self.max_tokens
+
+    def _chunk_end(self, text: str, start: int, limit: int, sentence_ends: List[int]) -> Tuple[int, bool]:
+        """Конец куска не дальше limit: предпочитаем последнюю границу предложения, иначе пробел, иначе сам limit"""
+        if limit >= len(text):
+            return len(text), True
+
+        end = max((pos for pos in sentence_ends if start < pos <= limit), default=None)
+
+        if end is not None:
+            return end, True
+
+        whitespace = max(text.rfind(char, start + 1, limit + 1) for char in " \n\t")
+        return (whitespace if whitespace > start else limit), False
+
+    def _split(self, text: str) -> List[Tuple[int, int, bool]]:
+        """Возвращает куски как (start, end, закончился ли кусок на границе предложения)"""
+        if len(text) <= self.max_chars and self._fits(text):
+            return [(0, len(text), True)]
+
+        sentence_ends = [match.end() for match in self.SENTENCE_END.finditer(text)] + [len(text)]
+        chunks = []
+        start = 0
+
+        while start < len(text):
+            limit = start + self.max_chars
+            end, at_sentence_boundary = self._chunk_end(text, start, limit, sentence_ends)
+
+            # Кусок в пределах символов может не уложиться в токены: сужаем окно пропорционально превышению
+            while self.max_tokens is not None and end - start > 1:
+                tokens = self.count_tokens(text[start:end])
+
+                if tokens <= self.max_tokens:
+                    break
+
+                limit = start + max(1, int((end - start) * self.max_tokens / tokens * 0.9))
+                end, at_sentence_boundary = self._chunk_end(text, start, min(limit, end - 1), sentence_ends)
+
+            if end >= len(text):
+                chunks.append((start, len(text), True))
+                break
+
+            chunk_end = end
+            while chunk_end > start and text[chunk_end - 1].isspace():
+                chunk_end -= 1
+
+            chunks.append((start, chunk_end, at_sentence_boundary))
+
+            start = end
+            while start < len(text) and text[start].isspace():
+                start += 1
+
+        return chunks
+
+    @staticmethod
+    def _shift(sentences: List[List[Entity]], offset: int) -> List[List[Entity]]:
+        if offset == 0:
+            return sentences
+
+        return [[EntitySpan.create(entity.text, entity.type, entity.start_char + offset, entity.end_char + offset)
+                 for entity in sentence]
+                for sentence in sentences]
+
+    @staticmethod
+    def _merge_boundary(text: str, left: List[Entity], right: List[Entity], 
+                        left_end: int, right_start: int) -> List[Entity]:
+        """Склеивает предложение, разрезанное на границе кусков, вместе с разрезанной сущностью
+
+        Сущность считается разрезанной, только если кусок оборван посреди слова, без пробела на границе.
+        """
+        if (left and right
+                and left_end == right_start
+                and left[-1].end_char == left_end
+                and right[0].start_char == right_start
+                and left[-1].type == right[0].type):
+            merged = EntitySpan.create(text=text[left[-1].start_char:right[0].end_char],
+                                       type=left[-1].type,
+                                       start_char=left[-1].start_char,
+                                       end_char=right[0].end_char)
+            return left[:-1] + [merged] + right[1:]
+
+        return left + right
+
+    def _assemble(self, text: str, chunks: List[Tuple[int, int, bool]], 
+                  chunk_results: List[List[List[Entity]]]) -> List[List[Entity]]:
+        sentences = []
+        previous = None
+
+        for (start, end, at_sentence_boundary), chunk_sentences in zip(chunks, chunk_results):
+            chunk_sentences = self._shift(chunk_sentences, start)
+
+            if previous is not None and not previous[2] and sentences and chunk_sentences:
+                sentences[-1] = self._merge_boundary(text, sentences[-1], chunk_sentences[0], previous[1], start)
+                chunk_sentences = chunk_sentences[1:]
+
+            sentences.extend(chunk_sentences)
+            previous = (start, end, at_sentence_boundary)
+
+        return sentences
+
+    def retrieve(self, text: str) -> List[List[Entity]]:
+        return self.retrieve_batch([text])[0]
+
+    def retrieve_batch(self, texts: List[str]) -> List[List[List[Entity]]]:
+        texts = [str(text) for text in texts]
+        splits = [self._split(text) for text in texts]
+
+        # Куски всех ячеек уходят одним батчем, поэтому параллелизм обеспечивает вложенный retriever
+        chunk_texts = [text[start:end] for text, chunks in zip(texts, splits) for start, end, _ in chunks]
+        chunk_results = self.retriever.retrieve_batch(chunk_texts)
+
+        results = []
+        position = 0
+
+        for text, chunks in zip(texts, splits):
+            text_results = chunk_results[position:position + len(chunks)]
+            sentences = self._assemble(text, chunks, text_results)
+
+            # Сбой на любом куске делает результат всей ячейки неполным
+            if any(isinstance(chunk_sentences, FailedRetrieval) for chunk_sentences in text_results):
+                sentences = FailedRetrieval(sentences)
+
+            results.append(sentences)
+            position += len(chunks)
+
+        return results
@@ -1,20 +1,22 @@
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+import hashlib
 import json
 import logging
 import re
-
-from langchain.prompts import PromptTemplate
-from langchain_core.messages import HumanMessage
+import threading
+import time
 
 from ner.base.entity_retriever import EntityRetriever
-from ner.base.models import Entity, NERResult
+from ner.base.models import Entity, EntitySpan, FailedRetrieval, NERResult
+from ner.metrics import metrics
+from ner.utils import TokenBucket, exponential_backoff, parse_lenient_json
 
 
 logger = logging.getLogger(__name__)
 
 
-def _extract_json_from_response(text: str) -> str:
-    """Extracts the first valid JSON array from LLM response."""
+def _strip_code_fence(text: str) -> str:
     text = text.strip()
     # Remove markdown code blocks
     if text.startswith("```json"):
@@ -23,6 +25,12 @@ def _extract_json_from_response(text: str) -> str:
         text = text[3:].strip()
     if text.endswith("```"):
         text = text[:-3].strip()
+    return text
+
+
+def _extract_json_from_response(text: str) -> str:
+    """Extracts the first valid JSON array from LLM response."""
+    text = _strip_code_fence(text)
 
     # Find the outermost [...] block
     start = text.find('[')
@@ -32,6 +40,39 @@ def _extract_json_from_response(text: str) -> str:
     return text
 
 
+def _extract_json_object_from_response(text: str) -> str:
+    """Extracts the outermost JSON object from LLM response."""
+    text = _strip_code_fence(text)
+
+    start = text.find('{')
+    end = text.rfind('}')
+    if start != -1 and end != -1 and end > start:
+        return text[start:end + 1]
+    return text
+
+
+class ParseStats:
+    def __init__(self):
+        self.responses = 0
+        self.salvaged = 0
+        self.retries = 0
+        self.failures = 0
+        self.dropped_entities = 0
+
+    @property
+    def salvage_rate(self) -> float:
+        return self.salvaged / self.responses if self.responses else 0.0
+
+    @property
+    def retry_rate(self) -> float:
+        return self.retries / self.responses if self.responses else 0.0
+
+    def __str__(self):
+        return (f"LLM responses: {self.responses}, salvaged: {self.salvaged} ({self.salvage_rate:.1%}), "
+                f"retried: {self.retries} ({self.retry_rate:.1%}), failures: {self.failures}, "
+                f"dropped entities: {self.dropped_entities}")
+
+
 class LLMRetriever(EntityRetriever):
     PROMPT_TEMPLATE = """Текст: {source}
 Проанализируй текст и извлеки все именованные сущности.
@@ -74,62 +115,393 @@ class LLMRetriever(EntityRetriever):
 Текст: {source}
 Ответ: """
 
-    def __init__(self, llm, max_retries=5):
+    PACKED_PROMPT_TEMPLATE = """Проанализируй каждый из пронумерованных текстов и извлеки все именованные сущности.
+Используй только следующие, доступные типы сущностей: LOC (Локация), PER (Личность), ORG (Организация), MISC (Прочее)
+
+Для каждого текста верни массив массивов сущностей (по массиву на предложение).
+start_char и end_char отсчитываются от начала соответствующего текста, а не от начала всего списка.
+Верни результат В СТРОГОМ JSON формате как объект, где ключ — номер текста.
+Ключ должен быть у КАЖДОГО текста из списка: если в тексте нет сущностей, верни для него пустой массив [].
+
+Пример:
+Тексты:
+[0] Я живу в Москве.
+[1] Сегодня тепло.
+[2] Работаю в Яндексе. Завтра еду в Санкт-Петербург.
+Ответ: {{
+    "0": [
+        [{{"text": "Москве", "type": "LOC", "start_char": 9, "end_char": 15}}]
+    ],
+    "1": [],
+    "2": [
+        [{{"text": "Яндексе", "type": "ORG", "start_char": 10, "end_char": 17}}],
+        [{{"text": "Санкт-Петербург", "type": "LOC", "start_char": 32, "end_char": 47}}]
+    ]
+}}
+
+Тексты:
+{sources}
+Ответ: """
+
+    PACKED_WHITESPACE = str.maketrans("\n\r\t\v\f", "     ")
+    # Ключи, под которыми модель иногда заворачивает массив предложений в объект
+    WRAPPER_KEYS = ("sentences", "entities", "result")
+
+    def __init__(self, 
+                 llm, 
+                 max_retries=5,
+                 max_concurrency: int = 1,
+                 requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None,
+                 max_rate_limit_retries: int = 8,
+                 rate_limit_backoff_base: float = 1.0,
+                 rate_limit_backoff_max: float = 60.0,
+                 pack_size: int = 1,
+                 pack_token_budget: int = 1500):
         self.llm = llm
         self._max_retries = max_retries
+        self.max_concurrency = max_concurrency
+        self._max_rate_limit_retries = max_rate_limit_retries
+        self._rate_limit_backoff_base = rate_limit_backoff_base
+        self._rate_limit_backoff_max = rate_limit_backoff_max
+        self._request_limiter = TokenBucket(requests_per_minute / 60) if requests_per_minute else None
+        self._token_limiter = (TokenBucket(tokens_per_minute / 60, capacity=tokens_per_minute) 
+                               if tokens_per_minute else None)
+        self.pack_size = pack_size
+        self.pack_token_budget = pack_token_budget
+        self.parse_stats = ParseStats()
+        self._stats_lock = threading.Lock()
+
+    @property
+    def cache_version(self) -> str:
+        model_name = getattr(self.llm, "model", None) or type(self.llm).__name__
+        prompt = self.PROMPT_TEMPLATE + (self.PACKED_PROMPT_TEMPLATE if self.pack_size > 1 else "")
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+        return f"llm:{model_name}:{prompt_hash}"
+
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        # Грубая оценка для кириллицы: около трех символов на токен
+        return len(text) // 3 + 1
+
+    def count_tokens(self, text: str) -> int:
+        """Та же оценка, что у ограничения TPM и упаковки промптов; ей пользуется ChunkingRetriever"""
+        return self._estimate_tokens(text)
+
+    @staticmethod
+    def _is_rate_limit_error(error: Exception) -> bool:
+        status_code = getattr(error, "status_code", None)
+
+        if status_code is None:
+            status_code = getattr(getattr(error, "response", None), "status_code", None)
+
+        if status_code == 429:
+            return True
+
+        message = str(error).lower()
+        return "429" in message or "rate limit" in message or "too many requests" in message
+
+    def _invoke(self, prompt_text: str) -> str:
+        for attempt in range(self._max_rate_limit_retries + 1):
+            if self._request_limiter is not None:
+                self._request_limiter.acquire()
+
+            if self._token_limiter is not None:
+                self._token_limiter.acquire(self._estimate_tokens(prompt_text))
+
+            try:
+                metrics.increment("llm_requests_total")
+
+                with metrics.timer("llm_request_seconds"):
+                    # Use invoke with proper message format for chat models
+                    if hasattr(self.llm, 'invoke'):
+                        # Assume it's a chat model (most common case)
+                        from langchain_core.messages import HumanMessage
+                        response = self.llm.invoke([HumanMessage(content=prompt_text)])
+                        return response.content if hasattr(response, 'content') else str(response)
+                    else:
+                        # Fallback for legacy LLMs (unlikely)
+                        return self.llm.predict(prompt_text)
+            except Exception as e:
+                if not self._is_rate_limit_error(e) or attempt >= self._max_rate_limit_retries:
+                    raise
+
+                delay = exponential_backoff(attempt, 
+                                            base=self._rate_limit_backoff_base, 
+                                            maximum=self._rate_limit_backoff_max)
+                logger.warning(f"Rate limited by LLM: {e}. Retrying in {delay:.1f}s. Try {attempt}.")
+                metrics.increment("llm_rate_limit_retries_total")
+                time.sleep(delay)
+
+    def _count(self, field: str, value: int = 1):
+        with self._stats_lock:
+            setattr(self.parse_stats, field, getattr(self.parse_stats, field) + value)
+
+    @staticmethod
+    def _as_offset(value) -> Optional[int]:
+        if isinstance(value, bool):
+            return None
+        if isinstance(value, int):
+            return value
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        if isinstance(value, str) and value.strip().isdigit():
+            return int(value)
+        return None
+
+    @classmethod
+    def _salvage_entity(cls, entity_dict: dict, source: str, search_from: int) -> Tuple[Optional[Entity], bool]:
+        """Возвращает (сущность или None, пришлось ли чинить); смещения пересчитываются поиском text в source"""
+        text, entity_type = entity_dict.get("text"), entity_dict.get("type")
+        start_char = cls._as_offset(entity_dict.get("start_char"))
+        end_char = cls._as_offset(entity_dict.get("end_char"))
+
+        if not isinstance(entity_type, str) or not entity_type:
+            return None, True
+
+        valid_offsets = start_char is not None and end_char is not None and 0 <= start_char <= end_char
+
+        if not isinstance(text, str) or not text:
+            # Без текста сущность восстанавливается только по смещениям
+            if valid_offsets and end_char <= len(source) and source[start_char:end_char].strip():
+                return EntitySpan.create(source[start_char:end_char], entity_type, start_char, end_char), True
+            return None, True
+
+        if valid_offsets and source[start_char:end_char] == text:
+            return EntitySpan.create(text, entity_type, start_char, end_char), False
+
+        # Повторные упоминания ищутся после предыдущей сущности предложения
+        found = source.find(text, search_from)
+        if found == -1:
+            found = source.find(text)
+
+        if found != -1:
+            return EntitySpan.create(text, entity_type, found, found + len(text)), True
+
+        if valid_offsets:
+            # Текст не найден (например, модель нормализовала форму): смещения остаются как есть
+            return EntitySpan.create(text, entity_type, start_char, end_char), False
+
+        return None, True
+
+    @classmethod
+    def _salvage_document(cls, doc, source: str) -> Tuple[List[List[Entity]], bool, int]:
+        """Приводит разобранный ответ к массиву предложений: (предложения, пришлось ли чинить, отброшено сущностей)"""
+        repaired = False
+
+        if isinstance(doc, dict):
+            nested = next((doc[key] for key in cls.WRAPPER_KEYS if isinstance(doc.get(key), list)), None)
+
+            if nested is not None:
+                doc = nested
+            elif "text" in doc or "start_char" in doc:
+                doc = [doc]
+            else:
+                raise ValueError("Expected top-level JSON array")
+
+            repaired = True
+
+        if not isinstance(doc, list):
+            raise ValueError("Expected top-level JSON array")
+
+        # Плоский список сущностей вместо массива массивов: подряд идущие сущности — одно предложение
+        raw_sentences, flat_sentence, dropped = [], None, 0
+        for item in doc:
+            if isinstance(item, list):
+                raw_sentences.append(item)
+                flat_sentence = None
+            elif isinstance(item, dict):
+                if flat_sentence is None:
+                    flat_sentence = []
+                    raw_sentences.append(flat_sentence)
+
+                flat_sentence.append(item)
+                repaired = True
+            else:
+                repaired = True
+                dropped += 1
+
+        sentences = []
+
+        for raw_sentence in raw_sentences:
+            sentence, search_from = [], 0
+
+            for entity_dict in raw_sentence:
+                if not isinstance(entity_dict, dict):
+                    repaired = True
+                    dropped += 1
+                    continue
+
+                entity, fixed = cls._salvage_entity(entity_dict, source, search_from)
+                repaired |= fixed
+
+                if entity is None:
+                    dropped += 1
+                    continue
+
+                sentence.append(entity)
+                search_from = entity.end_char
+
+            sentences.append(sentence)
+
+        return sentences, repaired, dropped
+
+    def _parse_prediction(self, prediction: str, source: str) -> List[List[Entity]]:
+        """Разбирает ответ, по возможности чиня его; ValueError — только если спасти нечего"""
+        try:
+            doc, repaired, truncated = json.loads(_extract_json_from_response(prediction)), False, False
+        except json.JSONDecodeError:
+            doc, repaired, truncated = parse_lenient_json(_strip_code_fence(prediction))
+
+        sentences, fixed, dropped = self._salvage_document(doc, source)
+        repaired |= fixed
+
+        # Пустой результат — сбой, только если ответ оборвался или ни одну сущность не удалось восстановить;
+        # полный ответ без сущностей ({"entities": []}, [[],]) — обычная ячейка без сущностей
+        if not any(sentences) and (truncated or dropped):
+            raise ValueError(f"Nothing could be salvaged from response ({dropped} malformed entities)")
+
+        if repaired:
+            self._count("salvaged")
+            self._count("dropped_entities", dropped)
+            metrics.increment("llm_parse_salvaged_total")
+
+        return sentences
 
     def retrieve(self, text: str) -> List[List[Entity]]:
+        # Импорт langchain тяжелый, поэтому выполняется только при первом запросе к LLM
+        from langchain.prompts import PromptTemplate
+
         ner_prompt = PromptTemplate(
             input_variables=["source"],
             template=self.PROMPT_TEMPLATE
         )
 
         prompt_text = ner_prompt.format(source=text)
+        prediction = ""
 
         for i in range(self._max_retries):
             try:
-                # Use invoke with proper message format for chat models
-                if hasattr(self.llm, 'invoke'):
-                    # Assume it's a chat model (most common case)
-                    response = self.llm.invoke([HumanMessage(content=prompt_text)])
-                    prediction = response.content if hasattr(response, 'content') else str(response)
-                else:
-                    # Fallback for legacy LLMs (unlikely)
-                    prediction = self.llm.predict(prompt_text)
-
-                # Clean and extract JSON
-                clean_json_str = _extract_json_from_response(prediction)
-                doc = json.loads(clean_json_str)
-
-                # Validate structure
-                if not isinstance(doc, list):
-                    raise ValueError("Expected top-level JSON array")
-
-                entities = []
-                for sentence in doc:
-                    if not isinstance(sentence, list):
-                        raise ValueError("Each sentence must be a list of entities")
-                    new_sentence = []
-                    for entity_dict in sentence:
-                        if not isinstance(entity_dict, dict):
-                            raise ValueError("Entity must be a dict")
-                        required_keys = {'text', 'type', 'start_char', 'end_char'}
-                        if not required_keys.issubset(entity_dict.keys()):
-                            raise ValueError(f"Entity missing keys: {required_keys - set(entity_dict.keys())}")
-                        new_sentence.append(
-                            Entity(
-                                text=entity_dict['text'],
-                                type=entity_dict['type'],
-                                start_char=entity_dict['start_char'],
-                                end_char=entity_dict['end_char']
-                            )
-                        )
-                    entities.append(new_sentence)
-                return entities
+                prediction = self._invoke(prompt_text)
+                self._count("responses")
+                return self._parse_prediction(prediction, text)
 
             except (json.JSONDecodeError, ValueError, KeyError) as e:
+                # Повторный запрос — только когда из ответа не удалось восстановить ничего
                 logger.error(f"Error while retrieving entity: {e}. Error type: {type(e).__name__}. Try {i}.")
+                self._count("retries")
+                metrics.increment("llm_parse_retries_total")
                 logger.debug(f"Raw LLM output: {prediction[:200]}...")  # optional: log snippet
 
         logger.error(f"Failed to retrieve entities from text after {self._max_retries} retries: {text[:100]}...")
-        return []  # or raise an exception if preferred
\ No newline at end of file
+        self._count("failures")
+        metrics.increment("llm_failures_total")
+        # Пустой результат помечается как сбой, чтобы кэш не запомнил ячейку как «без сущностей»
+        return FailedRetrieval()
+
+    def _build_packs(self, texts: List[str]) -> List[List[int]]:
+        """Жадно группирует индексы коротких текстов в пакеты в пределах бюджета токенов"""
+        packs = []
+        current, current_tokens = [], 0
+
+        for idx, text in enumerate(texts):
+            tokens = self._estimate_tokens(text)
+
+            if current and (len(current) >= self.pack_size or current_tokens + tokens > self.pack_token_budget):
+                packs.append(current)
+                current, current_tokens = [], 0
+
+            current.append(idx)
+            current_tokens += tokens
+
+        if current:
+            packs.append(current)
+
+        return packs
+
+    def _retrieve_pack(self, texts: List[str]) -> List[List[List[Entity]]]:
+        if len(texts) == 1:
+            return [self.retrieve(texts[0])]
+
+        # Переводы строк заменяются пробелами, чтобы не ломать нумерацию и смещения
+        sources = "\n".join(f"[{idx}] {text.translate(self.PACKED_WHITESPACE)}" for idx, text in enumerate(texts))
+        from langchain.prompts import PromptTemplate
+
+        prompt_text = PromptTemplate(
+            input_variables=["sources"],
+            template=self.PACKED_PROMPT_TEMPLATE
+        ).format(sources=sources)
+
+        results = [None] * len(texts)
+        prediction = ""
+
+        try:
+            prediction = self._invoke(prompt_text)
+            self._count("responses")
+
+            try:
+                doc, repaired, truncated = json.loads(_extract_json_object_from_response(prediction)), False, False
+            except json.JSONDecodeError:
+                doc, repaired, truncated = parse_lenient_json(_strip_code_fence(prediction))
+
+            if not isinstance(doc, dict):
+                raise ValueError("Expected top-level JSON object")
+
+            salvaged = False
+            last_key = next(reversed(doc), None)
+
+            for idx, text in enumerate(texts):
+                if str(idx) not in doc:
+                    metrics.increment("llm_packed_missing_keys_total")
+                    continue
+
+                try:
+                    sentences, fixed, dropped = self._salvage_document(doc[str(idx)], text)
+                except ValueError as e:
+                    logger.warning(f"Malformed packed result for text {idx}: {e}. Falling back to single call.")
+                    continue
+
+                # Обрыв задевает только последнюю разобранную ячейку: ее пустой результат ненадежен,
+                # и она уходит отдельным запросом
+                if not any(sentences) and ((truncated and str(idx) == last_key) or dropped):
+                    continue
+
+                results[idx] = sentences
+                salvaged |= repaired or fixed
+                self._count("dropped_entities", dropped)
+
+            if salvaged:
+                self._count("salvaged")
+                metrics.increment("llm_parse_salvaged_total")
+        except (json.JSONDecodeError, ValueError, KeyError) as e:
+            logger.error(f"Error while retrieving packed entities: {e}. Error type: {type(e).__name__}.")
+            metrics.increment("llm_packed_fallbacks_total")
+            logger.debug(f"Raw LLM output: {prediction[:200]}...")
+
+        # Ячейки, для которых пакетный ответ не удалось разобрать, обрабатываются по одной
+        for idx, text in enumerate(texts):
+            if results[idx] is None:
+                results[idx] = self.retrieve(text)
+
+        return results
+
+    def retrieve_batch(self, texts: List[str]) -> List[List[List[Entity]]]:
+        if self.pack_size > 1:
+            packs = self._build_packs(texts)
+            results = [None] * len(texts)
+
+            with ThreadPoolExecutor(max_workers=max(1, self.max_concurrency)) as executor:
+                pack_results = executor.map(self._retrieve_pack, [[texts[idx] for idx in pack] for pack in packs])
+
+                for pack, pack_result in zip(packs, pack_results):
+                    for idx, sentences in zip(pack, pack_result):
+                        results[idx] = sentences
+
+            return results
+
+        if self.max_concurrency <= 1:
+            return super().retrieve_batch(texts)
+
+        # Ошибки разбора изолированы внутри retrieve, поэтому одна строка не роняет остальные
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            return list(executor.map(self.retrieve, texts))
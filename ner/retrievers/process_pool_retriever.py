@@ -0,0 +1,86 @@
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Type
+
+from ner.base.entity_retriever import EntityRetriever
+from ner.base.models import Entity
+
+
+_worker_retriever: Optional[EntityRetriever] = None
+
+
+def _init_worker(retriever_class: Type[EntityRetriever], retriever_kwargs: dict, torch_threads: Optional[int]):
+    global _worker_retriever
+
+    if torch_threads:
+        import torch
+        torch.set_num_threads(torch_threads)
+
+    # Модель загружается один раз на процесс и живет до остановки пула
+    _worker_retriever = retriever_class(**retriever_kwargs)
+
+
+def _retrieve_shard(texts: List[str]) -> List[List[List[Entity]]]:
+    return _worker_retriever.retrieve_batch(texts)
+
+
+def _worker_cache_version() -> str:
+    return _worker_retriever.cache_version
+
+
+class ProcessPoolRetriever(EntityRetriever):
+    """Шардирует строки непрерывными блоками по процессам, в каждом из которых загружен свой retriever"""
+
+    def __init__(self, 
+                 retriever_class: Type[EntityRetriever], 
+                 workers: Optional[int] = None,
+                 torch_threads: Optional[int] = 1,
+                 min_shard_size: int = 16,
+                 **retriever_kwargs):
+        self.workers = workers or os.cpu_count() or 1
+        self.min_shard_size = min_shard_size
+        self._cache_version = None
+        # spawn вместо fork: torch плохо переносит fork после инициализации потоков
+        self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                             mp_context=multiprocessing.get_context("spawn"),
+                                             initializer=_init_worker,
+                                             initargs=(retriever_class, retriever_kwargs, torch_threads))
+
+    @property
+    def preferred_batch_size(self) -> int:
+        """Минимальный батч, при котором каждый процесс получает хотя бы один шард"""
+        return self.workers * self.min_shard_size
+
+    @property
+    def cache_version(self) -> str:
+        if self._cache_version is None:
+            self._cache_version = self._executor.submit(_worker_cache_version).result()
+        return self._cache_version
+
+    def retrieve(self, text: str) -> List[List[Entity]]:
+        return self.retrieve_batch([text])[0]
+
+    def retrieve_batch(self, texts: List[str]) -> List[List[List[Entity]]]:
+        if not texts:
+            return []
+
+        shard_size = max(self.min_shard_size, math.ceil(len(texts) / self.workers))
+        shards = [texts[start:start + shard_size] for start in range(0, len(texts), shard_size)]
+
+        results = []
+
+        for shard_results in self._executor.map(_retrieve_shard, shards):
+            results.extend(shard_results)
+
+        return results
+
+    def close(self):
+        self._executor.shutdown()
+
+    def __enter__(self) -> "ProcessPoolRetriever":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -1,26 +1,53 @@
+import hashlib
+import json
+import os
 from typing import List
 
-import stanza
-
 from ner.base.entity_retriever import EntityRetriever
-from ner.base.models import Entity
+from ner.base.models import Entity, EntitySpan
+from ner.utils import create_stanza_pipeline, import_stanza
 
 
 class StanzaRetriever(EntityRetriever):
-    def __init__(self):
-        self.nlp = stanza.Pipeline('ru', processors='tokenize,ner')
+    def __init__(self, 
+                 batch_size: int = 64, 
+                 lang: str = 'ru', 
+                 processors: str = 'tokenize,ner',
+                 package: str = 'default',
+                 **pipeline_kwargs):
+        self.lang = lang
+        self.processors = processors
+        self.package = package
+        self.nlp = create_stanza_pipeline(lang, processors=processors, package=package, **pipeline_kwargs)
+        self.batch_size = batch_size
+        self._model_fingerprint = self._fingerprint_models()
 
-    def retrieve(self, text: str) -> List[List[Entity]]:
-        doc = self.nlp(str(text))
-        sentences = doc.sentences
+    def _fingerprint_models(self) -> str:
+        """Размер и время изменения файлов моделей и resources.json: перекачанная модель меняет версию кэша"""
+        paths = {value 
+                 for processor in self.nlp.processors.values()
+                 for key, value in (getattr(processor, "config", None) or {}).items()
+                 if key.endswith("_path") and isinstance(value, str) and os.path.isfile(value)}
+
+        resources_path = os.path.join(self.nlp.dir, "resources.json")
+        if os.path.isfile(resources_path):
+            paths.add(resources_path)
 
+        stats = [(path, os.stat(path).st_size, os.stat(path).st_mtime_ns) for path in sorted(paths)]
+        return hashlib.sha256(json.dumps(stats).encode("utf-8")).hexdigest()[:12]
+
+    @property
+    def cache_version(self) -> str:
+        return f"stanza-{import_stanza().__version__}:{self.lang}:{self.processors}:{self.package}:{self._model_fingerprint}"
+
+    def _doc_to_entities(self, doc) -> List[List[Entity]]:
         entities = []
 
-        for sentense in sentences:
+        for sentense in doc.sentences:
             retrived_sentence = []
 
             for entity in sentense.ents:
-                retrived_sentence.append(Entity(
+                retrived_sentence.append(EntitySpan.create(
                     text=entity.text,
                     type=entity.type,
                     start_char=entity.start_char,
@@ -29,4 +56,24 @@ class StanzaRetriever(EntityRetriever):
             
             entities.append(retrived_sentence)
 
-        return entities
\ No newline at end of file
+        return entities
+
+    def retrieve(self, text: str) -> List[List[Entity]]:
+        doc = self.nlp(str(text))
+        return self._doc_to_entities(doc)
+
+    def retrieve_batch(self, texts: List[str]) -> List[List[List[Entity]]]:
+        texts = [str(text) for text in texts]
+        results = [None] * len(texts)
+
+        # Группируем тексты близкой длины, чтобы уменьшить паддинг внутри батча
+        order = sorted(range(len(texts)), key=lambda idx: len(texts[idx]))
+
+        for batch_start in range(0, len(order), self.batch_size):
+            batch_indices = order[batch_start:batch_start + self.batch_size]
+            docs = self.nlp.bulk_process([texts[idx] for idx in batch_indices])
+
+            for idx, doc in zip(batch_indices, docs):
+                results[idx] = self._doc_to_entities(doc)
+
+        return results
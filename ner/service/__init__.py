@@ -0,0 +1,2 @@
+from .batcher import MicroBatcher
+from .client import ServiceClient, ServiceRetriever, ServiceLinker
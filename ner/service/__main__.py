@@ -0,0 +1,29 @@
+import argparse
+import logging
+
+from ner.base.models import LinkingType, NERType
+
+from .server import NERService
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Long-running NER/NEL service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ner-type", action="append", default=[], choices=[nt.value for nt in NERType],
+                        help="NER model to load at startup, may be repeated")
+    parser.add_argument("--linking-type", action="append", default=[], choices=[lt.value for lt in LinkingType],
+                        help="Linker to create at startup, may be repeated")
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=10.0)
+    parser.add_argument("--cache-path", default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    service = NERService(max_batch_size=args.max_batch_size, 
+                         max_wait_ms=args.max_wait_ms, 
+                         cache_path=args.cache_path)
+    service.warm_up(ner_types=[NERType(value) for value in args.ner_type],
+                    linking_types=[LinkingType(value) for value in args.linking_type])
+    service.serve(host=args.host, port=args.port)
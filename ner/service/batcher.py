@@ -0,0 +1,72 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Generic, List, TypeVar
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """Собирает элементы из параллельных запросов в общие батчи для пакетного инференса"""
+
+    def __init__(self, 
+                 process: Callable[[List[T]], List[R]], 
+                 max_batch_size: int = 64, 
+                 max_wait_ms: float = 10.0):
+        self.process = process
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue: "queue.Queue[tuple[List[T], Future]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, items: List[T]) -> List[R]:
+        """Блокирует вызывающий поток до получения результатов для своих элементов"""
+        if not items:
+            return []
+
+        future = Future()
+        self._queue.put((items, future))
+        return future.result()
+
+    def _collect(self) -> List[tuple]:
+        requests = [self._queue.get()]
+        size = len(requests[0][0])
+        deadline = time.monotonic() + self.max_wait_ms / 1000
+
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+
+            if remaining <= 0:
+                break
+
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+
+            requests.append(request)
+            size += len(request[0])
+
+        return requests
+
+    def _run(self):
+        while True:
+            requests = self._collect()
+            items = [item for request_items, _ in requests for item in request_items]
+
+            try:
+                results = self.process(items)
+            except Exception as e:
+                for _, future in requests:
+                    future.set_exception(e)
+                continue
+
+            position = 0
+
+            for request_items, future in requests:
+                future.set_result(results[position:position + len(request_items)])
+                position += len(request_items)
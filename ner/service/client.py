@@ -0,0 +1,57 @@
+from typing import List
+
+import requests
+
+from ner.base.entity_retriever import EntityRetriever
+from ner.base.linker import Linker
+from ner.base.models import CompactNERResult, Entity, LinkedEntity, LinkingType, NERResult, NERType
+
+
+class ServiceClient:
+    def __init__(self, base_url: str = "http://127.0.0.1:8765", timeout: float = 600.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def post(self, path: str, payload: dict) -> dict:
+        response = self.session.post(f"{self.base_url}{path}", json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+
+class ServiceRetriever(EntityRetriever):
+    """Retriever, который отправляет тексты в запущенный NER-сервис вместо локальной загрузки модели"""
+
+    def __init__(self, ner_type: NERType, base_url: str = "http://127.0.0.1:8765", timeout: float = 600.0):
+        self.ner_type = ner_type
+        self.client = ServiceClient(base_url=base_url, timeout=timeout)
+
+    @property
+    def cache_version(self) -> str:
+        return f"service:{self.client.base_url}:{self.ner_type.value}"
+
+    def retrieve(self, text: str) -> List[List[Entity]]:
+        return self.retrieve_batch([text])[0]
+
+    def retrieve_batch(self, texts: List[str]) -> List[List[List[Entity]]]:
+        response = self.client.post("/retrieve", {"ner_type": self.ner_type.value, 
+                                                  "texts": [str(text) for text in texts]})
+        # Ответ проверяется pydantic, но дальше по пайплайну идут компактные EntitySpan, как у локальных retriever'ов
+        return [CompactNERResult.from_ner_result(NERResult.model_validate(result)).sentences 
+                for result in response["results"]]
+
+
+class ServiceLinker(Linker):
+    def __init__(self, linking_type: LinkingType, base_url: str = "http://127.0.0.1:8765", timeout: float = 600.0):
+        self.linking_type = linking_type
+        self.client = ServiceClient(base_url=base_url, timeout=timeout)
+
+    def link(self, entity: Entity) -> LinkedEntity:
+        return self.link_batch([entity])[0]
+
+    def link_batch(self, entities: List[Entity]) -> List[LinkedEntity]:
+        # В пайплайне приходят и EntitySpan (например, запросы нормализации), поэтому сериализуем по атрибутам
+        response = self.client.post("/link", {"linking_type": self.linking_type.value,
+                                              "entities": [Entity.model_validate(entity, from_attributes=True).model_dump() 
+                                                           for entity in entities]})
+        return [LinkedEntity(entity=entity, link=link) for entity, link in zip(entities, response["links"])]
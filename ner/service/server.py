@@ -0,0 +1,126 @@
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List
+
+from ner.base.entity_retriever import EntityRetriever
+from ner.base.linker import Linker
+from ner.base.models import CompactNERResult, Entity, LinkingType, NERResult, NERType
+from ner.factories import LinkerFactory, RetrieverFactory
+
+from .batcher import MicroBatcher
+
+
+logger = logging.getLogger(__name__)
+
+
+class NERService:
+    """Держит загруженные retriever'ы и linker'ы и группирует входящие запросы в батчи"""
+
+    def __init__(self,
+                 max_batch_size: int = 64,
+                 max_wait_ms: float = 10.0,
+                 cache_path: str | Path = None,
+                 retriever_options: dict = None,
+                 linker_options: dict = None):
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.cache_path = cache_path
+        self.retriever_options = retriever_options or {}
+        self.linker_options = linker_options or {}
+        self._retriever_batchers: Dict[NERType, MicroBatcher] = {}
+        self._linkers: Dict[LinkingType, Linker] = {}
+        self._lock = threading.Lock()
+
+    def _get_retriever_batcher(self, ner_type: NERType) -> MicroBatcher:
+        with self._lock:
+            if ner_type not in self._retriever_batchers:
+                retriever = RetrieverFactory.create_from_ner_type(ner_type=ner_type, 
+                                                                  cache_path=self.cache_path,
+                                                                  **self.retriever_options)
+                self._retriever_batchers[ner_type] = MicroBatcher(retriever.retrieve_batch,
+                                                                  max_batch_size=self.max_batch_size,
+                                                                  max_wait_ms=self.max_wait_ms)
+            return self._retriever_batchers[ner_type]
+
+    def _get_linker(self, linking_type: LinkingType) -> Linker:
+        with self._lock:
+            if linking_type not in self._linkers:
+                self._linkers[linking_type] = LinkerFactory.create_from_linking_type(linking_type=linking_type,
+                                                                                     cache_path=self.cache_path,
+                                                                                     **self.linker_options)
+            return self._linkers[linking_type]
+
+    def warm_up(self, ner_types: List[NERType] = (), linking_types: List[LinkingType] = ()):
+        for ner_type in ner_types:
+            self._get_retriever_batcher(ner_type)
+
+        for linking_type in linking_types:
+            self._get_linker(linking_type)
+
+    def retrieve(self, ner_type: NERType, texts: List[str]) -> List[NERResult]:
+        batcher = self._get_retriever_batcher(ner_type)
+        return [CompactNERResult(sentences).to_ner_result() for sentences in batcher.submit([str(text) for text in texts])]
+
+    def link(self, linking_type: LinkingType, entities: List[Entity]) -> List[str]:
+        linker = self._get_linker(linking_type)
+        return [linked_entity.link for linked_entity in linker.link_batch(entities)]
+
+    def _make_handler(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send_json(self, status: int, payload: dict):
+                body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == "/health":
+                    self._send_json(200, {"status": "ok"})
+                else:
+                    self._send_json(404, {"error": "Not found"})
+
+            def do_POST(self):
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    payload = json.loads(self.rfile.read(length))
+
+                    if self.path == "/retrieve":
+                        results = service.retrieve(NERType(payload["ner_type"]), payload["texts"])
+                        self._send_json(200, {"results": [result.model_dump() for result in results]})
+                    elif self.path == "/link":
+                        entities = [Entity.model_validate(entity) for entity in payload["entities"]]
+                        links = service.link(LinkingType(payload["linking_type"]), entities)
+                        self._send_json(200, {"links": links})
+                    else:
+                        self._send_json(404, {"error": "Not found"})
+                except (json.JSONDecodeError, KeyError, ValueError) as e:
+                    self._send_json(400, {"error": f"{type(e).__name__}: {e}"})
+                except Exception as e:
+                    logger.exception("Error while handling request")
+                    self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        return Handler
+
+    def create_server(self, host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+        server = ThreadingHTTPServer((host, port), self._make_handler())
+        server.daemon_threads = True
+        return server
+
+    def serve(self, host: str = "127.0.0.1", port: int = 8765):
+        server = self.create_server(host, port)
+        logger.info(f"NER service is listening on http://{host}:{server.server_address[1]}")
+
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
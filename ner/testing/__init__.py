@@ -0,0 +1,2 @@
+from .dbpedia_stub import DBPediaStubServer
+from .fake_chat_model import FakeChatModel
@@ -0,0 +1,99 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+
+class DBPediaStubServer:
+    """Локальная замена lookup.dbpedia.org с детерминированными ответами и управляемыми сбоями"""
+
+    def __init__(self,
+                 host: str = "127.0.0.1",
+                 port: int = 0,
+                 latency: float = 0.0,
+                 error_rate: float = 0.0,
+                 throttle_rate: float = 0.0,
+                 not_found_rate: float = 0.0,
+                 seed: int = 0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.not_found_rate = not_found_rate
+        self.request_count = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/search"
+
+    def _next_outcome(self) -> str:
+        with self._lock:
+            self.request_count += 1
+            roll = self._random.random()
+
+        if roll < self.throttle_rate:
+            return "throttle"
+        if roll < self.throttle_rate + self.error_rate:
+            return "error"
+        return "ok"
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if stub.latency:
+                    time.sleep(stub.latency)
+
+                outcome = stub._next_outcome()
+
+                if outcome == "throttle":
+                    self.send_response(429)
+                    self.send_header("Retry-After", "0")
+                    self.end_headers()
+                    return
+
+                if outcome == "error":
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+
+                query = parse_qs(urlparse(self.path).query).get("query", [""])[0]
+                # Детерминированно: одна и та же строка всегда дает один и тот же ответ
+                found = random.Random(query).random() >= stub.not_found_rate
+                docs = [{"resource": [f"http://ru.dbpedia.org/resource/{query.replace(' ', '_')}"]}] if found else []
+                body = json.dumps({"docs": docs}, ensure_ascii=False).encode("utf-8")
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "DBPediaStubServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "DBPediaStubServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
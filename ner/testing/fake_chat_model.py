@@ -0,0 +1,70 @@
+import json
+import random
+import re
+import threading
+import time
+from typing import List
+
+
+class FakeChatResponse:
+    def __init__(self, content: str):
+        self.content = content
+
+
+class FakeChatModel:
+    """Детерминированная замена чат-модели: размечает слова с заглавной буквы как сущности"""
+
+    ENTITY_PATTERN = re.compile(r"[A-ZА-ЯЁ][\w-]+")
+    SINGLE_SOURCE_PATTERN = re.compile(r"Текст: (.*)\nОтвет: $", re.S)
+    PACKED_SOURCE_PATTERN = re.compile(r"^\[(\d+)\] (.*)$", re.M)
+
+    def __init__(self, latency: float = 0.0, malformed_rate: float = 0.0, seed: int = 0, model: str = "fake"):
+        self.latency = latency
+        self.malformed_rate = malformed_rate
+        self.model = model
+        self.call_count = 0
+        self.malformed_count = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        # Модель передается в процессы пула (ProcessPoolRetriever), а блокировка не сериализуется
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _entities(self, text: str) -> List[List[dict]]:
+        return [[{"text": match.group(), "type": "LOC", "start_char": match.start(), "end_char": match.end()}
+                 for match in self.ENTITY_PATTERN.finditer(text)]]
+
+    def invoke(self, messages) -> FakeChatResponse:
+        prompt = messages[-1].content
+
+        with self._lock:
+            self.call_count += 1
+            malformed = self._random.random() < self.malformed_rate
+            self.malformed_count += malformed
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        if "Тексты:" in prompt:
+            sources = prompt[prompt.rindex("Тексты:"):]
+            payload = {index: self._entities(text) for index, text in self.PACKED_SOURCE_PATTERN.findall(sources)}
+        else:
+            match = self.SINGLE_SOURCE_PATTERN.search(prompt)
+            source = match.group(1) if match else ""
+            # Берем текст после последнего вхождения «Текст: », как сделала бы модель
+            source = source[source.rfind("Текст: ") + len("Текст: "):] if "Текст: " in source else source
+            payload = self._entities(source)
+
+        content = json.dumps(payload, ensure_ascii=False)
+
+        if malformed:
+            content = content[:len(content) // 2]
+
+        return FakeChatResponse(f"```json\n{content}\n```")
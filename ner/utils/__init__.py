@@ -0,0 +1,3 @@
+from .rate_limit import TokenBucket, CircuitBreaker, CircuitOpenError, exponential_backoff
+from .json_repair import parse_lenient_json
+from .stanza_loader import create_stanza_pipeline, import_stanza
@@ -0,0 +1,259 @@
+import json
+from typing import Any, List, Tuple
+
+
+class _LenientJSONParser:
+    """Разбор почти-JSON ответов LLM: одинарные кавычки, висячие и пропущенные запятые, оборванный конец
+
+    Встретив конец текста, парсер закрывает все открытые массивы и объекты, отбрасывая
+    незавершенную строку. Флаг repaired показывает, что вход не был строгим JSON,
+    truncated — что ответ оборвался и часть значений могла потеряться.
+    """
+
+    LITERALS = {"true": True, "false": False, "null": None, "True": True, "False": False, "None": None}
+    ESCAPES = {'"': '"', "'": "'", "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+    NUMBER_CHARS = frozenset("0123456789+-.eE")
+    WHITESPACE = frozenset(" \t\r\n")
+
+    class Truncated(Exception):
+        pass
+
+    def __init__(self, text: str):
+        self.text = text
+        self.pos = 0
+        self.repaired = False
+        self.truncated = False
+
+    def _at_end(self) -> bool:
+        while self.pos < len(self.text) and self.text[self.pos] in self.WHITESPACE:
+            self.pos += 1
+        return self.pos >= len(self.text)
+
+    def _value(self) -> Any:
+        if self._at_end():
+            raise self.Truncated()
+
+        char = self.text[self.pos]
+
+        if char == "[":
+            return self._array()
+        if char == "{":
+            return self._object()
+        if char in "\"'":
+            return self._string()
+        if char in "-0123456789":
+            return self._number()
+
+        return self._literal()
+
+    def _array(self) -> List:
+        self.pos += 1
+        items = []
+        expect_value = True
+
+        while not self._at_end():
+            char = self.text[self.pos]
+
+            if char == "]":
+                self.pos += 1
+                # Висячая запятая перед закрывающей скобкой
+                self.repaired |= bool(items) and expect_value
+                return items
+
+            if char == ",":
+                self.pos += 1
+                self.repaired |= expect_value
+                expect_value = True
+                continue
+
+            if not expect_value:
+                # Пропущенная запятая между элементами
+                self.repaired = True
+
+            try:
+                items.append(self._value())
+            except self.Truncated:
+                break
+
+            expect_value = False
+
+        self.repaired = self.truncated = True
+        return items
+
+    def _object(self) -> dict:
+        self.pos += 1
+        result = {}
+        expect_key = True
+
+        while not self._at_end():
+            char = self.text[self.pos]
+
+            if char == "}":
+                self.pos += 1
+                self.repaired |= bool(result) and expect_key
+                return result
+
+            if char == ",":
+                self.pos += 1
+                self.repaired |= expect_key
+                expect_key = True
+                continue
+
+            if not expect_key:
+                self.repaired = True
+
+            try:
+                key = self._string() if char in "\"'" else self._bare_key()
+
+                if self._at_end():
+                    break
+
+                if self.text[self.pos] != ":":
+                    raise ValueError(f"Expected ':' at position {self.pos}")
+
+                self.pos += 1
+                result[key] = self._value()
+            except self.Truncated:
+                break
+
+            expect_key = False
+
+        self.repaired = self.truncated = True
+        return result
+
+    def _string(self) -> str:
+        quote = self.text[self.pos]
+        self.repaired |= quote != '"'
+        self.pos += 1
+        chars = []
+
+        while self.pos < len(self.text):
+            char = self.text[self.pos]
+
+            if char == quote:
+                self.pos += 1
+                return "".join(chars)
+
+            if char == "\\":
+                if self.pos + 1 >= len(self.text):
+                    break
+
+                escape = self.text[self.pos + 1]
+
+                if escape == "u":
+                    code = self.text[self.pos + 2:self.pos + 6]
+
+                    if len(code) < 4:
+                        break
+
+                    chars.append(chr(int(code, 16)))
+                    self.pos += 6
+                    continue
+
+                chars.append(self.ESCAPES.get(escape, escape))
+                self.pos += 2
+                continue
+
+            chars.append(char)
+            self.pos += 1
+
+        raise self.Truncated()
+
+    def _number(self):
+        start = self.pos
+
+        while self.pos < len(self.text) and self.text[self.pos] in self.NUMBER_CHARS:
+            self.pos += 1
+
+        token = self.text[start:self.pos]
+
+        try:
+            return int(token)
+        except ValueError:
+            pass
+
+        try:
+            return float(token)
+        except ValueError:
+            if self.pos >= len(self.text):
+                raise self.Truncated()
+            raise ValueError(f"Invalid number {token!r} at position {start}")
+
+    def _identifier(self) -> str:
+        start = self.pos
+
+        while self.pos < len(self.text) and (self.text[self.pos].isalnum() or self.text[self.pos] == "_"):
+            self.pos += 1
+
+        return self.text[start:self.pos]
+
+    def _literal(self):
+        start = self.pos
+        word = self._identifier()
+
+        if word not in self.LITERALS:
+            if self.pos >= len(self.text):
+                raise self.Truncated()
+            raise ValueError(f"Unexpected token {self.text[start:start + 20]!r} at position {start}")
+
+        self.repaired |= word not in ("true", "false", "null")
+        return self.LITERALS[word]
+
+    def _bare_key(self) -> str:
+        start = self.pos
+        key = self._identifier()
+
+        if self.pos >= len(self.text):
+            raise self.Truncated()
+
+        if not key:
+            raise ValueError(f"Unexpected character {self.text[start]!r} at position {start}")
+
+        self.repaired = True
+        return key
+
+    def parse(self) -> Any:
+        value = self._value()
+
+        if self._at_end() or self.text[self.pos] != ",":
+            return value
+
+        # Несколько значений через запятую без внешних скобок: {...}, {...}
+        self.repaired = True
+        values = [value]
+
+        while not self._at_end() and self.text[self.pos] == ",":
+            self.pos += 1
+
+            try:
+                values.append(self._value())
+            except self.Truncated:
+                self.truncated = True
+                break
+
+        return values
+
+
+def parse_lenient_json(text: str) -> Tuple[Any, bool, bool]:
+    """Разбирает JSON с первой скобки; возвращает (значение, был ли нужен ремонт, оборван ли ответ)
+
+    Текст вокруг JSON (пояснения модели) ремонтом не считается.
+    """
+    try:
+        return json.loads(text), False, False
+    except json.JSONDecodeError:
+        pass
+
+    starts = [idx for idx in (text.find("["), text.find("{")) if idx != -1]
+
+    if not starts:
+        raise ValueError("No JSON array or object found in response")
+
+    parser = _LenientJSONParser(text[min(starts):])
+
+    try:
+        value = parser.parse()
+    except _LenientJSONParser.Truncated:
+        raise ValueError("Response is truncated before any value")
+
+    return value, parser.repaired, parser.truncated
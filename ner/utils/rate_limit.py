@@ -0,0 +1,118 @@
+import random
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """Потокобезопасный token bucket с адаптивной скоростью (AIMD)"""
+
+    def __init__(self,
+                 rate: float,
+                 capacity: Optional[float] = None,
+                 min_rate: Optional[float] = None,
+                 recovery_step: Optional[float] = None):
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.min_rate = min_rate if min_rate is not None else rate / 16
+        self.recovery_step = recovery_step if recovery_step is not None else rate / 20
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def acquire(self, tokens: float = 1.0):
+        """Блокирует поток, пока в корзине не наберется нужное число токенов"""
+        # Запрос больше емкости корзины иначе никогда не дождался бы токенов
+        tokens = min(tokens, self.capacity)
+
+        while True:
+            with self._lock:
+                self._refill()
+
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+
+                wait = (tokens - self._tokens) / self.rate
+
+            time.sleep(wait)
+
+    def penalize(self):
+        """Мультипликативно снижает скорость после ответа 429"""
+        with self._lock:
+            self._refill()
+            self.rate = max(self.min_rate, self.rate / 2)
+
+    def reward(self):
+        """Аддитивно возвращает скорость к исходной после успешного запроса"""
+        with self._lock:
+            if self.rate < self.max_rate:
+                self._refill()
+                self.rate = min(self.max_rate, self.rate + self.recovery_step)
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    """Размыкает цепь после серии ошибок и пропускает пробный запрос по истечении reset_timeout"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 10, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    raise CircuitOpenError("Circuit breaker is open")
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+
+            if self.state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    raise CircuitOpenError("Circuit breaker is half-open, trial request in flight")
+                self._trial_in_flight = True
+
+    def retry_in(self) -> float:
+        """Сколько секунд осталось до пробного запроса; 0, если цепь не разомкнута"""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+def exponential_backoff(attempt: int, base: float = 0.5, maximum: float = 30.0) -> float:
+    """Задержка перед повтором с полным джиттером"""
+    return random.uniform(0, min(maximum, base * (2 ** attempt)))
@@ -0,0 +1,8 @@
+def import_stanza():
+    """Импорт stanza тяжелый (torch, модели), поэтому выполняется только при создании пайплайна"""
+    import stanza
+    return stanza
+
+
+def create_stanza_pipeline(lang: str, processors: str, **pipeline_kwargs):
+    return import_stanza().Pipeline(lang, processors=processors, **pipeline_kwargs)
@@ -0,0 +1,44 @@
+from ner.cache import SQLiteCache
+from ner.retrievers import CachedRetriever, LLMRetriever
+from ner.testing.fake_chat_model import FakeChatModel, FakeChatResponse
+
+
+class BrokenChatModel:
+    def __init__(self):
+        self.call_count = 0
+
+    def invoke(self, messages):
+        self.call_count += 1
+        return FakeChatResponse("Не удалось разобрать текст")
+
+
+def test_failed_llm_result_is_not_cached(tmp_path):
+    llm = BrokenChatModel()
+    retriever = CachedRetriever(LLMRetriever(llm, max_retries=2), SQLiteCache(tmp_path / "cache.db"), "ner")
+
+    assert retriever.retrieve_batch(["Я живу в Москве"]) == [[]]
+    assert retriever.retrieve_batch(["Я живу в Москве"]) == [[]]
+    # Оба запуска обращаются к модели: сбой первого не запомнен как «нет сущностей»
+    assert llm.call_count == 4
+
+
+def test_successful_llm_result_is_cached(tmp_path):
+    llm = FakeChatModel()
+    retriever = CachedRetriever(LLMRetriever(llm), SQLiteCache(tmp_path / "cache.db"), "ner")
+
+    first = retriever.retrieve_batch(["Я живу в Москве"])
+    second = retriever.retrieve_batch(["Я живу в Москве"])
+
+    assert first == second
+    assert llm.call_count == 1
+
+
+def test_switching_configurations_keeps_both_caches(tmp_path):
+    llm = FakeChatModel()
+    cache = SQLiteCache(tmp_path / "cache.db")
+
+    for pack_size in (1, 4, 1, 4):
+        CachedRetriever(LLMRetriever(llm, pack_size=pack_size), cache, "ner").retrieve_batch(["Я живу в Москве"])
+
+    # Промпт с упаковкой дает другую версию кэша, но переключение не стирает записи первой конфигурации
+    assert llm.call_count == 2
@@ -0,0 +1,90 @@
+from typing import Dict, List
+
+from ner.base.entity_retriever import EntityRetriever
+from ner.base.models import EntitySpan, FailedRetrieval
+from ner.retrievers import CascadeRetriever, EscalationPolicy
+
+
+class TableRetriever(EntityRetriever):
+    """Отдает заранее заданный результат для текста и запоминает, какие тексты получил"""
+
+    def __init__(self, results: Dict[str, List[List[EntitySpan]]], name: str):
+        self.results = results
+        self.name = name
+        self.texts: List[str] = []
+
+    @property
+    def cache_version(self) -> str:
+        return self.name
+
+    def retrieve(self, text: str):
+        return self.retrieve_batch([text])[0]
+
+    def retrieve_batch(self, texts: List[str]):
+        self.texts.extend(texts)
+        return [self.results.get(text, []) for text in texts]
+
+
+def loc(text: str, source: str) -> EntitySpan:
+    start = source.index(text)
+    return EntitySpan.create(text, "LOC", start, start + len(text))
+
+
+CONFIDENT = "Я живу в Москве"
+UNCERTAIN = "Он читал Войну и мир"
+MISSED = "Мы поехали в Казань"
+PLAIN = "ничего интересного"
+
+
+def make_cascade(fallback_results=None):
+    primary = TableRetriever({CONFIDENT: [[loc("Москве", CONFIDENT)]],
+                              UNCERTAIN: [[EntitySpan.create("Войну и мир", "MISC", 9, 20)]]}, "primary")
+    fallback = TableRetriever(fallback_results if fallback_results is not None else
+                              {UNCERTAIN: [[EntitySpan.create("Войну и мир", "ORG", 9, 20)]],
+                               MISSED: [[loc("Казань", MISSED)]]}, "fallback")
+    return CascadeRetriever(primary=primary, fallback=fallback), primary, fallback
+
+
+def test_only_doubtful_cells_are_escalated():
+    cascade, primary, fallback = make_cascade()
+
+    results = cascade.retrieve_batch([CONFIDENT, UNCERTAIN, MISSED, PLAIN])
+
+    assert primary.texts == [CONFIDENT, UNCERTAIN, MISSED, PLAIN]
+    assert fallback.texts == [UNCERTAIN, MISSED]
+    assert [[entity.type for sentence in result for entity in sentence] for result in results] == \
+        [["LOC"], ["ORG"], ["LOC"], []]
+
+    assert cascade.stats.total == 4
+    assert cascade.stats.escalated == 2
+    assert cascade.stats.reasons == {"uncertain_type": 1, "capitalized_without_entities": 1}
+
+
+def test_policy_reasons():
+    policy = EscalationPolicy(max_chars=20)
+
+    assert policy.reason("Очень длинный текст без точки", []) == "length"
+    assert policy.reason("Улица Lенина", [[EntitySpan.create("Улица", "LOC", 0, 5)]]) == "mixed_scripts"
+    # Заглавная буква в начале предложения не считается признаком имени
+    assert policy.reason("Дождь. Снег", []) is None
+    assert policy.reason("тут был Иван", []) == "capitalized_without_entities"
+
+
+def test_empty_fallback_keeps_primary_result():
+    cascade, _, _ = make_cascade(fallback_results={})
+
+    result = cascade.retrieve(UNCERTAIN)
+
+    assert [entity.type for sentence in result for entity in sentence] == ["MISC"]
+
+
+def test_fallback_failure_is_propagated():
+    cascade, _, fallback = make_cascade()
+    fallback.retrieve_batch = lambda texts: [FailedRetrieval() for _ in texts]
+
+    confident, uncertain = cascade.retrieve_batch([CONFIDENT, UNCERTAIN])
+
+    assert not isinstance(confident, FailedRetrieval)
+    # Остается результат primary, но он помечен как сбой и не попадет в кэш
+    assert isinstance(uncertain, FailedRetrieval)
+    assert [entity.type for sentence in uncertain for entity in sentence] == ["MISC"]
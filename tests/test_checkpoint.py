@@ -0,0 +1,77 @@
+import pandas as pd
+import pytest
+
+import main
+from ner.pipeline import CellFilter
+from ner.retrievers import LLMRetriever
+from ner.testing.fake_chat_model import FakeChatModel
+
+
+class InterruptedRetriever(LLMRetriever):
+    """Падает на заданном батче, как прерванный посреди таблицы запуск"""
+
+    def __init__(self, fail_on_batch: int):
+        super().__init__(FakeChatModel())
+        self.fail_on_batch = fail_on_batch
+        self.batches = 0
+
+    def retrieve_batch(self, texts):
+        self.batches += 1
+
+        if self.batches == self.fail_on_batch:
+            raise KeyboardInterrupt()
+
+        return super().retrieve_batch(texts)
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "source.csv"
+    pd.DataFrame({"id": range(7),
+                  "text": ["Москва", "Я живу в Казани", "12", "Петр и Мария", "Москва", "Тверь", "Нет"]}
+                 ).to_csv(path, sep="|", index=False)
+    return path
+
+
+def run(monkeypatch, retriever, **options):
+    monkeypatch.setattr(main.RetrieverFactory, "create_from_ner_type", lambda **kwargs: retriever)
+    main.main(src_column="text", link=False, batch_size=2, **options)
+
+
+@pytest.mark.parametrize("options", [{"checkpoint_interval": 2}, 
+                                     {"chunk_size": 4, "checkpoint_interval": 2}])
+def test_resumed_output_is_byte_identical(monkeypatch, tmp_path, source, options):
+    run(monkeypatch, LLMRetriever(FakeChatModel()), src_file_path=source, 
+        output_file_path=tmp_path / "expected.csv", **options)
+
+    output = tmp_path / "output.csv"
+
+    with pytest.raises(KeyboardInterrupt):
+        run(monkeypatch, InterruptedRetriever(fail_on_batch=3), src_file_path=source, 
+            output_file_path=output, **options)
+
+    assert main.RunJournal.default_path(output).exists()
+
+    resumed = InterruptedRetriever(fail_on_batch=0)
+    run(monkeypatch, resumed, src_file_path=source, output_file_path=output, resume=True, **options)
+
+    # Два завершенных диапазона берутся из журнала, остальные считаются заново
+    assert resumed.batches == 2
+    assert output.read_bytes() == (tmp_path / "expected.csv").read_bytes()
+    assert not main.RunJournal.default_path(output).exists()
+
+
+def test_resume_rejects_changed_options(monkeypatch, tmp_path, source):
+    output = tmp_path / "output.csv"
+
+    with pytest.raises(KeyboardInterrupt):
+        run(monkeypatch, InterruptedRetriever(fail_on_batch=2), src_file_path=source, 
+            output_file_path=output, checkpoint_interval=2)
+
+    with pytest.raises(RuntimeError, match="different run"):
+        run(monkeypatch, LLMRetriever(FakeChatModel()), src_file_path=source, output_file_path=output, 
+            checkpoint_interval=2, resume=True, cell_filter=CellFilter(min_letters=3))
+
+    with pytest.raises(RuntimeError, match="different run"):
+        run(monkeypatch, LLMRetriever(FakeChatModel()), src_file_path=source, output_file_path=output, 
+            checkpoint_interval=2, resume=True, retriever_options={"pack_size": 4})
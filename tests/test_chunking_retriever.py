@@ -0,0 +1,69 @@
+import re
+from typing import List
+
+import pytest
+
+from ner.base.entity_retriever import EntityRetriever
+from ner.base.models import EntitySpan
+from ner.retrievers import ChunkingRetriever
+
+
+class WordRetriever(EntityRetriever):
+    """Каждое слово — сущность LOC; запоминает тексты кусков"""
+
+    WORD = re.compile(r"\w+")
+
+    def __init__(self):
+        self.texts: List[str] = []
+
+    @property
+    def cache_version(self) -> str:
+        return "words"
+
+    def retrieve(self, text: str):
+        return self.retrieve_batch([text])[0]
+
+    def retrieve_batch(self, texts: List[str]):
+        self.texts.extend(texts)
+        return [[[EntitySpan.create(match.group(), "LOC", match.start(), match.end()) 
+                  for match in self.WORD.finditer(text)]]
+                for text in texts]
+
+
+TEXT = "Москва стоит на реке. Казань на Волге! Тверь тоже на Волге, а Пермь на Каме."
+
+
+def flatten(sentences):
+    return [(entity.text, entity.start_char, entity.end_char) for sentence in sentences for entity in sentence]
+
+
+def test_offsets_are_remapped_to_the_source_cell():
+    chunked = ChunkingRetriever(WordRetriever(), max_chars=25)
+    sentences = chunked.retrieve(TEXT)
+
+    assert len(chunked.retriever.texts) > 1
+    assert all(len(text) <= 25 for text in chunked.retriever.texts)
+    assert flatten(sentences) == flatten(WordRetriever().retrieve(TEXT))
+    assert all(TEXT[start:end] == text for text, start, end in flatten(sentences))
+
+
+def test_entity_cut_at_chunk_boundary_is_merged():
+    text = "Абвгдежзиклмнопрст"
+    sentences = ChunkingRetriever(WordRetriever(), max_chars=10).retrieve(text)
+
+    assert flatten(sentences) == [(text, 0, len(text))]
+
+
+def test_token_budget_limits_chunks():
+    count_words = lambda text: len(text.split())
+    chunked = ChunkingRetriever(WordRetriever(), max_chars=1000, max_tokens=3, count_tokens=count_words)
+    sentences = chunked.retrieve(TEXT)
+
+    assert all(count_words(text) <= 3 for text in chunked.retriever.texts)
+    assert flatten(sentences) == flatten(WordRetriever().retrieve(TEXT))
+    assert chunked.cache_version == "words:chunks-1000-3t"
+
+
+def test_token_budget_requires_a_counter():
+    with pytest.raises(ValueError, match="count_tokens"):
+        ChunkingRetriever(WordRetriever(), max_tokens=100)
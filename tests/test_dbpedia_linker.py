@@ -0,0 +1,71 @@
+import json
+
+import pytest
+import requests
+
+from ner.linkers import DBPediaLinker, LinkingUnavailableError
+from ner.utils import CircuitBreaker
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.status_code = 200
+        self.headers = {}
+        self.text = json.dumps(payload)
+        self.content = self.text.encode("utf-8")
+
+    def raise_for_status(self):
+        pass
+
+
+class FlakySession:
+    """Первые failures запросов падают с ошибкой соединения, затем DBpedia отвечает"""
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.calls = 0
+
+    def get(self, url, params=None, timeout=None):
+        self.calls += 1
+
+        if self.calls <= self.failures:
+            raise requests.ConnectionError("connection refused")
+
+        return FakeResponse({"docs": [{"resource": ["http://dbpedia.org/resource/Москва"]}]})
+
+
+def make_linker(failures: int, **kwargs) -> DBPediaLinker:
+    linker = DBPediaLinker(max_retries=0, backoff_base=0.0, 
+                           circuit_breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0.2), **kwargs)
+    linker.session = FlakySession(failures)
+    return linker
+
+
+def test_exhausted_retries_raise_instead_of_not_found():
+    linker = make_linker(failures=1)
+
+    with pytest.raises(LinkingUnavailableError):
+        linker.lookup("Москва")
+
+
+def test_open_circuit_waits_for_trial_request():
+    linker = make_linker(failures=1)
+
+    with pytest.raises(LinkingUnavailableError):
+        linker.lookup("Москва")
+
+    # Цепь разомкнута: запрос дожидается reset_timeout, а не возвращает NOT FOUND
+    assert linker.lookup("Москва") == "['http://dbpedia.org/resource/Москва']"
+    assert linker.session.calls == 2
+
+
+def test_open_circuit_raises_after_max_wait():
+    linker = make_linker(failures=1, max_circuit_wait=0.0)
+
+    with pytest.raises(LinkingUnavailableError):
+        linker.lookup("Москва")
+
+    with pytest.raises(LinkingUnavailableError):
+        linker.lookup("Москва")
+
+    assert linker.session.calls == 1
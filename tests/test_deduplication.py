@@ -0,0 +1,29 @@
+import pandas as pd
+
+import main
+from ner.base.models import CompactNERResult
+from ner.pipeline import CellFilter, DeduplicationStage
+from ner.retrievers import LLMRetriever
+from ner.testing.fake_chat_model import FakeChatModel
+
+
+def test_trivial_and_repeated_cells_are_collapsed():
+    stage = DeduplicationStage()
+    unique = stage.fit(["Москва", float("nan"), "Москва", "", "12,5", "Казань", 7, "Москва"])
+
+    assert unique == ["Москва", "Казань"]
+    assert (stage.stats.total, stage.stats.trivial, stage.stats.unique) == (8, 4, 2)
+    assert stage.expand(["m", "k"], empty_result="-") == ["m", "-", "m", "-", "-", "k", "-", "m"]
+
+
+def test_deduplicated_entities_match_full_run():
+    source = pd.Series(["Я живу в Москве", "Я живу в Москве", "", "Работаю в Яндексе", "2024"])
+    llm = FakeChatModel()
+
+    deduplicated = main.retrive_unique_entities(LLMRetriever(llm), source, cell_filter=CellFilter())
+    full = main.retrive_entities(LLMRetriever(FakeChatModel()), source)
+
+    assert llm.call_count == 2
+    assert [result.to_json() for result in deduplicated] == \
+        [result.to_json() if text.strip() and not text.isdigit() else CompactNERResult([]).to_json()
+         for text, result in zip(source, full)]
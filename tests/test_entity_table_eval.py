@@ -0,0 +1,74 @@
+import pandas as pd
+
+import eval as ner_eval
+from eval import ClassificationReport
+import main
+from ner.base.models import Entity, NERResult
+from ner.retrievers import LLMRetriever
+from ner.testing.fake_chat_model import FakeChatModel
+
+
+def gold(entities):
+    return NERResult(sentences=[[Entity(**entity) for entity in entities]]).model_dump_json()
+
+
+def test_main_entity_table_round_trip_to_eval(tmp_path, monkeypatch):
+    texts = ["Я живу в Москве", "Работаю в Яндексе", "без сущностей"]
+    source = tmp_path / "dataset.csv"
+    pd.DataFrame({
+        "text": texts,
+        "NER_text": [gold([{"text": "Москве", "type": "LOC", "start_char": 9, "end_char": 15}]),
+                     gold([{"text": "Яндексе", "type": "ORG", "start_char": 10, "end_char": 17}]),
+                     gold([])],
+    }).to_csv(source, sep="|", index=False)
+
+    table_path = tmp_path / "entities.parquet"
+    ner_eval.csv_to_entity_table(source, table_path, columns=["NER_text"])
+
+    # FakeChatModel размечает все слова с заглавной буквы как LOC
+    monkeypatch.setattr(main.RetrieverFactory, "create_from_ner_type", 
+                        lambda **kwargs: LLMRetriever(FakeChatModel()))
+
+    main.main(src_file_path=source,
+              src_column="text",
+              ner_column_name="NER_text_EST",
+              link=False,
+              output_file_path=tmp_path / "output.csv",
+              deduplicate=False,
+              entity_table_path=table_path,
+              entity_table_merge=True)
+
+    metrics, _ = ner_eval.evaluate_entity_table(table_path, ["LOC", "PER", "MISC", "ORG"])
+
+    assert metrics["LOC"]["tp"] == 1
+    assert metrics["ORG"]["fn"] == 1
+    assert metrics["LOC"]["fp"] == 2
+
+    # Повторный запуск с merge заменяет только свою колонку
+    main.main(src_file_path=source, src_column="text", ner_column_name="NER_text_EST", link=False,
+              output_file_path=tmp_path / "output.csv", deduplicate=False,
+              entity_table_path=table_path, entity_table_merge=True)
+
+    assert ner_eval.evaluate_entity_table(table_path, ["LOC", "PER", "MISC", "ORG"])[0] == metrics
+
+
+def test_column_without_estimates_matches_csv(tmp_path):
+    source = tmp_path / "dataset.csv"
+    pd.DataFrame({
+        "NER_a": [gold([{"text": "Москве", "type": "LOC", "start_char": 9, "end_char": 15}])],
+        "NER_a_EST": [gold([{"text": "Москве", "type": "LOC", "start_char": 9, "end_char": 15}])],
+        "NER_b": [gold([{"text": "Яндексе", "type": "ORG", "start_char": 10, "end_char": 17}])],
+    }).to_csv(source, sep="|", index=False)
+
+    table_path = tmp_path / "entities.parquet"
+    ner_eval.csv_to_entity_table(source, table_path)
+
+    classes = ["LOC", "PER", "MISC", "ORG"]
+    csv_report = ClassificationReport(classes)
+
+    for column in ("NER_a", "NER_b"):
+        csv_report.merge(ner_eval._evaluate_column(source, column, classes)[0])
+
+    # NER_b без NER_b_EST не дает ложных FN ни в одном из путей
+    assert ner_eval.evaluate_entity_table(table_path, classes)[0] == csv_report.calculate_metrics()
+    assert csv_report.calculate_metrics()["ORG"]["fn"] == 0
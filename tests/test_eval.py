@@ -0,0 +1,92 @@
+import random
+
+import pandas as pd
+from pydantic import ValidationError
+
+import eval as ner_eval
+from ner.base.models import Entity, NERResult
+
+
+CLASSES = ["LOC", "PER", "MISC", "ORG"]
+WORDS = ["Москва", "москва ", "Москва-Сити", "Петр", "Петр I", "ООО", "ООО Ромашка", "Мир", "и"]
+
+
+def baseline_counts(data_frame: pd.DataFrame, ner_column: str) -> dict:
+    """Исходный алгоритм оценки: построчный разбор и попарное сравнение сущностей"""
+    tp, fp, fn = dict.fromkeys(CLASSES, 0), dict.fromkeys(CLASSES, 0), dict.fromkeys(CLASSES, 0)
+    normalize = lambda text: text.strip().lower()
+
+    for _, row in data_frame.iterrows():
+        try:
+            true_result = NERResult.model_validate_json(row[ner_column])
+            pred_result = NERResult.model_validate_json(row.get(f"{ner_column}_EST", ""))
+        except ValidationError:
+            continue
+
+        true_entities = [entity for sentence in true_result.sentences for entity in sentence]
+        pred_entities = [entity for sentence in pred_result.sentences for entity in sentence]
+
+        for cls in CLASSES:
+            true_cls = [entity for entity in true_entities if entity.type == cls]
+            pred_cls = [entity for entity in pred_entities if entity.type == cls]
+            matched_true, matched_pred = set(), set()
+
+            for i, true_entity in enumerate(true_cls):
+                for j, pred_entity in enumerate(pred_cls):
+                    if normalize(true_entity.text) == normalize(pred_entity.text) and j not in matched_pred:
+                        matched_true.add(i)
+                        matched_pred.add(j)
+                        tp[cls] += 1
+                        break
+
+            for i, true_entity in enumerate(true_cls):
+                if i in matched_true:
+                    continue
+                for j, pred_entity in enumerate(pred_cls):
+                    if j not in matched_pred and normalize(pred_entity.text) in normalize(true_entity.text):
+                        matched_true.add(i)
+                        matched_pred.add(j)
+                        tp[cls] += 1
+                        break
+
+            fn[cls] += len(true_cls) - len(matched_true)
+            fp[cls] += len(pred_cls) - len(matched_pred)
+
+    return {cls: (tp[cls], fp[cls], fn[cls]) for cls in CLASSES}
+
+
+def random_result(rng: random.Random) -> str:
+    if rng.random() < 0.05:
+        return "not json"
+
+    sentences = [[Entity(text=rng.choice(WORDS), type=rng.choice(CLASSES), start_char=0, end_char=1)
+                  for _ in range(rng.randint(0, 4))]
+                 for _ in range(rng.randint(0, 3))]
+    return NERResult(sentences=sentences).model_dump_json()
+
+
+def test_column_counts_match_baseline(tmp_path):
+    rng = random.Random(7)
+    path = tmp_path / "dataset.csv"
+    data_frame = pd.DataFrame({"NER_a": [random_result(rng) for _ in range(300)],
+                               "NER_a_EST": [random_result(rng) for _ in range(300)]})
+    data_frame.to_csv(path, sep="|", index=False)
+
+    report, error = ner_eval._evaluate_column(path, "NER_a", CLASSES)
+    expected = baseline_counts(pd.read_csv(path, sep="|"), "NER_a")
+
+    assert error is None
+    assert {cls: (report.tp[cls], report.fp[cls], report.fn[cls]) for cls in CLASSES} == expected
+
+
+def test_unreadable_file_is_skipped(tmp_path, capsys):
+    good = NERResult(sentences=[[Entity(text="Москва", type="LOC", start_char=0, end_char=6)]]).model_dump_json()
+    pd.DataFrame({"NER_a": [good], "NER_a_EST": [good]}).to_csv(tmp_path / "good.csv", sep="|", index=False)
+    # Заголовок читается, а некорректный байт в конце файла ломает чтение колонок в процессе-обработчике
+    (tmp_path / "broken.csv").write_bytes(b"NER_a|NER_a_EST\n" + b"{}|{}\n" * 100_000 + b"\xff|{}\n")
+
+    ner_eval.evaluate_ner_dataset(tmp_path, workers=2)
+
+    assert "Ошибка загрузки файла" in capsys.readouterr().out
+    assert (tmp_path / "good.report.txt").exists()
+    assert not (tmp_path / "broken.report.txt").exists()
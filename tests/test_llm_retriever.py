@@ -0,0 +1,55 @@
+import pytest
+
+from ner.retrievers import LLMRetriever
+from ner.testing.fake_chat_model import FakeChatResponse
+from ner.utils import parse_lenient_json
+
+
+class ScriptedChatModel:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.call_count = 0
+
+    def invoke(self, messages):
+        self.call_count += 1
+        return FakeChatResponse(self.responses.pop(0))
+
+
+@pytest.mark.parametrize("text, repaired, truncated", [
+    ('[[{"text": "A"}]]', False, False),
+    ("[[{'text': 'A'},],]", True, False),
+    ('Ответ: [[{"text": "A"}]] Готово.', False, False),
+    ('[[{"text": "A"}, {"te', True, True),
+])
+def test_lenient_json_flags(text, repaired, truncated):
+    assert parse_lenient_json(text)[1:] == (repaired, truncated)
+
+
+@pytest.mark.parametrize("response", ['{"entities": []}', "[[],]", "[]"])
+def test_complete_empty_answer_is_not_retried(response):
+    llm = ScriptedChatModel(response)
+    retriever = LLMRetriever(llm, max_retries=3)
+
+    assert not any(retriever.retrieve("просто текст"))
+    assert llm.call_count == 1
+    assert retriever.parse_stats.retries == 0
+
+
+def test_truncated_answer_keeps_complete_entities():
+    llm = ScriptedChatModel('[[{"text": "Москве", "type": "LOC", "start_char": 0, "end_char": 1}, {"text": "Янд')
+    retriever = LLMRetriever(llm, max_retries=3)
+
+    sentences = retriever.retrieve("Я живу в Москве и работаю в Яндексе")
+
+    assert [(entity.text, entity.start_char, entity.end_char) for entity in sentences[0]] == [("Москве", 9, 15)]
+    assert llm.call_count == 1
+    assert retriever.parse_stats.salvaged == 1
+
+
+def test_truncated_answer_without_entities_is_retried():
+    llm = ScriptedChatModel('[[{"te', '[[{"text": "Москве", "type": "LOC", "start_char": 9, "end_char": 15}]]')
+    retriever = LLMRetriever(llm, max_retries=3)
+
+    assert retriever.retrieve("Я живу в Москве")[0][0].text == "Москве"
+    assert llm.call_count == 2
+    assert retriever.parse_stats.retries == 1
@@ -0,0 +1,88 @@
+import logging
+
+from ner.base.models import EntitySpan
+from ner.linkers import DBPediaIndex, LocalDBPediaLinker
+
+
+LABEL = "<http://www.w3.org/2000/01/rdf-schema#label>"
+REDIRECT = "<http://dbpedia.org/ontology/wikiPageRedirects>"
+RESOURCE = "http://ru.dbpedia.org/resource/"
+
+
+def label(resource: str, text: str, lang: str = "ru") -> str:
+    return f'<{RESOURCE}{resource}> {LABEL} "{text}"@{lang} .\n'
+
+
+def redirect(source: str, target: str) -> str:
+    return f"<{RESOURCE}{source}> {REDIRECT} <{RESOURCE}{target}> .\n"
+
+
+def write_dump(path, lines):
+    path.write_text("".join(lines), encoding="utf-8")
+    return path
+
+
+def test_lookup_resolves_redirects_and_ranks_candidates(tmp_path):
+    dump = write_dump(tmp_path / "labels.nt", [
+        label("Москва_(река)", "Москва"),
+        label("Москва", "Москва"),
+        label("Мск", "Мск"),
+        redirect("Мск", "Москва"),
+        label("Moscow", "Moscow", lang="en"),
+        label("Санкт-Петербург", "\\u0421\\u0430\\u043D\\u043A\\u0442-\\u041F\\u0435\\u0442\\u0435\\u0440\\u0431\\u0443\\u0440\\u0433"),
+        "это не тройка\n",
+    ])
+
+    linker = LocalDBPediaLinker(tmp_path / "index", dump_paths=[dump])
+
+    try:
+        # Город популярнее реки: на него ведет редирект
+        assert linker.candidates("москва") == [f"{RESOURCE}Москва", f"{RESOURCE}Москва_(река)"]
+        # Метка редиректа ведет на целевую страницу
+        assert linker.link(EntitySpan.create("МСК", "LOC", 0, 3)).link == f"['{RESOURCE}Москва']"
+        assert linker.lookup("Санкт Петербург") == LocalDBPediaLinker.NOT_FOUND
+        assert linker.lookup("санкт-петербург") == f"['{RESOURCE}Санкт-Петербург']"
+        # Метки на других языках в индекс не попадают
+        assert linker.lookup("Moscow") == LocalDBPediaLinker.NOT_FOUND
+    finally:
+        linker.close()
+
+
+def test_rebuild_parses_only_changed_dumps(tmp_path, caplog):
+    first = write_dump(tmp_path / "first.nt", [label("Москва", "Москва")])
+    second = write_dump(tmp_path / "second.nt", [label("Казань", "Казань")])
+    index_dir = tmp_path / "index"
+
+    index = DBPediaIndex.build([first, second], index_dir)
+    build_id = index.build_id
+    index.close()
+
+    with caplog.at_level(logging.INFO, logger="ner.linkers.dbpedia_index"):
+        index = DBPediaIndex.build([first, second], index_dir)
+
+    assert index.build_id == build_id
+    assert "is up to date" in caplog.text
+    index.close()
+
+    write_dump(second, [label("Казань", "Казань"), label("Самара", "Самара")])
+    caplog.clear()
+
+    with caplog.at_level(logging.INFO, logger="ner.linkers.dbpedia_index"):
+        index = DBPediaIndex.build([first, second], index_dir)
+
+    try:
+        assert index.build_id != build_id
+        assert "1/2 dumps parsed" in caplog.text
+        assert index.lookup("Москва") == [f"{RESOURCE}Москва"]
+        assert index.lookup("Самара") == [f"{RESOURCE}Самара"]
+    finally:
+        index.close()
+
+    # Удаленный из списка дамп исчезает из индекса
+    index = DBPediaIndex.build([second], index_dir)
+
+    try:
+        assert index.lookup("Москва") == []
+        assert len(index) == 2
+    finally:
+        index.close()
@@ -0,0 +1,36 @@
+import logging
+
+import pandas as pd
+
+import main
+from ner.retrievers import LLMRetriever
+from ner.testing.fake_chat_model import FakeChatModel
+
+
+def test_stage_summaries_go_to_log(monkeypatch, tmp_path, capsys, caplog):
+    source = tmp_path / "source.csv"
+    pd.DataFrame({"text": ["Я живу в Москве", "Я живу в Москве"]}).to_csv(source, index=False)
+    monkeypatch.setattr(main.RetrieverFactory, "create_from_ner_type", lambda **kwargs: LLMRetriever(FakeChatModel()))
+
+    with caplog.at_level(logging.INFO, logger="main"):
+        main.main(src_file_path=source, src_column="text", link=False, output_file_path=tmp_path / "output.csv")
+
+    assert capsys.readouterr().out == ""
+    assert "Deduplication: Rows: 2, trivial: 0, unique: 1" in caplog.text
+
+
+def test_several_columns_match_separate_runs():
+    data_frame = pd.DataFrame({"title": ["Москва", "Казань", "Москва"],
+                               "body": ["Я живу в Москве", "Москва", "Тверь"]})
+    llm = FakeChatModel()
+
+    combined = main.process_data_frame(data_frame.copy(), retriever=LLMRetriever(llm), src_column=["title", "body"])
+
+    # Одинаковые значения в разных колонках уходят в модель один раз
+    assert llm.call_count == 4
+
+    for column in ("title", "body"):
+        single = main.process_data_frame(data_frame.copy(), retriever=LLMRetriever(FakeChatModel()), 
+                                         src_column=column)
+
+        assert combined[f"NER_{column}"].tolist() == single["NER"].tolist()
@@ -0,0 +1,70 @@
+import json
+import urllib.request
+
+import pandas as pd
+
+import main
+from ner.metrics import MetricsRegistry, metrics
+from ner.retrievers import LLMRetriever
+from ner.testing.fake_chat_model import FakeChatModel
+
+
+def test_disabled_registry_records_nothing():
+    registry = MetricsRegistry()
+    registry.increment("calls_total")
+    registry.observe("latency_seconds", 0.1)
+
+    assert registry.to_dict() == {"counters": {}, "histograms": {}}
+
+
+def test_counters_histograms_and_prometheus_text():
+    registry = MetricsRegistry(enabled=True)
+    registry.increment("calls_total", 2, stage="ner")
+    registry.increment("calls_total", stage="ner")
+
+    for value in (0.003, 0.02, 0.02, 3.0):
+        registry.observe("latency_seconds", value, stage="ner")
+
+    snapshot = registry.to_dict()
+    histogram = snapshot["histograms"]["latency_seconds"][0]
+
+    assert snapshot["counters"]["calls_total"] == [{"labels": {"stage": "ner"}, "value": 3}]
+    assert (histogram["count"], histogram["p50"], histogram["p99"]) == (4, 0.025, 5.0)
+
+    text = registry.to_prometheus()
+    assert 'calls_total{stage="ner"} 3' in text
+    assert 'latency_seconds_bucket{stage="ner",le="0.025"} 3' in text
+    assert 'latency_seconds_bucket{stage="ner",le="+Inf"} 4' in text
+
+
+def test_http_endpoint_serves_prometheus_text():
+    registry = MetricsRegistry(enabled=True)
+    registry.increment("calls_total")
+    registry.start_http_server(0)
+
+    try:
+        port = registry._server.server_address[1]
+        body = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics").read().decode("utf-8")
+    finally:
+        registry.stop_http_server()
+
+    assert "# TYPE calls_total counter\ncalls_total 1" in body
+
+
+def test_main_dumps_run_metrics(monkeypatch, tmp_path):
+    source = tmp_path / "source.csv"
+    pd.DataFrame({"text": ["Я живу в Москве", "Я живу в Москве", "Работаю в Яндексе"]}).to_csv(source, index=False)
+    monkeypatch.setattr(main.RetrieverFactory, "create_from_ner_type", lambda **kwargs: LLMRetriever(FakeChatModel()))
+
+    try:
+        main.main(src_file_path=source, src_column="text", link=False, 
+                  output_file_path=tmp_path / "output.csv", metrics_path=tmp_path / "metrics.json")
+    finally:
+        metrics.enabled = False
+        metrics.reset()
+
+    snapshot = json.loads((tmp_path / "metrics.json").read_text(encoding="utf-8"))
+
+    # После дедупликации в модель уходят два уникальных текста
+    assert snapshot["counters"]["ner_texts_total"] == [{"labels": {"retriever": "LLMRetriever"}, "value": 2}]
+    assert [series["labels"] for series in snapshot["histograms"]["stage_seconds"]] == [{"stage": "ner"}]
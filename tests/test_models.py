@@ -0,0 +1,42 @@
+import pytest
+from pydantic import ValidationError
+
+from ner.base.models import CompactNERResult, Entity, EntitySpan, LinkedEntity, NERResult
+
+
+SENTENCES = [
+    [{"text": "Москва", "type": "LOC", "start_char": 0, "end_char": 6},
+     {"text": "ООО \"Ромашка\"", "type": "ORG", "start_char": 10, "end_char": 23}],
+    [],
+    [{"text": "Back\\slash\n\ttab", "type": "MISC", "start_char": 30, "end_char": 45},
+     {"text": "Zoë 🚀  ", "type": "PER", "start_char": 46, "end_char": 53}],
+]
+
+
+def test_compact_json_is_byte_identical_to_pydantic():
+    expected = NERResult(sentences=[[Entity(**entity) for entity in sentence] for sentence in SENTENCES])
+    compact = CompactNERResult([[EntitySpan.create(**entity) for entity in sentence] for sentence in SENTENCES])
+
+    assert compact.to_json().encode("utf-8") == expected.model_dump_json().encode("utf-8")
+    assert CompactNERResult(sentences=[]).to_json() == NERResult(sentences=[]).model_dump_json()
+
+    restored = CompactNERResult.from_json(expected.model_dump_json())
+    assert restored == compact
+    assert restored.to_ner_result().model_dump_json() == expected.model_dump_json()
+
+
+def test_irregular_json_goes_through_pydantic():
+    # Строки с числами pydantic приводит к int, а некорректные документы дают ту же ошибку
+    lax = '{"sentences": [[{"text": "Москва", "type": "LOC", "start_char": "0", "end_char": 6}]]}'
+    assert CompactNERResult.from_json(lax).to_json() == NERResult.model_validate_json(lax).model_dump_json()
+
+    for invalid in ('{"sentences": [[{"text": "Москва"}]]}', "not json", "nan"):
+        with pytest.raises(ValidationError):
+            CompactNERResult.from_json(invalid)
+
+
+def test_entity_span_is_accepted_where_entity_is_expected():
+    span = EntitySpan.create("Москва", "LOC", 0, 6)
+
+    assert LinkedEntity(entity=span, link="x").entity == Entity(text="Москва", type="LOC", start_char=0, end_char=6)
+    assert Entity.model_validate(span, from_attributes=True).model_dump() == span.to_entity().model_dump()
@@ -0,0 +1,36 @@
+from ner.base.models import EntitySpan
+from ner.pipeline import NormalizationStage, RuleBasedNormalizer
+
+
+def entities(*forms):
+    return [EntitySpan.create(text, entity_type, 0, len(text)) for text, entity_type in forms]
+
+
+def test_inflected_forms_share_nominative_query():
+    stage = NormalizationStage(RuleBasedNormalizer())
+    queries = stage.fit(entities(("Москве", "LOC"), ("Москве", "LOC"), ("Москве", "LOC"),
+                                 ("Москвы", "LOC"), ("Москва", "LOC"),
+                                 ("Российской Федерации", "LOC"), ("Российская Федерация", "LOC")))
+
+    assert [query.text for query in queries] == ["Москва", "Российская Федерация"]
+    assert stage.query_for("Москве") == "Москва"
+    assert stage.query_for("Российской Федерации") == "Российская Федерация"
+
+
+def test_similar_entities_are_not_merged():
+    stage = NormalizationStage(RuleBasedNormalizer())
+    stage.fit(entities(("Бразилия", "LOC"), ("Бразилиа", "LOC"), ("Бразилии", "LOC"),
+                       ("Москва", "LOC"), ("Москва", "ORG")))
+
+    # Окончания -ия и -иа не из одной парадигмы склонения
+    assert stage.query_for("Бразилии") == "Бразилия"
+    assert stage.query_for("Бразилиа") == "Бразилиа"
+    assert stage.stats.queries == 3
+
+
+def test_incremental_add_keeps_first_form_as_query():
+    stage = NormalizationStage(RuleBasedNormalizer())
+
+    assert [entity.text for entity in stage.add(entities(("Москве", "LOC")))] == ["Москве"]
+    assert stage.add(entities(("Москва", "LOC"), ("Москве", "LOC"))) == []
+    assert stage.query_for("Москва") == "Москве"
@@ -0,0 +1,63 @@
+from typing import List
+
+import pandas as pd
+
+import main
+from ner.base.linker import Linker
+from ner.base.models import Entity, LinkedEntity
+from ner.pipeline import PipelinedExecutor, RuleBasedNormalizer
+from ner.retrievers import LLMRetriever
+from ner.testing.fake_chat_model import FakeChatModel
+
+
+class DictLinker(Linker):
+    """Ссылка строится из текста запроса; запросы запоминаются для проверок"""
+
+    def __init__(self):
+        self.queries: List[str] = []
+
+    def link(self, entity: Entity) -> LinkedEntity:
+        self.queries.append(entity.text)
+        return LinkedEntity(entity=entity, link=f"link:{entity.text}")
+
+
+def test_state_does_not_grow_across_runs():
+    executor = PipelinedExecutor(retriever=LLMRetriever(FakeChatModel()), 
+                                 linker=DictLinker(), 
+                                 normalizer=RuleBasedNormalizer())
+
+    executor.run(["Я живу в Москве", "Москва большая"])
+    _, linking_results = executor.run(["Казань", "Казани нет"])
+
+    # После второй части таблицы в памяти только ее формы
+    assert set(executor._queries) == {"Казань", "Казани"}
+    assert set(executor._links) == {"Казань"}
+    assert executor.normalization_stats.surface_forms == 2
+    assert [result.sentences for result in linking_results] == [[["link:Казань"]], [["link:Казань"]]]
+    assert executor.stats.queries == 2
+
+
+TEXTS = ["Я живу в Москве", "Москва большая", "Без сущностей", "Казань и Москва", "Я живу в Москве", 
+         "Тверь, Пермь и Казань"] * 5
+
+
+def sequential(normalizer=None, workers=1):
+    retriever = LLMRetriever(FakeChatModel())
+    entities = main.retrive_unique_entities(retriever=retriever, source_series=pd.Series(TEXTS), batch_size=4)
+    linked = main.link_entities(linker=DictLinker(), entities=entities, workers=workers, normalizer=normalizer)
+    return [result.to_json() for result in entities], [result.sentences for result in linked]
+
+
+def test_pipelined_matches_sequential_without_normalizer():
+    pipeline = PipelinedExecutor(retriever=LLMRetriever(FakeChatModel()), linker=DictLinker(), 
+                                 batch_size=4, link_workers=3, link_batch_size=2)
+
+    entities, linked = main.run_pipelined(pipeline, pd.Series(TEXTS))
+
+    assert ([result.to_json() for result in entities], [result.sentences for result in linked]) == sequential()
+
+
+def test_parallel_linking_matches_single_worker():
+    assert sequential(workers=4) == sequential(workers=1)
+    assert sequential(normalizer=RuleBasedNormalizer(), workers=4) == \
+        sequential(normalizer=RuleBasedNormalizer(), workers=1)
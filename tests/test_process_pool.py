@@ -0,0 +1,43 @@
+import pandas as pd
+
+import main
+from ner.retrievers import CascadeRetriever, LLMRetriever, ProcessPoolRetriever
+from ner.testing.fake_chat_model import FakeChatModel
+
+
+def create_pool(workers: int = 2) -> ProcessPoolRetriever:
+    # LLMRetriever с FakeChatModel заменяет Stanza: модель создается в каждом процессе пула
+    return ProcessPoolRetriever(LLMRetriever, workers=workers, torch_threads=None, min_shard_size=2, llm=FakeChatModel())
+
+
+def test_main_shuts_down_pool_workers(monkeypatch, tmp_path):
+    source = tmp_path / "source.csv"
+    pd.DataFrame({"text": ["Я живу в Москве", "Работаю в Яндексе"]}).to_csv(source, index=False)
+
+    pool = create_pool()
+    monkeypatch.setattr(main.RetrieverFactory, "create_from_ner_type", lambda **kwargs: pool)
+
+    main.main(src_file_path=source, src_column="text", link=False, output_file_path=tmp_path / "output.csv")
+
+    assert pool._executor._processes is None
+
+
+def test_sharded_results_match_sequential_order():
+    texts = [f"Строка {idx}: живу в Городе{idx % 7}" for idx in range(37)]
+
+    with create_pool(workers=3) as pool:
+        assert pool.preferred_batch_size == 6
+        pooled = pool.retrieve_batch(texts)
+
+    sequential = LLMRetriever(FakeChatModel()).retrieve_batch(texts)
+
+    assert [[[(entity.text, entity.start_char) for entity in sentence] for sentence in result] for result in pooled] == \
+        [[[(entity.text, entity.start_char) for entity in sentence] for sentence in result] for result in sequential]
+
+
+def test_batch_size_is_raised_for_pool_under_cascade():
+    with create_pool(workers=3) as pool:
+        cascade = CascadeRetriever(primary=pool, fallback=LLMRetriever(FakeChatModel()))
+
+        assert main.pool_batch_size(cascade, 4) == 6
+        assert main.pool_batch_size(cascade, 64) == 64
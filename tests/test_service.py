@@ -0,0 +1,97 @@
+import json
+import threading
+
+import pandas as pd
+import pytest
+
+import main
+from ner.base.models import EntitySpan, LinkingType, NERType
+from ner.factories import RetrieverFactory, TableFactory
+from ner.pipeline import RuleBasedNormalizer
+from ner.retrievers import LLMRetriever
+from ner.service import MicroBatcher, ServiceLinker, ServiceRetriever
+from ner.service.server import NERService
+from ner.testing import DBPediaStubServer
+from ner.testing.fake_chat_model import FakeChatModel
+
+
+@pytest.fixture
+def service_url(monkeypatch):
+    # FakeChatModel размечает все слова с заглавной буквы как LOC
+    monkeypatch.setattr(RetrieverFactory, "create_from_ner_type",
+                        classmethod(lambda cls, **kwargs: LLMRetriever(FakeChatModel())))
+
+    with DBPediaStubServer() as stub:
+        server = NERService(max_wait_ms=1.0, linker_options={"base_url": stub.url}).create_server(port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        try:
+            yield f"http://127.0.0.1:{server.server_address[1]}"
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+def test_service_round_trip(service_url):
+    retriever = ServiceRetriever(ner_type=NERType.LLM_GIGACHAT, base_url=service_url)
+    linker = ServiceLinker(linking_type=LinkingType.DBPEDIA, base_url=service_url)
+
+    sentences = retriever.retrieve("Я живу в Москве")
+    entity = sentences[0][0]
+
+    assert isinstance(entity, EntitySpan)
+    assert (entity.text, entity.type, entity.start_char, entity.end_char) == ("Москве", "LOC", 9, 15)
+    assert linker.link(EntitySpan.create("Москва", "LOC", 0, 6)).link == \
+        "['http://ru.dbpedia.org/resource/Москва']"
+
+
+def test_service_mode_with_normalizer(service_url, tmp_path):
+    source = tmp_path / "source.csv"
+    pd.DataFrame({"text": ["Я живу в Москве", "Москва большая", "Без сущностей"]}).to_csv(source, sep="|", index=False)
+
+    main.main(src_file_path=source,
+              src_column="text",
+              ner_type=NERType.LLM_GIGACHAT,
+              output_file_path=tmp_path / "output.csv",
+              service_url=service_url,
+              normalizer=RuleBasedNormalizer())
+
+    links = [json.loads(value)["sentences"] for value in TableFactory.create_from_path(tmp_path / "output.csv")["NEL"]]
+
+    # Москве и Москва уходят в сервис одним запросом в именительном падеже
+    assert links[0] == links[1] == [["['http://ru.dbpedia.org/resource/Москва']"]]
+
+
+def test_micro_batcher_groups_concurrent_requests():
+    batches = []
+    started = threading.Barrier(4)
+
+    def process(items):
+        batches.append(list(items))
+        return [item.upper() for item in items]
+
+    batcher = MicroBatcher(process, max_batch_size=64, max_wait_ms=200.0)
+    results = {}
+
+    def submit(name):
+        started.wait()
+        results[name] = batcher.submit([f"{name}-1", f"{name}-2"])
+
+    threads = [threading.Thread(target=submit, args=(name,)) for name in "abcd"]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Каждый запрос получает свои результаты, хотя модель вызвана меньше раз, чем было запросов
+    assert results == {name: [f"{name.upper()}-1", f"{name.upper()}-2"] for name in "abcd"}
+    assert len(batches) < 4
+
+
+def test_local_only_options_are_rejected_in_service_mode(tmp_path):
+    source = tmp_path / "source.csv"
+    pd.DataFrame({"text": ["Москва"]}).to_csv(source, index=False)
+
+    with pytest.raises(ValueError, match="cache_path"):
+        main.main(src_file_path=source, src_column="text", service_url="http://127.0.0.1:1", 
+                  cache_path=tmp_path / "cache.db")
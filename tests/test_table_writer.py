@@ -0,0 +1,60 @@
+import pandas as pd
+import pytest
+
+from ner.factories.table_factory import TableFactory
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".feather"])
+def test_chunked_write_with_column_empty_in_first_chunk(tmp_path, suffix):
+    # В первой части колонка пустая и читается из CSV как float64, строки появляются позже
+    source = tmp_path / "source.csv"
+    pd.DataFrame({"text": [f"Москва {idx}" for idx in range(10)],
+                  "note": [None] * 5 + ["hello"] * 5}).to_csv(source, index=False)
+
+    output = tmp_path / f"output{suffix}"
+
+    with TableFactory.create_writer(output) as writer:
+        for chunk in TableFactory.iter_chunks_from_path(source, chunk_size=3):
+            writer.write(chunk)
+
+    result = TableFactory.create_from_path(output)
+
+    assert len(result) == 10
+    assert result["note"].isna().sum() == 5
+    assert result["note"].dropna().tolist() == ["hello"] * 5
+
+
+def test_csv_is_read_with_detected_encoding(tmp_path):
+    source = tmp_path / "source.csv"
+    source.write_bytes("text;label\nПривет из Москвы;1\nСанкт-Петербург;2\n".encode("cp1251"))
+
+    result = TableFactory.create_from_path(source)
+
+    assert result["text"].tolist() == ["Привет из Москвы", "Санкт-Петербург"]
+
+
+def test_streamed_xlsx_matches_read_excel(tmp_path):
+    source = tmp_path / "source.xlsx"
+    data_frame = pd.DataFrame({"text": [f"Москва {idx}" if idx % 4 else None for idx in range(25)],
+                               "label": list(range(25)),
+                               "score": [idx / 3 for idx in range(25)]})
+    data_frame.to_excel(source, index=False)
+
+    streamed = pd.concat(TableFactory.iter_chunks_from_path(source, chunk_size=7), ignore_index=True)
+
+    pd.testing.assert_frame_equal(streamed, pd.read_excel(source))
+
+
+def test_streamed_xlsx_round_trip_matches_to_excel(tmp_path):
+    source = tmp_path / "source.xlsx"
+    pd.DataFrame({"text": [f"Казань {idx}" for idx in range(10)], "label": list(range(10))}).to_excel(source, index=False)
+
+    output, expected = tmp_path / "output.xlsx", tmp_path / "expected.xlsx"
+
+    with TableFactory.create_writer(output) as writer:
+        for chunk in TableFactory.iter_chunks_from_path(source, chunk_size=3):
+            writer.write(chunk)
+
+    pd.read_excel(source).to_excel(expected)
+
+    pd.testing.assert_frame_equal(pd.read_excel(output), pd.read_excel(expected))